@@ -0,0 +1,52 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of the search for the best turn at fixed depths. """
+
+from pypentago import ai, core
+
+from bench import random_game
+
+DEPTHS = (1, 2, 3)
+
+
+def positions():
+    """ Return the positions of an opening, a middle game and an end game,
+    each with the player whose turn it is. """
+    ret = []
+    for plies in (4, 12, 20):
+        b = core.Board()
+        for player, turn in random_game(plies, plies):
+            b.apply_turn(player, turn)
+        ret.append((b, plies % 2 + 1))
+    return ret
+
+
+def bench_search(timer):
+    """ Search the same positions to every depth of DEPTHS. """
+    boards = positions()
+    for depth in DEPTHS:
+        def search():
+            nodes = 0
+            for b, player in boards:
+                nodes += ai.search(b, player, max_depth=depth)['nodes']
+            return nodes
+        nodes = search()
+        result = timer.measure(search, 1)
+        result['nodes'] = nodes
+        result['nodes_per_second'] = nodes / result['median']
+        yield 'depth %d' % depth, result
@@ -0,0 +1,114 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Helpers shared by the benchmarks.
+
+Every benchmark module defines functions whose names start with bench_.
+They are passed a Timer and yield (name, result) pairs, where result is
+the dictionary returned by Timer.measure, optionally with more figures
+added to it. Everything random is seeded so that runs on different
+commits do the same work. """
+
+import gc
+import random
+
+from timeit import default_timer
+
+from pypentago import core
+
+
+class Timer(object):
+    """ Call functions repeatedly and record how long one call took. The
+    number of calls is multiplied by scale, so that quick runs can be done
+    with a scale smaller than one. """
+    def __init__(self, scale=1, repeat=5):
+        self.scale = scale
+        self.repeat = repeat
+
+    def number(self, number):
+        """ Return how many times to call a function that should be called
+        number times at scale one. """
+        return max(1, int(number * self.scale))
+
+    def measure(self, func, number):
+        """ Call func self.number(number) times in a row, self.repeat
+        times, and return a dictionary with the seconds one call took.
+        The garbage collector is disabled while doing so, like timeit
+        does. """
+        number = self.number(number)
+        times = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in xrange(self.repeat):
+                start = default_timer()
+                for _ in xrange(number):
+                    func()
+                times.append((default_timer() - start) / number)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        times.sort()
+        return {
+            'number': number,
+            'repeat': self.repeat,
+            'min': times[0],
+            'median': times[len(times) // 2],
+            'max': times[-1],
+        }
+
+
+class NullTransport(object):
+    """ Transport that throws away everything written to it. """
+    disconnecting = False
+
+    def write(self, data):
+        pass
+
+    def writeSequence(self, data):
+        pass
+
+    def registerProducer(self, producer, streaming):
+        pass
+
+    def unregisterProducer(self):
+        pass
+
+    def loseConnection(self):
+        self.disconnecting = True
+
+
+def random_game(plies, seed):
+    """ Return the list of (player, turn) of a game of plies turns made at
+    random. No turn that wins is made, so all of them can be applied. """
+    rand = random.Random(seed)
+    board = core.Board()
+    ret = []
+    player = 1
+    for _ in xrange(plies):
+        turns = board.legal_turns(player)
+        rand.shuffle(turns)
+        for turn in turns:
+            b = board.copy()
+            b.apply_turn(player, turn)
+            if not b.win():
+                break
+        else:
+            raise ValueError("every turn wins after %d plies" % len(ret))
+        board.apply_turn(player, turn)
+        ret.append((player, turn))
+        player = 3 - player
+    return ret
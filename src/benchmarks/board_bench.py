@@ -0,0 +1,59 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of making turns on and finding the winner of the boards. """
+
+from pypentago.perft import IMPLEMENTATIONS
+
+from bench import random_game
+
+GAME = random_game(24, 0)
+
+
+def bench_apply_turn(timer):
+    """ Make all turns of a game on an empty board. """
+    for name, cls in sorted(IMPLEMENTATIONS.iteritems()):
+        def play():
+            b = cls()
+            for player, turn in GAME:
+                b.apply_turn(player, turn)
+        result = timer.measure(play, 500)
+        result['turns'] = len(GAME)
+        yield name, result
+
+
+def bench_win(timer):
+    """ Look for a winner on every position of a game. """
+    for name, cls in sorted(IMPLEMENTATIONS.iteritems()):
+        boards = []
+        b = cls()
+        for player, turn in GAME:
+            b.apply_turn(player, turn)
+            boards.append(b.copy())
+
+        # Board only looks at the lines changed since the last call of
+        # win, so make it look at all of them again every time.
+        reset = [hasattr(b, '_dirty') and b._init_lines for b in boards]
+
+        def win():
+            for b, init_lines in zip(boards, reset):
+                if init_lines:
+                    init_lines()
+                b.win()
+        result = timer.measure(win, 500)
+        result['positions'] = len(boards)
+        yield name, result
@@ -0,0 +1,91 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Benchmarks of the codecs in pypentago.network.codec and of the wire
+formats using them, on the messages a server sends most. Only the codecs
+installed are measured. The bytes every call handles are recorded along
+with the time, main.py prints the throughput from them. """
+
+from pypentago.network.codec import CODECS
+from pypentago.network.wire import json_wire, binary_wire
+from pypentago.loadtest import wire_turn
+
+from bench import random_game
+
+TURNS = [wire_turn(turn) for player, turn in random_game(24, 0)]
+
+GAMES = {'version': 100, 'games': [
+    {'uid': uid, 'name': u'Game %d' % uid,
+     'players': [{'name': u'Player %d' % uid}]}
+    for uid in xrange(50)
+]}
+
+#: One list of games and what is sent during a game of 24 turns.
+MESSAGES = (
+    [("GAMES", GAMES),
+     ("INITGAME", {'game_id': 1, 'player_id': 0, 'beginner': True,
+                   'opponent_name': u'Player 2'})] +
+    [("GAME", [1, "TURN", [["", turn]]]) for turn in TURNS] +
+    [("GAME", [1, "MSG", [["", u"Good game!"]]]),
+     ("GAMEREMOVED", {'version': 101, 'uid': 1})]
+)
+
+
+def codecs():
+    return [CODECS[name] for name in sorted(CODECS)]
+
+
+def bench_codecs(timer):
+    """ Encode the data of the messages with every codec and decode it
+    again. """
+    data = [[keyword, data] for keyword, data in MESSAGES]
+    for codec in codecs():
+        encoded = [codec.dumps(d) for d in data]
+        size = sum(len(e) for e in encoded)
+        for name, fun, args in (('dumps', codec.dumps, data),
+                                ('loads', codec.loads, encoded)):
+            result = timer.measure(lambda: map(fun, args), 200)
+            result['bytes'] = size
+            result['messages'] = len(args)
+            yield '%s %s' % (codec.name, name), result
+
+
+def bench_wire(timer):
+    """ Frame the messages in every wire format and decode them again. """
+    wires = [json_wire()] + [binary_wire(codec.name) for codec in codecs()]
+    for wire in wires:
+        name = wire.name
+        if wire.name != 'json':
+            name += ' ' + wire.codec.name
+        frames = [wire.frame(keyword, data) for keyword, data in MESSAGES]
+        buf = ''.join(frames)
+
+        def frame():
+            for keyword, data in MESSAGES:
+                wire.frame(keyword, data)
+
+        def decode():
+            start = 0
+            while True:
+                message, start = wire.next(buf, start, len(buf))
+                if message is None:
+                    break
+                wire.decode(message)
+        for variant, fun in (('frame', frame), ('decode', decode)):
+            result = timer.measure(fun, 200)
+            result['bytes'] = len(buf)
+            result['messages'] = len(frames)
+            yield '%s %s' % (name, variant), result
@@ -0,0 +1,55 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of playing games, which tells observers about every turn. """
+
+from pypentago import core
+
+from bench import random_game
+
+GAME = random_game(24, 0)
+
+
+class Observer(core.Player):
+    """ Observer that counts the turns it is told about. """
+    def __init__(self):
+        core.Player.__init__(self, 'Observer')
+        self.turns = 0
+
+    def display_turn(self, player, turn):
+        self.turns += 1
+
+
+def play(observers):
+    """ Play GAME with observers observers watching it. """
+    game = core.Game()
+    players = [core.Player('Player 1'), core.Player('Player 2')]
+    for player in players:
+        game.add_player(player)
+    for _ in xrange(observers):
+        game.add_observer(Observer())
+    game.last_set = players[1]
+    for player, turn in GAME:
+        game.apply_turn(players[player - 1], list(turn))
+
+
+def bench_apply_turn(timer):
+    """ Play a game with no, a few and many observers. """
+    for observers in (0, 4, 32):
+        result = timer.measure(lambda: play(observers), 200)
+        result['turns'] = len(GAME)
+        yield '%d observers' % observers, result
@@ -0,0 +1,33 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of checking passwords against their hashes. """
+
+from pypentago import crypto
+
+PASSWORD = 'fourty-two'
+
+
+def bench_check_pwd(timer):
+    """ Check a correct and a wrong password with every hash method. """
+    for method in sorted(crypto.methods):
+        pwhash = crypto.hash_pwd(PASSWORD, method)
+
+        def check():
+            crypto.check_pwd(pwhash, PASSWORD)
+            crypto.check_pwd(pwhash, 'wrong')
+        yield method, timer.measure(check, 5000)
@@ -0,0 +1,155 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Run the benchmarks and write their results as JSON.
+
+Benchmarks can be picked by giving (parts of) their names, which are the
+module and the function without the prefix, e.g. board.win. Results of an
+earlier run can be given to print how much faster or slower every
+benchmark got since then. """
+
+from __future__ import with_statement
+
+import os
+import sys
+import time
+import inspect
+import platform
+import subprocess
+
+from optparse import OptionParser
+
+import twisted
+import pypentago
+
+from pypentago import core
+from pypentago.network import dumps, loads
+
+from bench import Timer
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+MODULES = ['board_bench', 'core_bench', 'pgn_bench', 'rpcializer_bench',
+           'network_bench', 'codec_bench', 'crypto_bench', 'ai_bench',
+           'server_bench']
+
+
+def benchmarks(names=None):
+    """ Yield (name, function) of all benchmarks in the order they are
+    defined in. If names is given, only those whose name contains one of
+    names are yielded. """
+    for module in map(__import__, MODULES):
+        prefix = module.__name__[:-len('_bench')]
+        funs = [
+            (fun.func_code.co_firstlineno, name, fun)
+            for name, fun in inspect.getmembers(module, inspect.isfunction)
+            if name.startswith('bench_') and fun.__module__ == module.__name__
+        ]
+        for line, name, fun in sorted(funs):
+            name = '%s.%s' % (prefix, name[len('bench_'):])
+            if not names or any(n in name for n in names):
+                yield name, fun
+
+
+def revision():
+    """ Return the commit the benchmarks are run on, or None if that
+    cannot be found out. """
+    try:
+        proc = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=PATH,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+    except OSError:
+        return None
+    out, err = proc.communicate()
+    if proc.returncode:
+        return None
+    return out.strip()
+
+
+def metadata(timer):
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'twisted': twisted.__version__,
+        'pypentago': pypentago.__version__,
+        'speedup': core.EXTENSION_MODULE,
+        'scale': timer.scale,
+        'repeat': timer.repeat,
+    }
+
+
+def run_all(timer, names=None, previous=None):
+    """ Run the benchmarks and return their results keyed by name. Every
+    result is printed, compared to the one in previous if it has one. """
+    if previous is None:
+        previous = {}
+    results = {}
+    for name, fun in benchmarks(names):
+        for variant, result in fun(timer):
+            key = '%s[%s]' % (name, variant)
+            results[key] = result
+            line = "%-40s %12.3f us" % (key, result['median'] * 1e6)
+            if 'bytes' in result:
+                line += "  %8.2f MB/s" % (result['bytes'] / 1e6 /
+                                          result['median'])
+            if key in previous:
+                line += "  %6.2fx" % (previous[key]['median'] /
+                                      result['median'])
+            print line
+            sys.stdout.flush()
+    return results
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = OptionParser(usage="%prog [options] [names]")
+    parser.add_option("-o", "--output", dest="output", metavar="FILE",
+                      help="write the results to FILE")
+    parser.add_option("-c", "--compare", dest="compare", metavar="FILE",
+                      help="print the speedup over the results in FILE")
+    parser.add_option("-s", "--scale", type="float", dest="scale",
+                      default=1, help="multiply the number of calls by SCALE")
+    parser.add_option("-r", "--repeat", type="int", dest="repeat", default=5,
+                      help="measure every benchmark REPEAT times")
+    parser.add_option("-l", "--list", action="store_true", dest="list",
+                      default=False, help="only list the benchmarks")
+    options, args = parser.parse_args(args)
+
+    if options.list:
+        for name, fun in benchmarks(args):
+            print name
+        return
+
+    previous = None
+    if options.compare is not None:
+        with open(options.compare) as file_obj:
+            previous = loads(file_obj.read())['results']
+
+    timer = Timer(options.scale, options.repeat)
+    results = run_all(timer, args, previous)
+    if options.output is not None:
+        with open(options.output, 'w') as file_obj:
+            file_obj.write(dumps({'metadata': metadata(timer),
+                                  'results': results},
+                                 indent=1, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of Connection dispatching received lines to the handlers
+bound to their keywords. """
+
+from pypentago.network import Connection, expose, require_auth, dumps
+from pypentago.network.wire import json_wire, binary_wire
+from pypentago.network.stats import Stats
+from pypentago.loadtest import wire_turn
+
+from bench import NullTransport, random_game
+
+TURN = wire_turn(random_game(1, 0)[0][1])
+
+
+class Factory(object):
+    def __init__(self):
+        self.clients = []
+
+
+class BenchConnection(Connection):
+    """ Connection with handlers that do as little as possible. """
+    @expose("PING")
+    def ping(self, evt):
+        return "PONG"
+
+    @expose("TURN")
+    @require_auth
+    def turn(self, evt):
+        pass
+
+    @expose("FAIL")
+    def fail(self, evt):
+        raise ValueError
+
+
+def connect(auth=True):
+    """ Return a BenchConnection writing to a NullTransport. """
+    conn = BenchConnection()
+    conn.factory = Factory()
+    conn.makeConnection(NullTransport())
+    conn.auth = auth
+    return conn
+
+
+def encode(keyword, data=None):
+    return dumps([keyword, data]).encode(Connection.encoding)
+
+
+def bench_line_received(timer):
+    """ Dispatch a single line to a handler that answers, to one that
+    needs authentication, to one that raises and to none at all. """
+    lines = [
+        ('answer', True, encode("PING")),
+        ('auth', True, encode("TURN", [1, "TURN", [["", TURN]]])),
+        ('unauthenticated', False, encode("TURN", [1, "TURN", [["", TURN]]])),
+        ('exception', True, encode("FAIL")),
+        ('no handler', True, encode("UNKNOWN")),
+        ('malformed', True, "[\"PING\""),
+    ]
+    for name, auth, line in lines:
+        conn = connect(auth)
+        yield name, timer.measure(lambda: conn.lineReceived(line), 20000)
+    conn = connect()
+    conn.stats = Stats()
+    line = lines[0][2]
+    yield 'answer, stats', timer.measure(lambda: conn.lineReceived(line),
+                                         20000)
+
+
+def bench_data_received(timer):
+    """ Split data holding many lines and dispatch every one of them. """
+    conn = connect()
+    lines = 100
+    data = (encode("PING") + conn.delimiter) * lines
+    result = timer.measure(lambda: conn.dataReceived(data), 200)
+    result['lines'] = lines
+    yield 'PING', result
+
+
+def bench_wire(timer):
+    """ Frame a turn made in a game and decode it again in every wire
+    format. """
+    data = [1, "TURN", [["", TURN]]]
+    for wire in (json_wire(), binary_wire()):
+        frame = wire.frame("GAME", data)
+        message, _ = wire.next(frame, 0, len(frame))
+        result = timer.measure(lambda: wire.frame("GAME", data), 20000)
+        result['bytes'] = len(frame)
+        yield '%s frame' % wire.name, result
+        yield '%s decode' % wire.name, timer.measure(
+            lambda: wire.decode(message), 20000
+        )
+
+
+def bench_connect(timer):
+    """ Create a connection and let it connect, like the server does for
+    every client. """
+    yield 'BenchConnection', timer.measure(connect, 5000)
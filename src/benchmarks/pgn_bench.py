@@ -0,0 +1,54 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of reading PGN replay files. """
+
+import os
+import random
+import tempfile
+
+from pypentago import pgn
+
+from bench import random_game
+
+
+def write_replay(file_name, games):
+    """ Write games random games to file_name, every one preceded by the
+    comments and metadata found in replays. """
+    chunks = []
+    for seed in xrange(games):
+        turns = [turn for player, turn in random_game(24, seed)]
+        chunks.append("# Game %d\n@white Player 1\n@black Player 2\n%s\n"
+                      % (seed, pgn.get_game_pgn(turns)))
+    with open(file_name, 'w') as file_obj:
+        file_obj.write(''.join(chunks))
+
+
+def bench_parse_file(timer):
+    """ Parse a replay of one game and one of many games. """
+    for games in (1, 20):
+        fd, file_name = tempfile.mkstemp(suffix='.pgn')
+        os.close(fd)
+        try:
+            write_replay(file_name, games)
+            turns = len(pgn.parse_file(file_name))
+            result = timer.measure(lambda: pgn.parse_file(file_name),
+                                   200 // games)
+        finally:
+            os.remove(file_name)
+        result['turns'] = turns
+        yield '%d games' % games, result
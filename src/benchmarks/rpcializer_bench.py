@@ -0,0 +1,61 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of turning objects into data that can be sent through the
+network and back again. """
+
+from pypentago import core, rpcializer
+from pypentago.network import dumps, loads
+from pypentago.loadtest import wire_turn
+
+from bench import random_game
+
+TURNS = [wire_turn(turn) for player, turn in random_game(24, 0)]
+
+
+def bench_resolver(timer):
+    """ rpcialize Turn objects with a Resolver and resolve them again. """
+    resolver = rpcializer.StandardResolver()
+    resolver.register(core.Turn)
+    turns = [core.Turn(3 * (quad // 2) + row, 3 * (quad % 2) + col,
+                       rot_dir, rot_quad)
+             for quad, row, col, rot_dir, rot_quad in TURNS]
+
+    def round_trip():
+        for turn in turns:
+            resolver.resolve(resolver.rpcialize(turn))
+    result = timer.measure(round_trip, 1000)
+    result['objects'] = len(turns)
+    yield 'Turn', result
+
+
+def bench_game_message(timer):
+    """ Encode turns the way RemotePlayer sends them, decode them and
+    unrpcialize their arguments the way the other side does. """
+    game = core.Game()
+    game.uid = 1
+    for name in ('Player 1', 'Player 2'):
+        game.add_player(core.Player(name))
+
+    def round_trip():
+        for turn in TURNS:
+            line = dumps(rpcializer.game(game, 'TURN', rpcializer.raw(turn)))
+            keyword, (game_id, cmd, args) = loads(line)
+            list(game.unrpcialize(args))
+    result = timer.measure(round_trip, 1000)
+    result['messages'] = len(TURNS)
+    yield 'TURN', result
@@ -0,0 +1,115 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" Benchmarks of the server handling a number of simulated clients.
+
+The clients do not connect through sockets. Their lines are given to the
+connections of the server directly and what the server answers is written
+to StringTransports, so only the work done by the server is measured. Every
+pair of clients opens and joins a game, plays it and disconnects. """
+
+import random
+
+from twisted.internet import address
+from twisted.python.failure import Failure
+from twisted.test.proto_helpers import StringTransport
+from twisted.internet.error import ConnectionDone
+
+from pypentago.network import dumps, loads
+from pypentago.server import Factory
+from pypentago.loadtest import wire_turn
+
+from bench import random_game
+
+TURNS = [wire_turn(turn) for player, turn in random_game(20, 0)]
+
+CLIENTS = (2, 16, 64)
+
+
+class Client(object):
+    """ A client connected to the server of factory. """
+    def __init__(self, factory, port):
+        self.transport = StringTransport(
+            peerAddress=address.IPv4Address('TCP', '127.0.0.1', port)
+        )
+        self.conn = factory.buildProtocol(self.transport.getPeer())
+        self.conn.makeConnection(self.transport)
+        self.messages = 0
+
+    def send(self, keyword, data=None):
+        self.messages += 1
+        self.conn.lineReceived(
+            dumps([keyword, data]).encode(self.conn.encoding)
+        )
+
+    def received(self):
+        """ Return the (keyword, data) pairs the server sent since the last
+        call. """
+        lines = self.transport.value().split(self.conn.delimiter)
+        self.transport.clear()
+        ret = [loads(line) for line in lines if line]
+        self.messages += len(ret)
+        return ret
+
+    def close(self):
+        self.conn.connectionLost(Failure(ConnectionDone()))
+
+
+def find(messages, keyword):
+    """ Return the data of the first message with keyword. """
+    for kw, data in messages:
+        if kw == keyword:
+            return data
+    raise ValueError("no %s received" % keyword)
+
+
+def session(clients):
+    """ Let clients clients connect, play TURNS in pairs and disconnect.
+    Return the number of lines sent and received. """
+    random.seed(0)
+    factory = Factory(None)
+    conns = [Client(factory, port) for port in xrange(clients)]
+    games = []
+    for host, guest in zip(conns[::2], conns[1::2]):
+        host.send("OPEN", "Game of %s" % host.conn.transport.getPeer().port)
+        gid = find(host.received(), "OPENGAME")
+        guest.send("JOIN", gid)
+        if find(host.received(), "INITGAME")['beginner']:
+            games.append((gid, (host, guest)))
+        else:
+            games.append((gid, (guest, host)))
+        guest.received()
+    for i, turn in enumerate(TURNS):
+        for gid, players in games:
+            players[i % 2].send("GAME", [gid, "TURN", [["", turn]]])
+        for conn in conns:
+            conn.received()
+    for conn in conns:
+        conn.close()
+        for other in conns:
+            other.received()
+    return sum(conn.messages for conn in conns)
+
+
+def bench_session(timer):
+    """ Serve a few, some and many clients at once. """
+    for clients in CLIENTS:
+        messages = session(clients)
+        result = timer.measure(lambda: session(clients), 128 // clients)
+        result['messages'] = messages
+        result['messages_per_second'] = messages / result['median']
+        yield '%d clients' % clients, result
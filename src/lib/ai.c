@@ -14,230 +14,752 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>. */
 
+/* For clock_gettime. */
+#define _POSIX_C_SOURCE 199309L
+
 #include <string.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <math.h>
 
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <time.h>
+#include <pthread.h>
+#endif
+
 #include "constants.h"
 #include "board.h"
+#include "tt.h"
+#include "evaluate.h"
+#include "ai.h"
 
-int longest_row(struct Board* b, char player){
-   int len = 0;
-   int longest = 0;
-   unsigned char r, c;
-   for(r = 0; r <= 5; r++){
-      for(c = 0; c <= 5; c++){
-         if(b->board[r][c] == player){
-            len++;
-         }
-         else{
-            if(len > longest){
-               longest = len;
-            }
-            len = 0;
-         }
-      }
-   }
-   if(len > longest)
-      return len;
-   return longest;
+/* Zobrist key of the player to move, so that positions with the same
+   stones but another player to move get different keys. */
+static const unsigned long long side_key = 0xb2e317b267eb5397ULL;
+
+unsigned long long position_key(struct Board *b, unsigned char *symmetry){
+   /* Return the key of b in the transposition table. Symmetric positions
+      share their entries, moves are stored as they would be played on the
+      image of the board under the symmetry stored in symmetry. */
+   return canonical_key(b, symmetry) ^ (b->colour == BLACK ? side_key : 0);
 }
 
-int longest_col(struct Board* b, char player){
-   int len = 0;
-   int longest = 0;
-   unsigned char r, c;
-   for(c = 0; c <= 5; c++){
-      for(r = 0; r <= 5; r++){
-         if(b->board[r][c] == player){
-            len++;
-         }
-         else{
-            if(len > longest){
-               longest = len;
-            }
-            len = 0;
-         }
-      }
+/* Scores order_turns gives to turns, turns with higher scores are searched
+   first. Turns that are none of these are scored by their history. */
+#define SCORE_PV     (1L << 30)
+#define SCORE_TT     (1L << 29)
+#define SCORE_WIN    (1L << 28)
+#define SCORE_BLOCK  (1L << 27)
+#define SCORE_KILLER (1L << 26)
+
+/* The clock is only looked at every (NODES_PER_CHECK + 1) nodes. */
+#define NODES_PER_CHECK 255
+
+double now_ms(void){
+   /* Return the time in milliseconds passed since some point in the past,
+      which does not change while the program is running. */
+#ifdef _WIN32
+   return (double) GetTickCount();
+#else
+   struct timespec ts;
+   clock_gettime(CLOCK_MONOTONIC, &ts);
+   return ts.tv_sec * 1000.0 + ts.tv_nsec / 1000000.0;
+#endif
+}
+
+void init_search(struct Search *s, struct TT *tt){
+   /* Set up s for searching with the transposition table tt, which may
+      be NULL. */
+   unsigned char p;
+   memset(s, 0, sizeof(struct Search));
+   s->tt = tt;
+   default_weights(&(s->weights));
+   for(p=0; p < MAX_PLY; p++){
+      s->killers[p][0].row = TT_NO_MOVE;
+      s->killers[p][1].row = TT_NO_MOVE;
    }
-   if(len > longest)
-      return len;
-   return longest;
 }
 
-int dia_sum(struct Board* b, char player, char r, char c){
-   int len = 0;
-   int longest = 0;
-   unsigned char x;
-   for(x = 0; x <= (5 - (r || c)); x++){
-      if(b->board[x+r][x+c] == player){
-         len++;
+static int same_turn(struct Turn *a, struct Turn *b){
+   return (a->row == b->row && a->col == b->col && a->quad == b->quad &&
+           a->dir == b->dir);
+}
+
+static void order_turns(struct Search *s, struct Board *b, struct Turn *turns,
+                        long *scores, unsigned short n, struct Turn *tt_move,
+                        int ply){
+   /* Score the turns: the turn of the previous iteration's best line if
+      the position is on it, the move from the transposition table, turns
+      that win right away, turns that block a line the opponent has four
+      stones on, the killer moves of ply, and all others by their
+      history. */
+   struct Turn *pv_move = NULL;
+   unsigned long long blocks = threat_squares(b, 3 - b->colour);
+   /* Only turns setting a stone to one of these can win, so the others
+      need not be tried. */
+   unsigned long long wins = win_squares(b, b->colour);
+   char player = b->colour;
+   unsigned long h;
+   unsigned char sq;
+   unsigned short i;
+   struct Turn *t;
+   if(s->on_pv && ply < s->prev_pv_length)
+      pv_move = &(s->prev_pv[ply]);
+   for(i=0; i < n; i++){
+      t = &turns[i];
+      sq = 6 * t->row + t->col;
+      if(pv_move != NULL && same_turn(t, pv_move)){
+         scores[i] = SCORE_PV;
+         continue;
       }
-      else{
-         if(len > longest){
-            longest = len;
+      if(tt_move->row != TT_NO_MOVE && same_turn(t, tt_move)){
+         scores[i] = SCORE_TT;
+         continue;
+      }
+      if(wins & (1ULL << sq)){
+         do_turn(b, t);
+         if(won_turn(b, t) == player){
+            undo_turn(b, t);
+            scores[i] = SCORE_WIN;
+            continue;
          }
-         len = 0;
+         undo_turn(b, t);
+      }
+      if(blocks & (1ULL << sq))
+         scores[i] = SCORE_BLOCK;
+      else if(same_turn(t, &(s->killers[ply][0])))
+         scores[i] = SCORE_KILLER;
+      else if(same_turn(t, &(s->killers[ply][1])))
+         scores[i] = SCORE_KILLER - 1;
+      else{
+         h = s->history[player - 1][sq][2 * t->quad + t->dir];
+         scores[i] = h < SCORE_KILLER - 2 ? h : SCORE_KILLER - 2;
       }
    }
-   if(len > longest)
-      return len;
-   return longest;
 }
 
-int longest_dia(struct Board* b, char player){
-   int a = dia_sum(b, player, 0, 0);
-   if(a == 6 || a == 5){
-      return a;
-   }
-   int x = dia_sum(b, player, 0, 1);
-   if(x == 5){
-      return 5;
+static void pick_turn(struct Turn *turns, long *scores, unsigned short i,
+                      unsigned short n){
+   /* Swap the turn with the highest score of the ones from i on to i.
+      Doing this lazily is cheaper than sorting, because most of the turns
+      are never looked at after a cutoff. */
+   unsigned short k, best = i;
+   long score;
+   struct Turn t;
+   for(k=i+1; k < n; k++){
+      if(scores[k] > scores[best])
+         best = k;
    }
-   int c = dia_sum(b, player, 1, 0);
-   if(c == 5){
-      return 5;
+   if(best != i){
+      t = turns[i];
+      turns[i] = turns[best];
+      turns[best] = t;
+      score = scores[i];
+      scores[i] = scores[best];
+      scores[best] = score;
    }
-   return max(max(a, x), c);
 }
 
-
-int longest_line(struct Board* b, char player){
-   int d = longest_dia(b, player);
-   if(d == 5 || d == 6){
-      return d;
-   }
-   int r = longest_row(b, player);
-   if(r == 5){
-      return 5;
-   }
-   int c = longest_col(b, player);
-   if(c == 5){
-      return 5;
-   }
-   return max(max(r, c), d);
+static void update_pv(struct Search *s, int ply, struct Turn *t){
+   /* t is the best turn at ply so far, followed by the best line found
+      for the position after it. */
+   unsigned char k;
+   s->pv[ply][ply] = *t;
+   for(k=ply+1; k < s->pv_length[ply+1]; k++)
+      s->pv[ply][k] = s->pv[ply+1][k];
+   s->pv_length[ply] = s->pv_length[ply+1];
 }
 
-float rate(struct Board* b){
-   /* TODO: This needs a lot of love! */
-   int own_line = longest_line(b, b->colour);
-   if(own_line >= 5){
-      return INFINITY;
+static void cutoff(struct Search *s, struct Board *b, struct Turn *t,
+                   long score, unsigned short i, int depth, int ply){
+   /* Remember that t, the i-th turn searched, caused a cutoff. */
+   s->stats.cutoffs++;
+   if(i == 0)
+      s->stats.first_cutoffs++;
+   /* Wins and blocks are found without help. */
+   if(score >= SCORE_BLOCK)
+      return;
+   if(!same_turn(t, &(s->killers[ply][0]))){
+      s->killers[ply][1] = s->killers[ply][0];
+      s->killers[ply][0] = *t;
    }
-   int other_line = longest_line(b, 3 - b->colour);
-   if(other_line >= 5){
-      return -INFINITY;
-   }
-   return own_line - other_line;
+   s->history[b->colour - 1][6 * t->row + t->col][2 * t->quad + t->dir] +=
+      depth * depth;
 }
 
-int lookup(struct Board *b, int depth){
-   /* TODO: Write me! This is supposed to look up whether we already
-      analyzed given position with given depth.*/
-   return -1;
+static float search_turn(struct Search *s, struct Board *b, struct Turn *t,
+                         int depth, int ply, float alpha, float beta,
+                         char first){
+   /* Return the value of making t at ply for the player whose turn it is,
+      searched depth plies deep with the window alpha, beta.
+      
+      With principal variation search, only the first turn is searched with
+      the full window. The others are expected to be worse and searched
+      with a null window, which only tells whether they are better than
+      alpha. Only if they are, they are searched again. */
+   float v;
+   char on_pv = s->on_pv;
+   do_turn(b, t);
+   if(s->pvs && !first && alpha != -INFINITY){
+      v = -alpha_beta(s, b, t, depth-1, ply+1, -nextafterf(alpha, INFINITY),
+                      -alpha);
+      if(v > alpha && v < beta && !s->stopped){
+         s->stats.researches++;
+         s->on_pv = on_pv;
+         v = -alpha_beta(s, b, t, depth-1, ply+1, -beta, -alpha);
+      }
+   }
+   else
+      v = -alpha_beta(s, b, t, depth-1, ply+1, -beta, -alpha);
+   undo_turn(b, t);
+   return v;
 }
 
-float alpha_beta(struct Board *b, int depth, float alpha, float beta){
+float alpha_beta(struct Search *s, struct Board *b, struct Turn *last,
+                 int depth, int ply, float alpha, float beta){
    float v;
+   float alpha_orig;
+   unsigned long long key = 0;
+   unsigned char sym = 0;
    struct Turn t;
+   struct Turn best;
+   struct Turn tt_move;
+   struct Turn turns[MAX_TURNS];
+   long scores[MAX_TURNS];
+   unsigned short i, n;
+   char on_pv = s->on_pv;
+   
+   s->stats.nodes++;
+   s->pv_length[ply] = ply;
+   if((s->stats.nodes & NODES_PER_CHECK) == 0 && s->deadline &&
+      now_ms() >= s->deadline)
+      s->stopped = 1;
+   if(s->stopped)
+      return 0;
    
-   int w = won(b);
-   if(w){
+   /* The position before last has not been won, otherwise we would not
+      have searched its children. Only look at the lines last changed. */
+   int w = won_turn(b, last);
+   if(w == 3)
+      return 0;
+   else if(w){
       if(w == b->colour)
          return INFINITY;
       else{
          return -INFINITY;
       }
    }
-      
-   int l = lookup(b, depth);
-   if(l != -1)
-      return l;
    
    /* Game full or max. depth reached. */
    if(depth == 0 || b->filled == 36){
-      return rate(b);
+      return evaluate(b, b->colour, &(s->weights));
    }
+   
+   tt_move.row = TT_NO_MOVE;
+   if(s->tt != NULL){
+      key = position_key(b, &sym);
+      if(tt_probe(s->tt, key, depth, &alpha, &beta, &v, &tt_move))
+         return v;
+      if(tt_move.row != TT_NO_MOVE)
+         transform_turn(&tt_move, inverse_symmetry(sym));
+   }
+   alpha_orig = alpha;
+   best.row = TT_NO_MOVE;
 
-   unsigned char q, r, c, cw;
-   for(r=0; r <= 5; r++){
-      for(c=0; c <= 5; c++){
-         if(b->board[r][c] != NONE){
-            continue;
-         }
-         for(q=0; q <= 3; q++){
-            for(cw=0; cw <= 1; cw++){
-               t.row = r;
-               t.col = c;
-               t.quad = q;
-               t.dir = cw;
-               do_turn(b, &t);
-               v = -alpha_beta(b, depth-1, -beta, -alpha);
-               undo_turn(b, &t);
-               if(v > alpha)
-                  alpha = v;
-               if(beta <= alpha)
-                  return alpha;
-            }
+   n = legal_turns(b, turns);
+   order_turns(s, b, turns, scores, n, &tt_move, ply);
+   for(i=0; i < n; i++){
+      pick_turn(turns, scores, i, n);
+      t = turns[i];
+      s->on_pv = on_pv && ply < s->prev_pv_length &&
+                 same_turn(&t, &(s->prev_pv[ply]));
+      v = search_turn(s, b, &t, depth, ply, alpha, beta, i == 0);
+      if(s->stopped)
+         return 0;
+      if(v > alpha){
+         alpha = v;
+         best = t;
+         update_pv(s, ply, &t);
+      }
+      if(beta <= alpha){
+         cutoff(s, b, &t, scores[i], i, depth, ply);
+         if(s->tt != NULL){
+            transform_turn(&best, sym);
+            tt_store(s->tt, key, depth, alpha, TT_LOWER, &best);
          }
+         return alpha;
+      }
+   }
+   if(s->tt != NULL){
+      if(alpha > alpha_orig){
+         transform_turn(&best, sym);
+         tt_store(s->tt, key, depth, alpha, TT_EXACT, &best);
       }
+      else
+         tt_store(s->tt, key, depth, alpha, TT_UPPER, NULL);
    }
    return alpha;
 }
 
-struct Turn* best_turn(struct Board *b, int depth){
-   struct Turn* best = (struct Turn*) malloc(sizeof(struct Turn));
-   /* best = NULL; */
+static int search_root(struct Search *s, struct Board *b, int depth,
+                       float alpha, float beta, struct Turn *best){
+   /* Search the position the player whose turn it is is in depth plies
+      deep with the window alpha, beta and put the best turn into best.
+      Return 0 if there is no turn or the search was stopped, 1 otherwise.
+      
+      If the value of best is alpha or less, the value of the position is
+      at most that. If it is beta or more, it is at least that. */
    float v;
+   float alpha_orig = alpha;
    struct Turn t;
+   struct Turn tt_move;
+   struct Turn turns[MAX_TURNS];
+   long scores[MAX_TURNS];
+   unsigned short i, n;
+   unsigned long long key = 0;
+   unsigned char sym = 0;
+   char found = 0;
+   char on_pv = s->on_pv;
+   char flag = TT_EXACT;
    
-   float alpha = -INFINITY;
-   float beta = INFINITY;
+   s->stats.nodes++;
+   s->pv_length[0] = 0;
+   tt_move.row = TT_NO_MOVE;
+   if(s->tt != NULL){
+      /* Only the move is of interest, the depth is never reached. */
+      float a = alpha, bt = beta;
+      key = position_key(b, &sym);
+      tt_probe(s->tt, key, MAX_PLY + 1, &a, &bt, &v, &tt_move);
+      if(tt_move.row != TT_NO_MOVE)
+         transform_turn(&tt_move, inverse_symmetry(sym));
+   }
    
-   unsigned char q, r, c, cw;
-   for(r=0; r <= 5; r++){
-      for(c=0; c <= 5; c++){
-         if(b->board[r][c] != NONE){
-            continue;
-         }
-         for(q=0; q <= 3; q++){
-            for(cw=0; cw <= 1; cw++){
-               t.row = r;
-               t.col = c;
-               t.quad = q;
-               t.dir = cw;
-               do_turn(b, &t);
-               v = -alpha_beta(b, depth-1, -beta, -alpha);
-               undo_turn(b, &t);
-               if(v > alpha){
-                  t.value = v;
-                  alpha = v;
-                  *best = t;
-               }
-               if(beta <= alpha){
-                  return best;
-               }
-            }
-         }
+   n = legal_turns(b, turns);
+   order_turns(s, b, turns, scores, n, &tt_move, 0);
+   for(i=0; i < n; i++){
+      pick_turn(turns, scores, i, n);
+      t = turns[i];
+      s->on_pv = on_pv && s->prev_pv_length &&
+                 same_turn(&t, &(s->prev_pv[0]));
+      v = search_turn(s, b, &t, depth, 0, alpha, beta, i == 0);
+      if(s->stopped)
+         return 0;
+      /* Even if every turn loses, we have to return one. */
+      if(!found || v > alpha){
+         t.value = v;
+         *best = t;
+         found = 1;
+         update_pv(s, 0, &t);
       }
+      if(v > alpha)
+         alpha = v;
+      if(beta <= alpha)
+         break;
+   }
+   if(!found)
+      return 0;
+   if(s->tt != NULL){
+      if(best->value <= alpha_orig)
+         flag = TT_UPPER;
+      else if(best->value >= beta)
+         flag = TT_LOWER;
+      t = *best;
+      transform_turn(&t, sym);
+      tt_store(s->tt, key, depth, best->value, flag, &t);
+   }
+   return 1;
+}
+
+struct Turn* best_turn(struct Search *s, struct Board *b, int depth){
+   /* Return the best turn for the player whose turn it is, or NULL if there
+      is no turn left, the search was stopped or memory could not be
+      allocated. The caller is responsible for freeing the result. */
+   struct Turn* best = (struct Turn*) malloc(sizeof(struct Turn));
+   if(best == NULL)
+      return NULL;
+   if(!search_root(s, b, depth, -INFINITY, INFINITY, best)){
+      free(best);
+      return NULL;
    }
    return best;
 }
 
-struct Turn* find_best(struct Board* b, int max_depth){
+void default_options(struct SearchOptions* options){
+   /* Search 4 plies deep on one thread with a transposition table of the
+      default size. */
+   options->max_depth = 4;
+   options->time_ms = 0;
+   options->tt_size = TT_DEFAULT_SIZE;
+   options->threads = 1;
+   options->seed = -1;
+   options->engine = ENGINE_ALPHA_BETA;
+   options->window = 4;
+   default_weights(&(options->weights));
+}
+
+struct Parallel
+{
+#ifndef _WIN32
+   pthread_mutex_t lock;
+#endif
+   /* The turns at the root in the order they are handed out and the
+      values they got in the last iteration. */
+   struct Turn turns[MAX_TURNS];
+   float values[MAX_TURNS];
+   unsigned short n;
+   int depth;
+   int workers;
+   long seed;
+   /* The first turn is searched before the others are split between
+      the workers, which start with its value as alpha. If seed is
+      negative, the other turns are handed out one at a time in order,
+      next is the one to be handed out next, and alpha is the best value
+      any worker has found in this iteration. */
+   unsigned short next;
+   float alpha;
+};
+
+struct Worker
+{
+   struct Search s;
+   struct Board* b;
+   struct Parallel* p;
+   int id;
+   /* The best turn the worker found in this iteration (an index into
+      p->turns, -1 if there is none), its value and whether that value is
+      exact, not just an upper bound. */
+   int best;
+   float value;
+   char exact;
+};
+
+#ifdef _WIN32
+#define LOCK(p)
+#define UNLOCK(p)
+#else
+#define LOCK(p) pthread_mutex_lock(&((p)->lock))
+#define UNLOCK(p) pthread_mutex_unlock(&((p)->lock))
+#endif
+
+static void* root_worker(void* arg){
+   /* Search turns at the root until there are none left, see Parallel. */
+   struct Worker* w = (struct Worker*) arg;
+   struct Parallel* p = w->p;
+   struct Turn t;
+   float v;
+   float alpha = p->alpha;
+   unsigned short i;
+   /* The first turn of this worker if the shares are fixed. */
+   i = (unsigned short) (1 + ((w->id - p->seed) % p->workers + p->workers) %
+                             p->workers);
+   while(alpha != INFINITY){
+      if(p->seed < 0){
+         LOCK(p);
+         i = p->next++;
+         if(p->alpha > alpha)
+            alpha = p->alpha;
+         UNLOCK(p);
+      }
+      if(i >= p->n)
+         break;
+      t = p->turns[i];
+      w->s.on_pv = w->s.prev_pv_length && same_turn(&t, &(w->s.prev_pv[0]));
+      v = search_turn(&(w->s), w->b, &t, p->depth, 0, alpha, INFINITY, 0);
+      if(w->s.stopped)
+         break;
+      p->values[i] = v;
+      /* Even if every turn loses, we have to return one. */
+      if(w->best < 0 || v > alpha){
+         w->best = i;
+         w->value = v;
+         w->exact = v > alpha || alpha == -INFINITY;
+         t.value = v;
+         update_pv(&(w->s), 0, &t);
+      }
+      if(v > alpha){
+         alpha = v;
+         if(p->seed < 0){
+            LOCK(p);
+            if(alpha > p->alpha)
+               p->alpha = alpha;
+            UNLOCK(p);
+         }
+      }
+      if(p->seed >= 0)
+         i += p->workers;
+   }
+   return NULL;
+}
+
+static int better(struct Worker* w, struct Worker* other){
+   /* Whether the turn w found is better than the one other found. Ties
+      go to exact values and then to the turn searched first. */
+   if(other == NULL || w->value != other->value)
+      return other == NULL || w->value > other->value;
+   if(w->exact != other->exact)
+      return w->exact;
+   return w->best < other->best;
+}
+
+static int parallel_root(struct Parallel* p, struct Worker* workers,
+                         struct Turn* best){
+   /* Search the turns of p on all workers. Put the best one into best and
+      return 1, or return 0 if the search was stopped. */
+   int k, started = 0;
+   struct Worker* w = NULL;
+   struct Turn t;
+   float v;
+#ifndef _WIN32
+   pthread_t threads[p->workers];
+#endif
+   for(k=0; k < p->workers; k++)
+      workers[k].best = -1;
+   /* The first turn is the best one of the last iteration. Its value
+      lets the workers skip most of the others instead of all of them
+      starting with a full window. */
+   w = &workers[0];
+   t = p->turns[0];
+   w->s.on_pv = w->s.prev_pv_length && same_turn(&t, &(w->s.prev_pv[0]));
+   v = search_turn(&(w->s), w->b, &t, p->depth, 0, -INFINITY, INFINITY, 1);
+   if(w->s.stopped)
+      return 0;
+   p->values[0] = v;
+   w->best = 0;
+   w->value = v;
+   w->exact = 1;
+   t.value = v;
+   update_pv(&(w->s), 0, &t);
+   w = NULL;
+   p->next = 1;
+   p->alpha = v;
+#ifndef _WIN32
+   for(k=1; k < p->workers; k++){
+      if(pthread_create(&threads[k], NULL, root_worker, &workers[k]) != 0)
+         break;
+      started = k;
+   }
+#endif
+   /* If threads could not be created, this thread does their work. */
+   for(k=started+1; k < p->workers; k++)
+      root_worker(&workers[k]);
+   root_worker(&workers[0]);
+#ifndef _WIN32
+   for(k=1; k <= started; k++)
+      pthread_join(threads[k], NULL);
+#endif
+   for(k=0; k < p->workers; k++){
+      if(workers[k].s.stopped)
+         return 0;
+      if(workers[k].best >= 0 && better(&workers[k], w))
+         w = &workers[k];
+   }
+   *best = p->turns[w->best];
+   best->value = w->value;
+   /* Search the best turn first next time, the others by their value. */
+   for(k=0; k < p->workers; k++){
+      memcpy(workers[k].s.prev_pv, w->s.pv[0], sizeof(w->s.prev_pv));
+      workers[k].s.prev_pv_length = w->s.pv_length[0];
+   }
+   p->values[w->best] = INFINITY;
+   for(k=1; k < p->n; k++){
+      struct Turn t = p->turns[k];
+      float v = p->values[k];
+      int m = k;
+      for(; m > 0 && p->values[m-1] < v; m--){
+         p->turns[m] = p->turns[m-1];
+         p->values[m] = p->values[m-1];
+      }
+      p->turns[m] = t;
+      p->values[m] = v;
+   }
+   return 1;
+}
+
+static int parallel_search(struct Board* b, struct SearchOptions* o,
+                           struct SearchResult* result){
+   /* Like search, but with the turns at the root split between
+      o->threads threads. Every thread has its own transposition table. */
+   int d, k, ret = -1;
+   double start = now_ms();
+   long scores[MAX_TURNS];
+   struct Turn no_move;
+   struct Turn t;
+   struct Parallel* p;
+   struct Worker* workers;
+   
+   p = (struct Parallel*) malloc(sizeof(struct Parallel));
+   workers = (struct Worker*) calloc(o->threads, sizeof(struct Worker));
+   if(p == NULL || workers == NULL){
+      free(p);
+      free(workers);
+      return -1;
+   }
+#ifndef _WIN32
+   pthread_mutex_init(&(p->lock), NULL);
+#endif
+   p->workers = o->threads;
+   p->seed = o->seed;
+   for(k=0; k < p->workers; k++){
+      init_search(&(workers[k].s), NULL);
+      workers[k].s.pvs = o->engine == ENGINE_PVS;
+      workers[k].s.weights = o->weights;
+      workers[k].id = k;
+      workers[k].p = p;
+      workers[k].b = copy_board(b);
+      if(workers[k].b == NULL)
+         goto cleanup;
+      if(o->tt_size){
+         workers[k].s.tt = tt_new(o->tt_size / p->workers);
+         if(workers[k].s.tt == NULL)
+            goto cleanup;
+      }
+   }
+   
+   p->n = legal_turns(b, p->turns);
+   no_move.row = TT_NO_MOVE;
+   order_turns(&(workers[0].s), b, p->turns, scores, p->n, &no_move, 0);
+   for(k=0; k < p->n; k++)
+      pick_turn(p->turns, scores, k, p->n);
+   
+   for(d=1; d <= o->max_depth; d++){
+      p->depth = d;
+      if(!parallel_root(p, workers, &t))
+         break;
+      result->best = t;
+      result->depth = d;
+      memcpy(result->pv, workers[0].s.prev_pv, sizeof(result->pv));
+      result->pv_length = workers[0].s.prev_pv_length;
+      if(isinf(t.value))
+         break;
+      if(o->time_ms > 0){
+         if(now_ms() - start >= o->time_ms)
+            break;
+         for(k=0; k < p->workers; k++)
+            workers[k].s.deadline = start + o->time_ms;
+      }
+   }
+   for(k=0; k < p->workers; k++){
+      result->stats.nodes += workers[k].s.stats.nodes;
+      result->stats.cutoffs += workers[k].s.stats.cutoffs;
+      result->stats.first_cutoffs += workers[k].s.stats.first_cutoffs;
+      result->stats.researches += workers[k].s.stats.researches;
+   }
+   ret = result->depth > 0;
+cleanup:
+   for(k=0; k < p->workers; k++){
+      if(workers[k].b != NULL)
+         free_board(workers[k].b);
+      if(workers[k].s.tt != NULL)
+         tt_free(workers[k].s.tt);
+   }
+#ifndef _WIN32
+   pthread_mutex_destroy(&(p->lock));
+#endif
+   free(workers);
+   free(p);
+   return ret;
+}
+
+int search(struct Board* b, struct SearchOptions* o,
+           struct SearchResult* result){
+   /* Search the best turn for the player whose turn it is, one ply deeper
+      at a time, until o->max_depth plies have been searched or o->time_ms
+      milliseconds have passed. Every iteration searches the best line of
+      the previous one first. The first one is always completed, so there
+      is a turn even if time runs out.
+      
+      Put the result of the deepest completed iteration into result and
+      return 1. Return 0 if there is no turn and -1 if memory could not be
+      allocated. */
    int d;
-   char first=1;
-   struct Turn* best = (struct Turn*) malloc(sizeof(struct Turn));
-   struct Turn* t;
-   for(d=1; d <= max_depth; d++){
-      t = best_turn(b, d);
-      if(first || t->value > best->value){
-         *best = *t;
-         first = 0;
+   float alpha, beta;
+   double start = now_ms();
+   struct TT* tt = NULL;
+   struct Search s;
+   struct Turn t;
+   
+   memset(result, 0, sizeof(struct SearchResult));
+   if(b->filled >= 36)
+      return 0;
+   if(o->threads > 1)
+      return parallel_search(b, o, result);
+   if(o->tt_size){
+      tt = tt_new(o->tt_size);
+      if(tt == NULL)
+         return -1;
+   }
+   init_search(&s, tt);
+   s.pvs = o->engine == ENGINE_PVS;
+   s.weights = o->weights;
+   for(d=1; d <= o->max_depth; d++){
+      memcpy(s.prev_pv, s.pv[0], sizeof(s.prev_pv));
+      s.prev_pv_length = s.pv_length[0];
+      alpha = -INFINITY;
+      beta = INFINITY;
+      if(s.pvs && o->window > 0 && d > 1){
+         alpha = result->best.value - o->window;
+         beta = result->best.value + o->window;
+      }
+      s.on_pv = 1;
+      if(!search_root(&s, b, d, alpha, beta, &t))
+         break;
+      /* The value is outside of the window, search again with the side
+         it failed on opened. */
+      while((t.value <= alpha && alpha != -INFINITY) ||
+            (t.value >= beta && beta != INFINITY)){
+         if(t.value <= alpha)
+            alpha = -INFINITY;
+         else
+            beta = INFINITY;
+         s.stats.researches++;
+         s.on_pv = 1;
+         if(!search_root(&s, b, d, alpha, beta, &t))
+            break;
+      }
+      if(s.stopped)
+         break;
+      result->best = t;
+      result->depth = d;
+      memcpy(result->pv, s.pv[0], sizeof(result->pv));
+      result->pv_length = s.pv_length[0];
+      /* Searching deeper does not change a win or a loss. */
+      if(isinf(t.value))
+         break;
+      if(o->time_ms > 0){
+         if(now_ms() - start >= o->time_ms)
+            break;
+         s.deadline = start + o->time_ms;
       }
-      free(t);
    }
+   result->stats = s.stats;
+   if(tt != NULL)
+      tt_free(tt);
+   return result->depth > 0;
+}
+
+struct Turn* find_best(struct Board* b, int max_depth, unsigned long tt_size,
+                       struct SearchStats* stats){
+   /* Return the best turn found searching up to max_depth plies using a
+      transposition table of about tt_size bytes (none if tt_size is 0),
+      or NULL if there is none or memory could not be allocated. If stats
+      is not NULL, the statistics of the search are stored in it. The
+      caller is responsible for freeing the result. */
+   struct SearchOptions options;
+   struct SearchResult result;
+   struct Turn* best;
+   default_options(&options);
+   options.max_depth = max_depth;
+   options.tt_size = tt_size;
+   if(search(b, &options, &result) <= 0)
+      return NULL;
+   best = (struct Turn*) malloc(sizeof(struct Turn));
+   if(best == NULL)
+      return NULL;
+   *best = result.best;
+   if(stats != NULL)
+      *stats = result.stats;
    return best;
 }
 
@@ -291,13 +813,19 @@ int main(){
          break;
       }
       printf("Pondering...\n");
-      best = find_best(b, depth);
+      best = find_best(b, depth, TT_DEFAULT_SIZE, NULL);
+      if(best == NULL){
+         printf("Draw!\n");
+         break;
+      }
       do_turn(b, best);
+      free_turn(best);
       if(won(b)){
          print_board(b);
          printf("The AI beat you!\n");
          break;
       }
    }
+   free_board(b);
    return 0;
 }
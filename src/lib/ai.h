@@ -1,12 +1,100 @@
+/* Number of plies killer moves are kept for, no game is longer. */
+#define MAX_PLY 36
+
+/* The algorithms search can use, see SearchOptions. */
+#define ENGINE_ALPHA_BETA 0
+#define ENGINE_PVS 1
+
+struct SearchStats
+{
+   /* Positions visited. */
+   unsigned long nodes;
+   /* Positions searching was stopped in because a turn was too good. */
+   unsigned long cutoffs;
+   /* Cutoffs that happened at the first turn searched. */
+   unsigned long first_cutoffs;
+   /* Turns and iterations that had to be searched again because a
+      narrowed window turned out to be wrong. */
+   unsigned long researches;
+};
+
+struct Search
+{
+   /* Transposition table, NULL if none is used. */
+   struct TT* tt;
+   /* The last two turns that caused a cutoff at every ply. */
+   struct Turn killers[MAX_PLY][2];
+   /* history[player - 1][6 * row + col][2 * quad + dir] is the sum of
+      depth * depth over the cutoffs the turn caused. */
+   unsigned long history[2][36][8];
+   /* pv[ply][ply] to pv[ply][pv_length[ply] - 1] is the best line of
+      play found from the position at ply on. */
+   struct Turn pv[MAX_PLY + 1][MAX_PLY + 1];
+   unsigned char pv_length[MAX_PLY + 1];
+   /* The best line of the previous iteration, which is searched first,
+      and whether the position searched is on it. */
+   struct Turn prev_pv[MAX_PLY + 1];
+   unsigned char prev_pv_length;
+   char on_pv;
+   /* Time (see now_ms) the search has to be stopped at, 0 for never.
+      stopped is set once it has passed, the values found afterwards are
+      of no use. */
+   double deadline;
+   char stopped;
+   /* Whether to use principal variation search, see search_turn. */
+   char pvs;
+   /* Weights of the evaluation at the leaves. */
+   struct Weights weights;
+   struct SearchStats stats;
+};
+
+struct SearchOptions
+{
+   /* Stop after max_depth plies or time_ms milliseconds, whatever comes
+      first. time_ms may be 0 for no time limit. */
+   int max_depth;
+   long time_ms;
+   /* Memory in bytes the transposition tables may use, 0 for none. */
+   unsigned long tt_size;
+   /* Number of threads the turns at the root are split between. */
+   int threads;
+   /* If seed is not negative, every thread gets a fixed share of the
+      turns at the root depending on seed only, and the threads do not
+      share bounds. The search is then reproducible, but slower. */
+   long seed;
+   /* ENGINE_ALPHA_BETA searches every turn with the full window.
+      ENGINE_PVS uses principal variation search, see window. */
+   char engine;
+   /* With ENGINE_PVS on a single thread, every iteration is started with
+      a window of window around the value of the previous one. window may
+      be 0 for a full window. */
+   float window;
+   /* Weights of the evaluation at the leaves. */
+   struct Weights weights;
+};
+
+struct SearchResult
+{
+   /* The best turn of the deepest iteration that was completed, with its
+      value. */
+   struct Turn best;
+   int depth;
+   /* The line of play expected after (and including) best. */
+   struct Turn pv[MAX_PLY + 1];
+   unsigned char pv_length;
+   struct SearchStats stats;
+};
+
 int main();
 struct Turn prompt_turn();
-struct Turn *find_best(struct Board *b,int max_depth);
-struct Turn *best_turn(struct Board *b,int depth);
-float alpha_beta(struct Board *b,int depth,float alpha,float beta);
-int lookup(struct Board *b,int depth);
-float rate(struct Board *b);
-int longest_line(struct Board *b,char player);
-int longest_dia(struct Board *b,char player);
-int dia_sum(struct Board *b,char player,char r,char c);
-int longest_col(struct Board *b,char player);
-int longest_row(struct Board *b,char player);
+struct Turn *find_best(struct Board *b,int max_depth,unsigned long tt_size,
+                       struct SearchStats *stats);
+void default_options(struct SearchOptions *options);
+int search(struct Board *b,struct SearchOptions *options,
+           struct SearchResult *result);
+double now_ms(void);
+void init_search(struct Search *s,struct TT *tt);
+struct Turn *best_turn(struct Search *s,struct Board *b,int depth);
+float alpha_beta(struct Search *s,struct Board *b,struct Turn *last,
+                 int depth,int ply,float alpha,float beta);
+unsigned long long position_key(struct Board *b,unsigned char *symmetry);
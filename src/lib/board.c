@@ -52,7 +52,7 @@ unsigned char get(struct Board* b, unsigned char row, unsigned char col){
 void set(struct Board* b, unsigned char row, unsigned char col,
          unsigned char v){
    b->filled++;
-   b->board[row][col] = v;
+   put(b, row, col, v);
 }
 
 void set_value(struct Board* b, unsigned char quad, 
@@ -60,130 +60,399 @@ void set_value(struct Board* b, unsigned char quad,
    int r = 3 * quad_row(quad);
    int c = 3 * quad_col(quad);
    b->filled++;
-   b->board[r+row][c+col] = v;
+   put(b, r+row, c+col, v);
 }
 
 /* End of helper functions */
 
-char won_row(struct Board* b, unsigned char r){
-   unsigned char c, check, winner, imp_set;
-   winner = imp_set = 0;
-   for(check=1; check <= 2; check++){
-      if(imp_set)
-         break;
-      for(c=1; c < 5; c++){
-         if(b->board[r][c] != check){
-            winner = 0;
-            break;
-         }
-         else{
-            imp_set = 1;
-            winner = check;
-         }
+/* lines[i] are the squares (indices into the flattened board) of the i-th
+   of the 32 ways of getting five in a row. The order is the same as the one
+   of WIN_MASKS in pypentago.board. */
+static const unsigned char lines[32][5] = {
+   /* Rows */
+   { 0,  1,  2,  3,  4}, { 1,  2,  3,  4,  5}, { 6,  7,  8,  9, 10},
+   { 7,  8,  9, 10, 11}, {12, 13, 14, 15, 16}, {13, 14, 15, 16, 17},
+   {18, 19, 20, 21, 22}, {19, 20, 21, 22, 23}, {24, 25, 26, 27, 28},
+   {25, 26, 27, 28, 29}, {30, 31, 32, 33, 34}, {31, 32, 33, 34, 35},
+   /* Columns */
+   { 0,  6, 12, 18, 24}, { 1,  7, 13, 19, 25}, { 2,  8, 14, 20, 26},
+   { 3,  9, 15, 21, 27}, { 4, 10, 16, 22, 28}, { 5, 11, 17, 23, 29},
+   { 6, 12, 18, 24, 30}, { 7, 13, 19, 25, 31}, { 8, 14, 20, 26, 32},
+   { 9, 15, 21, 27, 33}, {10, 16, 22, 28, 34}, {11, 17, 23, 29, 35},
+   /* Diagonals from the upper left to the lower right */
+   { 0,  7, 14, 21, 28}, { 1,  8, 15, 22, 29}, { 6, 13, 20, 27, 34},
+   { 7, 14, 21, 28, 35},
+   /* Diagonals from the upper right to the lower left */
+   { 5, 10, 15, 20, 25}, { 4,  9, 14, 19, 24}, {11, 16, 21, 26, 31},
+   {10, 15, 20, 25, 30}
+};
+
+/* Bit i of square_lines[s] is set if lines[i] contains the square s. */
+static const unsigned long square_lines[36] = {
+   0x01001001UL, 0x02002003UL, 0x00004003UL,
+   0x00008003UL, 0x20010003UL, 0x10020002UL,
+   0x04041004UL, 0x0908200cUL, 0x0210400cUL,
+   0x2020800cUL, 0x9041000cUL, 0x40820008UL,
+   0x00041010UL, 0x04082030UL, 0x29104030UL,
+   0x92208030UL, 0x40410030UL, 0x00820020UL,
+   0x00041040UL, 0x200820c0UL, 0x941040c0UL,
+   0x492080c0UL, 0x024100c0UL, 0x00820080UL,
+   0x20041100UL, 0x90082300UL, 0x40104300UL,
+   0x04208300UL, 0x09410300UL, 0x02820200UL,
+   0x80040400UL, 0x40080c00UL, 0x00100c00UL,
+   0x00200c00UL, 0x04400c00UL, 0x08800800UL
+};
+
+/* Bit i of quad_lines[q] is set if lines[i] crosses the quadrant q. */
+static const unsigned long quad_lines[4] = {
+   0x2f1c703fUL, 0xf2e3803fUL, 0xf41c7fc0UL, 0x4fe38fc0UL
+};
+
+char won_lines(struct Board* b, unsigned long mask){
+   /* Only look at the lines whose bit is set in mask. Return the player
+      who has five in a row on one of them, 3 if both have and 0 if
+      nobody has. */
+   const char* s = &(b->board[0][0]);
+   const unsigned char* l;
+   char winner = 0;
+   char v;
+   unsigned char i;
+   for(i = 0; mask; i++, mask >>= 1){
+      if(!(mask & 1))
+         continue;
+      l = lines[i];
+      v = s[l[0]];
+      if(v && v != winner && s[l[1]] == v && s[l[2]] == v && s[l[3]] == v &&
+         s[l[4]] == v){
+         if(winner)
+            return 3;
+         winner = v;
       }
-      if(winner && b->board[r][0] != check && b->board[r][5] != check)
-         return 0;
    }
    return winner;
 }
 
-char won_col(struct Board* b, unsigned char c){
-   unsigned char r, check, winner, imp_set;
-   winner = imp_set = 0;
-   for(check=1; check <= 2; check++){
-      if(imp_set)
-         break;
-      for(r=1; r < 5; r++){
-         if(b->board[r][c] != check){
-            winner = 0;
-            break;
-         }
-         else{
-            imp_set = 1;
-            winner = check;
-         }
+unsigned long long threat_squares(struct Board* b, char player){
+   /* Return the squares player needs to complete one of the lines he has
+      four stones on, bit 6 * row + col being set for the square at row,
+      col. Rotations are not taken into account. */
+   const char* s = &(b->board[0][0]);
+   const unsigned char* l;
+   unsigned long long squares = 0;
+   unsigned char i, k, own, empty;
+   for(i = 0; i < 32; i++){
+      l = lines[i];
+      own = 0;
+      empty = 0;
+      for(k = 0; k < 5; k++){
+         if(s[l[k]] == player)
+            own++;
+         else if(s[l[k]] == NONE)
+            empty = l[k] + 1;
       }
-      if(winner && b->board[0][c] != check && b->board[5][c] != check)
-         return 0;
+      if(own == 4 && empty)
+         squares |= 1ULL << (empty - 1);
    }
-   return winner;
+   return squares;
 }
 
-char won_dia(struct Board* b, unsigned char r, unsigned char c){
-    int match=0, x;
-    /* Create a bit mask of stones. Player 1's stones set odd bits to 1,
-       player 2's stones set even bits to 1. Bit 0 is always 0. */
-    for (x=0; x != 6-(r ? r : c); ++x)
-        match |= (b->board[r+x][c+x] << (2*x + 1));
-    /* 2730 == 101010101010 (6 stones of player 1 in a row) */
-    x = (match & 2730);
-    /* x > 2727 checks for 5 or 6 stones of player 1 at the end
-       x == 682  checks for 5 stones of player 1 at the beginning */
-    if (x > 2727 || x == 682)
-        return 1;
-    /* 5460 == 1010101010100 (6 stones of player 2 in a row) */
-    x = (match & 5460);
-    /* x > 5455 checks for 5 or 6 stones of player 2 at the end
-       x == 1364 checks for 5 stones of player 2 at the beginning */
-    if (x > 5455 || x == 1364)
-        return 2;
-    else
-        return 0;
+char won_turn(struct Board* b, struct Turn* t){
+   /* A turn can only complete lines crossing the square the stone was
+      set to or the quadrant that was rotated. */
+   return won_lines(b, square_lines[6 * t->row + t->col] |
+                       quad_lines[t->quad]);
 }
 
 char won(struct Board* b){
-   unsigned char r, w;
-   for(r=0; r < 6; r++){
-      w = won_row(b, r);
-      if(w != 0)
-         return w;
-      w = won_col(b, r);
-      if(w != 0)
-         return w;
+   return won_lines(b, 0xffffffffUL);
+}
+
+/* Zobrist keys of the squares of a quadrant. zobrist_keys[i][player - 1]
+   is the key of a stone of player on square i = 3 * row + col relative to
+   the quadrant. The key for a square of quadrant q is that key rotated
+   left by 16 * q bits. The keys are the first numbers returned by
+   splitmix64 seeded with 0x70656e7461676f. */
+static const unsigned long long zobrist_keys[9][2] = {
+   {0xb7a2e0f846142867ULL, 0xf35e89f789c711e0ULL},
+   {0xf8d605c7dfcd3fd0ULL, 0x40fabbae22f6a47eULL},
+   {0x8f2ec6b9cc9b68ceULL, 0x62774387e7a9e162ULL},
+   {0x1271ccf7fdde7c48ULL, 0xcb648dca1693fb39ULL},
+   {0x88ae5c5f21ac12a8ULL, 0x7231ab565304388eULL},
+   {0xfd3e68ae7a1e4c33ULL, 0x94ce08e8e8498441ULL},
+   {0xea79f52b92719a5eULL, 0x0e0dce3fa499866dULL},
+   {0xcaffa1870eee03fcULL, 0x14063ee12cea2dbaULL},
+   {0x1446c062b7de4ac9ULL, 0x604459a8f55ab082ULL}
+};
+
+static unsigned long long rotl(unsigned long long x, int n){
+   return n ? (x << n) | (x >> (64 - n)) : x;
+}
+
+/* The 8 symmetries of the board are numbered 4 * flip + k. Symmetry s
+   rotates the board k times clockwise and then mirrors it left to right if
+   flip is 1. Every symmetry maps quadrants to quadrants and transforms the
+   squares within them the same way it transforms the board.
+   
+   transformed_square[s][i] is the square i of a quadrant is moved to by
+   symmetry s and symmetric_quad[s][q] the quadrant q is moved to. */
+static const unsigned char transformed_square[8][9] = {
+   {0, 1, 2, 3, 4, 5, 6, 7, 8},
+   {2, 5, 8, 1, 4, 7, 0, 3, 6},
+   {8, 7, 6, 5, 4, 3, 2, 1, 0},
+   {6, 3, 0, 7, 4, 1, 8, 5, 2},
+   {2, 1, 0, 5, 4, 3, 8, 7, 6},
+   {0, 3, 6, 1, 4, 7, 2, 5, 8},
+   {6, 7, 8, 3, 4, 5, 0, 1, 2},
+   {8, 5, 2, 7, 4, 1, 6, 3, 0}
+};
+
+static const unsigned char symmetric_quad[8][4] = {
+   {0, 1, 2, 3},
+   {1, 3, 0, 2},
+   {3, 2, 1, 0},
+   {2, 0, 3, 1},
+   {1, 0, 3, 2},
+   {0, 2, 1, 3},
+   {2, 3, 0, 1},
+   {3, 1, 2, 0}
+};
+
+static void toggle(struct Board* b, unsigned char row, unsigned char col,
+                   char v){
+   /* Add or remove the keys of a stone of player v on row, col to or from
+      the hashes of the board. */
+   int quad = 2 * (row >= 3) + (col >= 3);
+   int i = 3 * (row % 3) + col % 3;
+   unsigned char k, j;
+   if(!v)
+      return;
+   for(k = 0; k < 4; k++){
+      j = (b->qrot[quad] + k) & 3;
+      b->qhash[quad][j] ^= zobrist_keys[transformed_square[k][i]][v - 1];
+      b->qhash[quad][4 + j] ^=
+         zobrist_keys[transformed_square[4 + k][i]][v - 1];
    }
-   w = won_dia(b, 0, 0);
-   if(w != 0)
-      return w;
-   w = won_dia(b, 0, 1);
-   if(w != 0)
-      return w;
-   return won_dia(b, 1, 0);
+   b->hash ^= rotl(zobrist_keys[i][v - 1], 16 * quad);
 }
 
-void rotate_cw(struct Board* b, int quad){
-   int row = 3 * quad_row(quad);
-   int col = 3 * quad_col(quad);
-   char q[3][3];
+void put(struct Board* b, unsigned char row, unsigned char col, char v){
+   /* Set the square row, col to v and keep the hashes up-to-date. This
+      does not change the filled counter. */
+   toggle(b, row, col, b->board[row][col]);
+   b->board[row][col] = v;
+   toggle(b, row, col, v);
+}
+
+unsigned long long zobrist(struct Board* b){
+   /* Return the Zobrist hash of the stones on the board. This is what
+      b->hash is kept at, but computed from scratch. */
+   unsigned long long h = 0;
    unsigned char r, c;
-   for(r = 0; r <= 2; r++){
-      for(c = 0; c <= 2; c++){
-         q[r][c] = b->board[row+r][col+c];
+   char v;
+   for(r = 0; r <= 5; r++){
+      for(c = 0; c <= 5; c++){
+         v = b->board[r][c];
+         if(v)
+            h ^= rotl(zobrist_keys[3 * (r % 3) + c % 3][v - 1],
+                      16 * (2 * (r >= 3) + (c >= 3)));
       }
    }
+   return h;
+}
 
-   for(r = 0; r <= 2; r++){
-      for(c = 0; c <= 2; c++){
-         b->board[row+c][col+2-r] = q[r][c];
+unsigned long long canonical_key(struct Board* b, unsigned char* symmetry){
+   /* Return the smallest Zobrist hash of the 8 symmetric images of the
+      board. If symmetry is not NULL, store the symmetry whose image has
+      that hash in it. Positions that are symmetric to each other get the
+      same key. */
+   unsigned long long h, min = 0;
+   unsigned char s, q, flip, k;
+   for(s = 0; s < 8; s++){
+      flip = s & 4;
+      k = s & 3;
+      h = 0;
+      for(q = 0; q < 4; q++)
+         h ^= rotl(b->qhash[q][flip | ((b->qrot[q] + k) & 3)],
+                   16 * symmetric_quad[s][q]);
+      if(s == 0 || h < min){
+         min = h;
+         if(symmetry != NULL)
+            *symmetry = s;
       }
    }
+   return min;
 }
 
-void rotate_ccw(struct Board* b, int quad){
-   int row = 3 * quad_row(quad);
-   int col = 3 * quad_col(quad);
-   char q[3][3];
-   unsigned char r, c;
-   for(r = 0; r <= 2; r++){
-      for(c = 0; c <= 2; c++){
-         q[r][c] = b->board[row+r][col+c];
+void transform_turn(struct Turn* t, unsigned char symmetry){
+   /* Change t into the turn that has the same effect on the image of the
+      board under symmetry as t has on the board. */
+   unsigned char k, tmp;
+   for(k = 0; k < (symmetry & 3); k++){
+      tmp = t->row;
+      t->row = t->col;
+      t->col = 5 - tmp;
+   }
+   if(symmetry & 4){
+      t->col = 5 - t->col;
+      /* A mirror image rotates the other way round. */
+      t->dir = !t->dir;
+   }
+   t->quad = symmetric_quad[symmetry][t->quad];
+}
+
+unsigned char inverse_symmetry(unsigned char symmetry){
+   /* Mirroring undoes itself, so do the symmetries that mirror. */
+   if(symmetry & 4)
+      return symmetry;
+   return (4 - symmetry) & 3;
+}
+
+/* Number of slots of the set legal_turns uses to find duplicates. */
+#define SEEN_SIZE 512
+
+unsigned short legal_turns(struct Board* b, struct Turn* turns){
+   /* Store the turns the player whose turn it is can make in turns, which
+      needs room for MAX_TURNS of them, and return how many there are.
+      Turns that result in the same position as an earlier one, e.g. by
+      rotating an empty quadrant or a symmetric one, are left out.
+      
+      The hash of the position after a turn is computed from the
+      per-quadrant hashes without making the turn. */
+   unsigned long long seen[SEEN_SIZE];
+   unsigned long long delta[4][2];
+   unsigned long long placed, key, d;
+   unsigned char r, c, q, dir, p, i, k;
+   unsigned char v = b->colour - 1;
+   unsigned short n = 0, slot;
+   
+   memset(seen, 0, sizeof(seen));
+   /* delta[q][dir] is what rotating q in dir XORs into the hash of q.
+      Clockwise is one rotation forward, counter-clockwise three. */
+   for(q = 0; q < 4; q++)
+      for(dir = 0; dir < 2; dir++)
+         delta[q][dir] = b->qhash[q][b->qrot[q]] ^
+                         b->qhash[q][(b->qrot[q] + (dir == CW ? 1 : 3)) & 3];
+   
+   for(r = 0; r < 6; r++){
+      for(c = 0; c < 6; c++){
+         if(b->board[r][c] != NONE)
+            continue;
+         p = 2 * (r >= 3) + (c >= 3);
+         i = 3 * (r % 3) + c % 3;
+         placed = b->hash ^ rotl(zobrist_keys[i][v], 16 * p);
+         for(q = 0; q < 4; q++){
+            for(dir = 0; dir < 2; dir++){
+               d = delta[q][dir];
+               if(q == p){
+                  /* The new stone is rotated too. */
+                  k = dir == CW ? 1 : 3;
+                  d ^= zobrist_keys[i][v] ^
+                       zobrist_keys[transformed_square[k][i]][v];
+               }
+               key = placed ^ rotl(d, 16 * q);
+               /* No position reachable by a turn has the hash 0 of the
+                  empty board, so 0 marks empty slots. */
+               slot = key & (SEEN_SIZE - 1);
+               while(seen[slot] && seen[slot] != key)
+                  slot = (slot + 1) & (SEEN_SIZE - 1);
+               if(seen[slot])
+                  continue;
+               seen[slot] = key;
+               turns[n].row = r;
+               turns[n].col = c;
+               turns[n].quad = q;
+               turns[n].dir = dir;
+               turns[n].value = 0;
+               n++;
+            }
+         }
       }
    }
+   return n;
+}
 
-   for(r = 0; r <= 2; r++){
-      for(c = 0; c <= 2; c++){
-         b->board[row+c][col+2-r] = q[2-r][2-c];
+unsigned short all_turns(struct Board* b, struct Turn* turns){
+   /* Store every turn the player whose turn it is can make in turns, in
+      the order of legal_turns, and return how many there are. */
+   unsigned char r, c, q, dir;
+   unsigned short n = 0;
+   for(r = 0; r < 6; r++){
+      for(c = 0; c < 6; c++){
+         if(b->board[r][c] != NONE)
+            continue;
+         for(q = 0; q < 4; q++){
+            for(dir = 0; dir < 2; dir++){
+               turns[n].row = r;
+               turns[n].col = c;
+               turns[n].quad = q;
+               turns[n].dir = dir;
+               turns[n].value = 0;
+               n++;
+            }
+         }
       }
    }
+   return n;
+}
+
+unsigned long long perft(struct Board* b, int depth, char distinct){
+   /* Return the number of ways to make depth turns in a row, starting with
+      the player whose turn it is. The game ends once somebody has five in
+      a row, so no turns are made after that. If distinct is set, only the
+      turns legal_turns returns are made. */
+   struct Turn turns[MAX_TURNS];
+   unsigned long long nodes = 0;
+   unsigned short i, n;
+   if(depth <= 0)
+      return 1;
+   n = distinct ? legal_turns(b, turns) : all_turns(b, turns);
+   for(i = 0; i < n; i++){
+      do_turn(b, &turns[i]);
+      if(depth == 1)
+         nodes++;
+      else if(!won_turn(b, &turns[i]))
+         nodes += perft(b, depth - 1, distinct);
+      undo_turn(b, &turns[i]);
+   }
+   return nodes;
+}
+
+/* rotation_cycles[quad][dir] are the two cycles of four squares (indices
+   into the flattened board) the stones move along when quad is rotated in
+   direction dir. The stone on the first square moves to the second one,
+   and so forth. The square in the middle of the quadrant never moves. */
+static const unsigned char rotation_cycles[4][2][8] = {
+   /* CCW */                              /* CW */
+   {{ 0, 12, 14,  2,  1,  6, 13,  8}, { 0,  2, 14, 12,  1,  8, 13,  6}},
+   {{ 3, 15, 17,  5,  4,  9, 16, 11}, { 3,  5, 17, 15,  4, 11, 16,  9}},
+   {{18, 30, 32, 20, 19, 24, 31, 26}, {18, 20, 32, 30, 19, 26, 31, 24}},
+   {{21, 33, 35, 23, 22, 27, 34, 29}, {21, 23, 35, 33, 22, 29, 34, 27}}
+};
+
+void rotate(struct Board* b, int quad, int dir){
+   char* s = &(b->board[0][0]);
+   const unsigned char* cycle = rotation_cycles[quad][dir];
+   unsigned long long old = b->qhash[quad][b->qrot[quad]];
+   char tmp;
+   unsigned char i;
+   /* Clockwise is one rotation forward, counter-clockwise three. */
+   b->qrot[quad] = (b->qrot[quad] + (dir == CW ? 1 : 3)) & 3;
+   b->hash ^= rotl(old ^ b->qhash[quad][b->qrot[quad]], 16 * quad);
+   for(i = 0; i < 8; i += 4){
+      tmp = s[cycle[i+3]];
+      s[cycle[i+3]] = s[cycle[i+2]];
+      s[cycle[i+2]] = s[cycle[i+1]];
+      s[cycle[i+1]] = s[cycle[i]];
+      s[cycle[i]] = tmp;
+   }
+}
+
+void rotate_cw(struct Board* b, int quad){
+   rotate(b, quad, CW);
+}
+
+void rotate_ccw(struct Board* b, int quad){
+   rotate(b, quad, CCW);
 }
 
 void set_stone(struct Board* b, unsigned char quad, 
@@ -191,7 +460,7 @@ void set_stone(struct Board* b, unsigned char quad,
    int r = 3 * quad_row(quad);
    int c = 3 * quad_col(quad);
    b->filled++;
-   b->board[r+row][c+col] = b->colour;
+   put(b, r+row, c+col, b->colour);
    b->colour = 3 - b->colour;
 }
 
@@ -207,10 +476,18 @@ struct Board* new_board(char beginner){
    struct Board* b;
    b = (struct Board*) malloc(sizeof(struct Board));
    int i, k;
+   if(b == NULL)
+      return NULL;
    /* The field is empty in the beginning. */
    for(i=0; i < 6; i++)
       for(k=0; k < 6; k++)
          b->board[i][k] = NONE;
+   for(i=0; i < 4; i++){
+      for(k=0; k < 8; k++)
+         b->qhash[i][k] = 0;
+      b->qrot[i] = 0;
+   }
+   b->hash = 0;
    b->filled = 0;
    b->colour = beginner;
    return b;
@@ -218,6 +495,8 @@ struct Board* new_board(char beginner){
 
 struct Board* copy_board(struct Board* b){
    struct Board* nb = (struct Board*) malloc(sizeof(struct Board));
+   if(nb == NULL)
+      return NULL;
    memcpy(nb, b, sizeof(struct Board));
    return nb;
 }
@@ -248,13 +527,8 @@ void print_board(struct Board* b){
 void do_turn(struct Board* b, struct Turn* t){
    /* Keep game-piece counter up-to-date */
    b->filled++;
-   b->board[t->row][t->col] = b->colour;
-   if(t->dir == CW){
-      rotate_cw(b, t->quad);
-   }
-   else{
-      rotate_ccw(b, t->quad);
-   }
+   put(b, t->row, t->col, b->colour);
+   rotate(b, t->quad, t->dir);
    /* Swap active player: 3 - 2 = 1; 3 - 1 = 2 */
    b->colour = 3 - (b->colour);
 }
@@ -263,11 +537,7 @@ void undo_turn(struct Board* b, struct Turn* t){
    /* Keep game-piece counter up-to-date */
    b->filled--;
    b->colour = 3 - (b->colour);
-   if(t->dir == CW){
-      rotate_ccw(b, t->quad);
-   }
-   else{
-      rotate_cw(b, t->quad);
-   }
-   b->board[t->row][t->col] = NONE;
+   /* CW is 1 and CCW is 0, so !dir is the opposite direction. */
+   rotate(b, t->quad, !t->dir);
+   put(b, t->row, t->col, NONE);
 }
@@ -14,11 +14,24 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>. */
 
+/* Number of turns there are at most in a position: 36 squares, each
+   followed by rotating one of 4 quadrants in one of 2 directions. */
+#define MAX_TURNS 288
+
 struct Board
 {
    unsigned char filled;
    char board[6][6];
    char colour;
+   /* Zobrist hash of the stones, see zobrist(). */
+   unsigned long long hash;
+   /* qhash[q][(qrot[q] + k) % 4] is the hash of the stones of quadrant q
+      as they would be after rotating it k times clockwise, using the keys
+      of quadrant 0, and qhash[q][4 + (qrot[q] + k) % 4] the same for the
+      mirror image of that (see transform_turn). Rotating the quadrant
+      only changes qrot[q]. */
+   unsigned long long qhash[4][8];
+   unsigned char qrot[4];
 };
 
 struct Turn
@@ -38,12 +51,13 @@ struct Board *copy_board(struct Board *b);
 struct Board *new_board(char beginner);
 void set_stone(struct Board *b,unsigned char quad,unsigned char row,
                 unsigned char col);
+void rotate(struct Board *b,int quad,int dir);
 void rotate_ccw(struct Board *b,int quad);
 void rotate_cw(struct Board *b,int quad);
 char won(struct Board *b);
-char won_dia(struct Board *b,unsigned char r,unsigned char c);
-char won_col(struct Board *b,unsigned char c);
-char won_row(struct Board *b,unsigned char r);
+char won_turn(struct Board *b,struct Turn *t);
+char won_lines(struct Board *b,unsigned long mask);
+unsigned long long threat_squares(struct Board *b,char player);
 int quad_col(int quad);
 int quad_row(int quad);
 void print_turn(struct Turn *x);
@@ -52,8 +66,16 @@ int get_colour(struct Board* b);
 unsigned char get(struct Board* b, unsigned char row, unsigned char col);
 void set(struct Board* b, unsigned char row, unsigned char col,
          unsigned char v);
+void put(struct Board* b, unsigned char row, unsigned char col, char v);
 void set_value(struct Board* b, unsigned char quad, 
                unsigned char row, unsigned char col, unsigned char v);
 char get_stone(struct Board* b, unsigned char quad, unsigned char row,
                 unsigned char col);
 void free_turn(struct Turn* t);
+unsigned long long zobrist(struct Board *b);
+unsigned long long canonical_key(struct Board *b, unsigned char *symmetry);
+void transform_turn(struct Turn *t, unsigned char symmetry);
+unsigned char inverse_symmetry(unsigned char symmetry);
+unsigned short legal_turns(struct Board *b, struct Turn *turns);
+unsigned short all_turns(struct Board *b, struct Turn *turns);
+unsigned long long perft(struct Board *b, int depth, char distinct);
@@ -1,6 +1,6 @@
 #!/bin/sh
 
-gcc -c board.c ai.c --std=c99;
-gcc board.o ai.o -o debug_build;
-rm board.o ai.o;
+gcc -c board.c ai.c tt.c evaluate.c --std=c99;
+gcc board.o ai.o tt.o evaluate.o -o debug_build -lpthread -lm;
+rm board.o ai.o tt.o evaluate.o;
 ./debug_build;
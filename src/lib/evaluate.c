@@ -0,0 +1,202 @@
+/* pypentago - a board game
+Copyright (C) 2008 Florian Mayer
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>. */
+
+#include <math.h>
+
+#include "board.h"
+#include "evaluate.h"
+
+/* Bit 6 * row + col of line_masks[i] is set if lines[i] in board.c
+   contains the square at row, col. The order is that of WIN_MASKS in
+   pypentago.board. */
+static const unsigned long long line_masks[32] = {
+   0x00000001fULL, 0x00000003eULL, 0x0000007c0ULL,
+   0x000000f80ULL, 0x00001f000ULL, 0x00003e000ULL,
+   0x0007c0000ULL, 0x000f80000ULL, 0x01f000000ULL,
+   0x03e000000ULL, 0x7c0000000ULL, 0xf80000000ULL,
+   0x001041041ULL, 0x002082082ULL, 0x004104104ULL,
+   0x008208208ULL, 0x010410410ULL, 0x020820820ULL,
+   0x041041040ULL, 0x082082080ULL, 0x104104100ULL,
+   0x208208200ULL, 0x410410400ULL, 0x820820800ULL,
+   0x010204081ULL, 0x020408102ULL, 0x408102040ULL,
+   0x810204080ULL, 0x002108420ULL, 0x001084210ULL,
+   0x084210800ULL, 0x042108400ULL
+};
+
+/* The squares whose stones end up on line_masks[i] when a quadrant is
+   rotated, for every rotation that changes them, followed by zeros. Same
+   as ROTATED_MASKS in pypentago.board. */
+static const unsigned long long rotated_masks[32][6] = {
+   {0x000001059ULL, 0x00000411cULL, 0x000008207ULL,
+    0x000000827ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x000000079ULL, 0x000004138ULL, 0x00000820eULL,
+    0x000020826ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x000002682ULL, 0x0000105c0ULL, 0x0000005d0ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x000000e82ULL, 0x000002e80ULL, 0x000010590ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x00001c104ULL, 0x000019041ULL, 0x000027800ULL,
+    0x000007208ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x000038104ULL, 0x000039040ULL, 0x000026820ULL,
+    0x00000e208ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x041640000ULL, 0x104700000ULL, 0x2081c0000ULL,
+    0x0209c0000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x001e40000ULL, 0x104e00000ULL, 0x208380000ULL,
+    0x820980000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x09a080000ULL, 0x417000000ULL, 0x017400000ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x03a080000ULL, 0x0ba000000ULL, 0x416400000ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x704100000ULL, 0x641040000ULL, 0x9e0000000ULL,
+    0x1c8200000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0xe04100000ULL, 0xe41000000ULL, 0x9a0800000ULL,
+    0x388200000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x001047000ULL, 0x001040007ULL, 0x0c0001041ULL,
+    0x000181041ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x0020801c0ULL, 0x003002082ULL, 0x006002082ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x004100007ULL, 0x004107000ULL, 0x0000c4104ULL,
+    0x180004104ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x008238000ULL, 0x008200038ULL, 0x600008208ULL,
+    0x000c08208ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x010400e00ULL, 0x018010410ULL, 0x030010410ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x020800038ULL, 0x020838000ULL, 0x000620820ULL,
+    0xc00020820ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x041046000ULL, 0x041040003ULL, 0x1c0001040ULL,
+    0x0001c1040ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x082080180ULL, 0x0820800c0ULL, 0x007002080ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x104100006ULL, 0x104103000ULL, 0x0001c4100ULL,
+    0x1c0004100ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x208230000ULL, 0x208200018ULL, 0xe00008200ULL,
+    0x000e08200ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x410400c00ULL, 0x410400600ULL, 0x038010400ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x820800030ULL, 0x820818000ULL, 0x000e20800ULL,
+    0xe00020800ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x010201084ULL, 0x210004081ULL, 0x010804081ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x020408042ULL, 0x02040a100ULL, 0x020420102ULL,
+    0x02040010aULL, 0x008408102ULL, 0x420008102ULL},
+   {0x408102100ULL, 0x408100042ULL, 0x408042040ULL,
+    0x508002040ULL, 0x420102040ULL, 0x008502040ULL},
+   {0x810200084ULL, 0x810201080ULL, 0x210804080ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x002120408ULL, 0x002048420ULL, 0x102008420ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL},
+   {0x001080214ULL, 0x001081210ULL, 0x001094200ULL,
+    0x001084810ULL, 0x081004210ULL, 0x004084210ULL},
+   {0x084200810ULL, 0x084210200ULL, 0x004290800ULL,
+    0x081210800ULL, 0x284010800ULL, 0x084810800ULL},
+   {0x042120400ULL, 0x042100408ULL, 0x102048400ULL,
+    0x000000000ULL, 0x000000000ULL, 0x000000000ULL}
+};
+
+void default_weights(struct Weights* w){
+   w->two = 1;
+   w->three = 4;
+   w->four = 16;
+   w->rotation = 12;
+}
+
+static int count(unsigned long long x){
+   /* Number of bits set in x, which has at most five. */
+   int n = 0;
+   for(; x; n++)
+      x &= x - 1;
+   return n;
+}
+
+unsigned long long win_squares(struct Board* b, char player){
+   /* Return the squares player has to set his stone to in order to win
+      with the turn, bit 6 * row + col being set for the square at row,
+      col. Not every turn setting a stone there wins, but no other does.
+      All squares are returned if he can win by only rotating. */
+   const char* s = &(b->board[0][0]);
+   unsigned long long own = 0, other = 0, squares = 0, m;
+   unsigned char i, k;
+   
+   for(i=0; i < 36; i++){
+      if(s[i] == player)
+         own |= 1ULL << i;
+      else if(s[i])
+         other |= 1ULL << i;
+   }
+   for(i=0; i < 32; i++){
+      /* The line itself for the rotations that do not change it, then
+         the squares that end up on it for every rotation that does. */
+      for(k=0; k <= 6; k++){
+         m = k == 0 ? line_masks[i] : rotated_masks[i][k - 1];
+         if(!m)
+            break;
+         if(other & m || count(own & m) < 4)
+            continue;
+         if((own & m) == m)
+            return ~0ULL;
+         squares |= m & ~own;
+      }
+   }
+   return squares;
+}
+
+float evaluate(struct Board* b, char player, const struct Weights* w){
+   /* Rate the position for player: INFINITY if only he has five in a row,
+      -INFINITY if only the other player has, 0 if both have, otherwise
+      the weighted difference of the lines of the two players. */
+   const char* s = &(b->board[0][0]);
+   unsigned long long stones[3] = {0, 0, 0};
+   unsigned long long m, own, other;
+   /* open[p][k] is the number of open lines of player p + 1 with k stones
+      on them, threats[p] the number of lines he can complete by rotating. */
+   int open[2][6] = {{0}};
+   int threats[2] = {0, 0};
+   unsigned char i, k, p;
+   
+   for(i=0; i < 36; i++)
+      stones[(unsigned char) s[i]] |= 1ULL << i;
+   for(p=0; p < 2; p++){
+      own = stones[p + 1];
+      other = stones[2 - p];
+      for(i=0; i < 32; i++){
+         m = line_masks[i];
+         if(own & m && !(other & m)){
+            k = count(own & m);
+            open[p][k]++;
+            if(k >= 4)
+               continue;
+         }
+         for(k=0; k < 6 && rotated_masks[i][k]; k++){
+            m = rotated_masks[i][k];
+            if(!(other & m) && count(own & m) >= 4){
+               threats[p]++;
+               break;
+            }
+         }
+      }
+   }
+   p = player - 1;
+   if(open[p][5] && open[1 - p][5])
+      return 0;
+   else if(open[p][5])
+      return INFINITY;
+   else if(open[1 - p][5])
+      return -INFINITY;
+   return (w->two * (open[p][2] - open[1 - p][2]) +
+           w->three * (open[p][3] - open[1 - p][3]) +
+           w->four * (open[p][4] - open[1 - p][4]) +
+           w->rotation * (threats[p] - threats[1 - p]));
+}
@@ -0,0 +1,34 @@
+/* pypentago - a board game
+Copyright (C) 2008 Florian Mayer
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>. */
+
+/* Evaluation of positions the search cannot look beyond. */
+
+/* How much the lines of a player count. A line is open if the other
+   player has no stone on it. */
+struct Weights
+{
+   /* Open lines with two, three and four stones of the player. */
+   float two;
+   float three;
+   float four;
+   /* Lines the player can complete by setting one stone and rotating a
+      quadrant, or by only rotating one, that are not open fours. */
+   float rotation;
+};
+
+void default_weights(struct Weights *w);
+float evaluate(struct Board *b, char player, const struct Weights *w);
+unsigned long long win_squares(struct Board *b, char player);
@@ -0,0 +1,196 @@
+/* pypentago - a board game
+Copyright (C) 2008 Florian Mayer
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>. */
+
+#include <stdlib.h>
+
+#include "board.h"
+#include "tt.h"
+
+struct TTValue
+{
+   float value;
+   signed char depth;
+   unsigned char flag;
+   /* Best move found in the position, row is TT_NO_MOVE if there is none. */
+   unsigned char row;
+   unsigned char col;
+   unsigned char quad;
+   unsigned char dir;
+};
+
+/* Costumize the hashtable. This has to be done at compile time. */
+#define ht_keytype unsigned long long
+#define ht_valuetype struct TTValue
+#define ht_freevalues 0
+#define ht_freekeys 0
+
+/* Yes, this is supposed to be hashtable.c. We have to statically link as
+ * the source-code changes depending on our choices for ht_keytype,
+ * ht_valuetype and ht_freevalues. */
+#include "hashtable.c"
+
+/* How many buckets next to the one of a new entry are searched for an
+   entry to replace once the table is full. */
+#define TT_NEIGHBOURS 4
+
+struct TT
+{
+   struct ht_hashtable* table;
+   /* Maximum number of entries so the table stays within its budget. */
+   unsigned int max_entries;
+};
+
+static unsigned int tt_hashfn(unsigned long long key){
+   return (unsigned int)(key ^ (key >> 32));
+}
+
+static unsigned char tt_eqfn(unsigned long long one,
+                             unsigned long long other){
+   return one == other;
+}
+
+struct TT* tt_new(unsigned long size){
+   /* Return a transposition table using about size bytes of memory or NULL
+      if it could not be allocated. */
+   struct TT* tt = (struct TT*) malloc(sizeof(struct TT));
+   if(tt == NULL)
+      return NULL;
+   /* Every entry needs its own struct plus its share of the bucket array,
+      which has 1 / ht_items_per_place buckets per entry. */
+   tt->max_entries = size / (sizeof(struct ht_entry) +
+                             sizeof(struct ht_entry*) / ht_items_per_place);
+   if(tt->max_entries < 1)
+      tt->max_entries = 1;
+   /* Make the table big enough to never be expanded. */
+   tt->table = ht_new(tt->max_entries / ht_items_per_place, tt_hashfn,
+                      tt_eqfn);
+   if(tt->table == NULL){
+      free(tt);
+      return NULL;
+   }
+   return tt;
+}
+
+void tt_free(struct TT* tt){
+   ht_free(tt->table);
+   free(tt);
+}
+
+int tt_probe(struct TT* tt, unsigned long long key, int depth, float* alpha,
+             float* beta, float* value, struct Turn* move){
+   /* Look up key. If the stored value was searched at least as deep as
+      depth, narrow the (alpha, beta) window. Return 1 if that decides
+      the value of the position, which is then put into value. The best
+      move known is put into move, its row is TT_NO_MOVE if there is
+      none. */
+   struct ht_entry* e = ht_lookup(tt->table, key);
+   struct TTValue* v;
+   move->row = TT_NO_MOVE;
+   if(e == NULL)
+      return 0;
+   v = &(e->value);
+   if(v->row != TT_NO_MOVE){
+      move->row = v->row;
+      move->col = v->col;
+      move->quad = v->quad;
+      move->dir = v->dir;
+   }
+   if(v->depth < depth)
+      return 0;
+   if(v->flag == TT_EXACT){
+      *value = v->value;
+      return 1;
+   }
+   else if(v->flag == TT_LOWER && v->value > *alpha){
+      *alpha = v->value;
+   }
+   else if(v->flag == TT_UPPER && v->value < *beta){
+      *beta = v->value;
+   }
+   if(*alpha >= *beta){
+      *value = v->value;
+      return 1;
+   }
+   return 0;
+}
+
+static void tt_set_move(struct TTValue* v, struct Turn* move){
+   v->row = move->row;
+   v->col = move->col;
+   v->quad = move->quad;
+   v->dir = move->dir;
+}
+
+static void tt_set(struct TTValue* v, int depth, float value,
+                   unsigned char flag, struct Turn* move){
+   v->value = value;
+   v->depth = depth;
+   v->flag = flag;
+   if(move == NULL)
+      v->row = TT_NO_MOVE;
+   else
+      tt_set_move(v, move);
+}
+
+void tt_store(struct TT* tt, unsigned long long key, int depth, float value,
+              unsigned char flag, struct Turn* move){
+   /* Remember the value of the position key searched to depth. move is the
+      best move found or NULL. If the table is full, a shallower entry is
+      replaced. If there is none, the position is not stored. */
+   struct ht_hashtable* h = tt->table;
+   struct ht_entry* e = ht_lookup(h, key);
+   struct ht_entry* victim = NULL;
+   struct ht_entry** link = NULL;
+   struct ht_entry** l;
+   struct TTValue new_value;
+   unsigned int hash, idx, i;
+   if(e != NULL){
+      /* Prefer deeper searches, but do not forget the best move. */
+      if(e->value.depth <= depth)
+         tt_set(&(e->value), depth, value, flag, move);
+      else if(move != NULL)
+         tt_set_move(&(e->value), move);
+      return;
+   }
+   if(h->entries < tt->max_entries){
+      tt_set(&new_value, depth, value, flag, move);
+      /* If this fails, the position is just not remembered. */
+      ht_insert(h, key, new_value);
+      return;
+   }
+   /* The table is full. Find the shallowest entry in the bucket of key and
+      its neighbours. */
+   hash = ht_hhash(h, key);
+   idx = hash % h->length;
+   for(i = 0; i < TT_NEIGHBOURS; i++){
+      for(l = &(h->table[(idx + i) % h->length]); *l != NULL;
+          l = &((*l)->next)){
+         if(victim == NULL || (*l)->value.depth < victim->value.depth){
+            victim = *l;
+            link = l;
+         }
+      }
+   }
+   if(victim == NULL || victim->value.depth > depth)
+      return;
+   /* Move the victim to the bucket of key. */
+   *link = victim->next;
+   victim->next = h->table[idx];
+   h->table[idx] = victim;
+   victim->key = key;
+   victim->hash = hash;
+   tt_set(&(victim->value), depth, value, flag, move);
+}
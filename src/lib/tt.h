@@ -0,0 +1,38 @@
+/* pypentago - a board game
+Copyright (C) 2008 Florian Mayer
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>. */
+
+/* Transposition table of the AI. It remembers the value of positions that
+   have already been searched, keyed by the position key of the board. */
+
+/* The stored value is exact, a lower bound or an upper bound. */
+#define TT_EXACT 0
+#define TT_LOWER 1
+#define TT_UPPER 2
+
+/* Row of the move returned by tt_probe if no move is known. */
+#define TT_NO_MOVE 255
+
+/* Memory used by the transposition table if nothing else is requested. */
+#define TT_DEFAULT_SIZE (16 * 1024 * 1024)
+
+struct TT;
+
+struct TT* tt_new(unsigned long size);
+void tt_free(struct TT* tt);
+int tt_probe(struct TT* tt, unsigned long long key, int depth, float* alpha,
+             float* beta, float* value, struct Turn* move);
+void tt_store(struct TT* tt, unsigned long long key, int depth, float value,
+              unsigned char flag, struct Turn* move);
@@ -43,7 +43,7 @@ __description__ = ("pypentago is an open source effort "
 __bugs__ = "http://bitbucket.org/segfaulthunter/pypentago/issues/"
 
 
-PROTOCOL_VERSION = 1
+PROTOCOL_VERSION = 3
 EMAIL_REGEX = r"""^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}$"""
 DEFAULT_PORT = 26500
 
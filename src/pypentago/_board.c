@@ -7,11 +7,15 @@
 
 #include "Python.h"
 #include "board.h"
+#include "tt.h"
+#include "evaluate.h"
 #include "ai.h"
 
 
 static PyObject *CW, *CCW;
 static PyObject *SquareNotEmpty;
+/* Weights of the evaluation used by all boards, see set_weights. */
+static struct Weights weights;
 
 
 typedef struct {
@@ -22,17 +26,30 @@ typedef struct {
 static PyTypeObject BoardType;
 
 
-signed char get_player_uid(PyObject *player)
+static signed char
+get_player(PyObject *player)
 {
+    /* Accept either a player id or an object with an uid attribute,
+     * such as pypentago.core.Player. */
     long ival;
-    PyObject *uid = PyObject_GetAttrString(player, "uid");
-    if (uid == NULL)
-        return -1;
-    else if (!PyInt_Check(uid))
+    PyObject *uid;
+    if (PyInt_Check(player))
     {
-        Py_DECREF(uid);
-        PyErr_SetString(PyExc_TypeError, "expected an integer as player.uid");
-        return -1;
+        Py_INCREF(player);
+        uid = player;
+    }
+    else
+    {
+        uid = PyObject_GetAttrString(player, "uid");
+        if (uid == NULL)
+            return -1;
+        else if (!PyInt_Check(uid))
+        {
+            Py_DECREF(uid);
+            PyErr_SetString(PyExc_TypeError,
+                            "expected an integer as player.uid");
+            return -1;
+        }
     }
     ival = PyInt_AsLong(uid);
     Py_DECREF(uid);
@@ -42,7 +59,88 @@ signed char get_player_uid(PyObject *player)
         return -1;
     }
     return (signed char)ival;
-};
+}
+
+
+static int
+check_square(int row, int col)
+{
+    if (row < 0 || row > 5 || col < 0 || col > 5)
+    {
+        PyErr_SetString(PyExc_IndexError, "square not on the board");
+        return -1;
+    }
+    return 0;
+}
+
+
+static int
+check_relative(int quad, int row, int col)
+{
+    if (quad < 0 || quad > 3 || row < 0 || row > 2 || col < 0 || col > 2)
+    {
+        PyErr_SetString(PyExc_IndexError, "square not on the board");
+        return -1;
+    }
+    return 0;
+}
+
+
+static int
+check_quad(int quad)
+{
+    if (quad < 0 || quad > 3)
+    {
+        PyErr_SetNone(PyExc_ValueError);
+        return -1;
+    }
+    return 0;
+}
+
+
+static int
+check_value(int value)
+{
+    if (value < 0 || value > 2)
+    {
+        PyErr_SetString(PyExc_ValueError, "value not in range(3)");
+        return -1;
+    }
+    return 0;
+}
+
+
+static int
+parse_key(PyObject *key, int *row, int *col)
+{
+    if (!PyTuple_Check(key))
+    {
+        PyErr_SetString(PyExc_TypeError, "key must be a (row, col) tuple");
+        return -1;
+    }
+    else if (!PyArg_ParseTuple(key, "ii;key must be a (row, col) tuple",
+                               row, col))
+        return -1;
+    return check_square(*row, *col);
+}
+
+
+static int
+set_square(BoardObject *self, int row, int col, int value)
+{
+    /* Same semantics as pypentago.board.Board.set. */
+    if (check_square(row, col) < 0 || check_value(value) < 0)
+        return -1;
+    if (self->board->board[row][col])
+    {
+        PyErr_SetNone(SquareNotEmpty);
+        return -1;
+    }
+    put(self->board, row, col, (char)value);
+    if (value)
+        self->board->filled++;
+    return 0;
+}
 
 
 static PyObject *
@@ -58,6 +156,11 @@ new_boardobject(PyTypeObject *type, PyObject *args, PyObject *kwargs)
     if (self == NULL)
         return NULL;
     self->board = new_board(beginner);
+    if (self->board == NULL)
+    {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
     return (PyObject *)self;
 }
 
@@ -65,57 +168,35 @@ new_boardobject(PyTypeObject *type, PyObject *args, PyObject *kwargs)
 static PyObject *
 board_subscript(BoardObject *self, PyObject *key)
 {
-    signed char row, col;
-    if (!PyTuple_Check(key))
-    {
-        PyErr_SetString(PyExc_TypeError, "key must be a (row, col) tuple");
-        return NULL;
-    }
-    else if (!PyArg_ParseTuple(key, "bb;key must be a (row, col) tuple",
-                               &row, &col))
-        return NULL;
-    else if (row < 0 || row > 5 || col < 0 || col > 5)
-    {
-        PyErr_SetString(PyExc_ValueError,
-                        "value not in range(6)");
+    int row, col;
+    if (parse_key(key, &row, &col) < 0)
         return NULL;
-    }
-
     return PyInt_FromLong(self->board->board[row][col]);
 }
 
+
 static int
 board_ass_subscript(BoardObject *self, PyObject *key, PyObject *value)
 {
-    signed char row, col;
+    int row, col;
     long ivalue;
-    if (!PyTuple_Check(key))
+    if (value == NULL)
     {
-        PyErr_SetString(PyExc_TypeError, "key must be a (row, col) tuple");
+        PyErr_SetString(PyExc_TypeError, "squares cannot be deleted");
         return -1;
     }
-    else if (!PyArg_ParseTuple(key, "bb;key must be a (row, col) tuple",
-             &row, &col))
-        return -1;
-    else if (row < 0 || row > 5 || col < 0 || col > 5)
-    {
-        PyErr_SetString(PyExc_ValueError,
-                        "value not in range(6)");
+    else if (parse_key(key, &row, &col) < 0)
         return -1;
-    }
     else if (!PyInt_Check(value))
     {
         PyErr_SetString(PyExc_ValueError, "value must be an integer");
         return -1;
     }
     ivalue = PyInt_AsLong(value);
-    if (ivalue < 0 || ivalue > 2)
-    {
-        PyErr_SetString(PyExc_ValueError, "value not in range(3)");
+    if (check_value(ivalue) < 0)
         return -1;
-    }
 
-    self->board->board[row][col] = (char)ivalue;
+    put(self->board, row, col, (char)ivalue);
 
     return 0;
 }
@@ -124,87 +205,350 @@ board_ass_subscript(BoardObject *self, PyObject *key, PyObject *value)
 static PyObject *
 board_apply_turn(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
-    static char *kwlist[] = {"player", "turn", NULL};
+    static char *kwlist[] = {"playerid", "turn", NULL};
     PyObject *player, *turn, *turn_tuple, *rot_dir;
-    unsigned char quad, row, col, rot_quad;
+    int quad, row, col, rot_quad, cmp;
+    signed char uid;
     if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO", kwlist, &player,
                                      &turn))
         return NULL;
     turn_tuple = PySequence_Tuple(turn);
     if (turn_tuple == NULL)
         return NULL;
-    else if (!PyArg_ParseTuple(turn_tuple, "bbbOb;invalid turn argument", &quad,
-                               &row, &col, &rot_dir, &rot_quad))
+    else if (!PyArg_ParseTuple(turn_tuple, "iiiOi;invalid turn argument",
+                               &quad, &row, &col, &rot_dir, &rot_quad))
     {
         Py_DECREF(turn_tuple);
         return NULL;
     }
+    /* rot_dir is borrowed from turn_tuple. */
+    Py_INCREF(rot_dir);
     Py_DECREF(turn_tuple);
 
-    signed char uid = get_player_uid(player);
-    if (uid < 0)
+    uid = get_player(player);
+    if (uid < 0 || check_relative(quad, row, col) < 0 ||
+        set_square(self, 3 * quad_row(quad) + row, 3 * quad_col(quad) + col,
+                   uid) < 0)
+    {
+        Py_DECREF(rot_dir);
         return NULL;
+    }
 
-    if (get_stone(self->board, quad, row, col))
+    cmp = PyObject_RichCompareBool(rot_dir, CW, Py_EQ);
+    if (cmp == 0)
     {
-	PyErr_SetNone(SquareNotEmpty);
+        cmp = PyObject_RichCompareBool(rot_dir, CCW, Py_EQ);
+        if (cmp > 0)
+            cmp = 2;
+    }
+    Py_DECREF(rot_dir);
+    if (cmp < 0)
+        return NULL;
+    else if (cmp == 0 || check_quad(rot_quad) < 0)
+    {
+        /* Same as pypentago.board.Board, the stone stays on the board. */
+        PyErr_SetNone(PyExc_ValueError);
         return NULL;
     }
-    set_value(self->board, quad, row, col, uid);
+    /* The direction is 1 for clockwise and 0 for counter-clockwise. */
+    rotate(self->board, rot_quad, cmp == 1);
 
-    int cmp = PyObject_RichCompareBool(rot_dir, CW, Py_EQ);
-    if (cmp < 0)
+    Py_RETURN_NONE;
+}
+
+
+static int
+get_engine(const char *name)
+{
+    /* Return the ENGINE_* constant called name, or -1 with an exception
+     * set if there is none. */
+    if (strcmp(name, "alphabeta") == 0)
+        return ENGINE_ALPHA_BETA;
+    else if (strcmp(name, "pvs") == 0)
+        return ENGINE_PVS;
+    PyErr_Format(PyExc_ValueError, "unknown engine %s", name);
+    return -1;
+}
+
+
+static PyObject *
+board_do_best(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"player", "depth", "tt_size", "engine", NULL};
+    const char *engine = "alphabeta";
+    int found;
+    signed char uid;
+    PyObject *player;
+    struct Board *copy;
+    struct SearchOptions options;
+    struct SearchResult result;
+    /* tt_size is the memory in bytes the transposition table may use,
+     * 0 disables it. engine is "alphabeta" or "pvs" for principal
+     * variation search. Return the statistics of the search. */
+    default_options(&options);
+    options.weights = weights;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Oi|ks", kwlist, &player,
+                                     &options.max_depth, &options.tt_size,
+                                     &engine))
         return NULL;
-    else if (cmp)
-        rotate_cw(self->board, rot_quad);
-    else
+
+    uid = get_player(player);
+    if (uid < 0)
+        return NULL;
+    else if (options.max_depth < 1)
     {
-        cmp = PyObject_RichCompareBool(rot_dir, CCW, Py_EQ);
-        if (cmp < 0)
-            return NULL;
-        else if (cmp)
-            rotate_ccw(self->board, rot_quad);
-        else
-	{
-            PyErr_SetNone(PyExc_ValueError);
+        PyErr_SetString(PyExc_ValueError, "depth must be at least 1");
+        return NULL;
+    }
+    else if (self->board->filled >= 36 || won(self->board))
+    {
+        PyErr_SetString(PyExc_ValueError, "the game is over");
+        return NULL;
+    }
+    options.engine = get_engine(engine);
+    if (options.engine < 0)
+        return NULL;
+    if (options.max_depth > MAX_PLY)
+        options.max_depth = MAX_PLY;
+
+    /* Search a copy so that other threads may use the board while the GIL
+     * is released. */
+    copy = copy_board(self->board);
+    if (copy == NULL)
+        return PyErr_NoMemory();
+    copy->colour = uid;
+    Py_BEGIN_ALLOW_THREADS
+    found = search(copy, &options, &result);
+    Py_END_ALLOW_THREADS
+    free_board(copy);
+    if (found < 0)
+        return PyErr_NoMemory();
+    self->board->colour = uid;
+    do_turn(self->board, &result.best);
+
+    return Py_BuildValue("{sksksksk}", "nodes", result.stats.nodes,
+                         "cutoffs", result.stats.cutoffs,
+                         "first_cutoffs", result.stats.first_cutoffs,
+                         "researches", result.stats.researches);
+}
+
+
+static PyObject *
+turn_tuple(struct Turn *turn)
+{
+    /* Return turn in the format apply_turn accepts. */
+    return Py_BuildValue("iiiOi", 2 * (turn->row >= 3) + (turn->col >= 3),
+                         turn->row % 3, turn->col % 3,
+                         turn->dir ? CW : CCW, turn->quad);
+}
+
+
+static PyObject *
+board_legal_turns(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"player", NULL};
+    signed char uid;
+    PyObject *player, *list, *turn;
+    struct Turn turns[MAX_TURNS];
+    unsigned short i, n;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O", kwlist, &player))
+        return NULL;
+
+    uid = get_player(player);
+    if (uid < 0)
+        return NULL;
+
+    self->board->colour = uid;
+    n = legal_turns(self->board, turns);
+    list = PyList_New(n);
+    if (list == NULL)
+        return NULL;
+    for (i = 0; i < n; i++)
+    {
+        turn = turn_tuple(&turns[i]);
+        if (turn == NULL)
+        {
+            Py_DECREF(list);
             return NULL;
         }
+        PyList_SET_ITEM(list, i, turn);
     }
+    return list;
+}
 
-    Py_RETURN_NONE;
+
+static PyObject *
+board_search(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"player", "time_ms", "max_depth", "tt_size",
+                             "threads", "seed", "engine", "window", NULL};
+    const char *engine = "alphabeta";
+    signed char uid;
+    int found;
+    unsigned char i;
+    PyObject *player, *pv, *turn;
+    struct Board *copy;
+    struct SearchOptions options;
+    struct SearchResult result;
+    /* Search the best turn for player without making it, for at most
+     * time_ms milliseconds and max_depth plies. The turns at the root are
+     * split between threads threads; if seed is not negative, the result
+     * only depends on it and not on how the threads are scheduled. engine
+     * is "alphabeta" or "pvs", which starts every iteration with a window
+     * of window around the value of the previous one. Return a dict with
+     * the turn, its value, the depth reached, the best line of play and
+     * the statistics of the search. */
+    default_options(&options);
+    options.weights = weights;
+    options.max_depth = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|likilsf", kwlist,
+                                     &player, &options.time_ms,
+                                     &options.max_depth, &options.tt_size,
+                                     &options.threads, &options.seed,
+                                     &engine, &options.window))
+        return NULL;
+
+    uid = get_player(player);
+    if (uid < 0)
+        return NULL;
+    else if (options.time_ms <= 0 && options.max_depth <= 0)
+    {
+        PyErr_SetString(PyExc_ValueError,
+                        "time_ms or max_depth has to be positive");
+        return NULL;
+    }
+    else if (options.threads < 1)
+    {
+        PyErr_SetString(PyExc_ValueError, "threads must be at least 1");
+        return NULL;
+    }
+    options.engine = get_engine(engine);
+    if (options.engine < 0)
+        return NULL;
+    else if (self->board->filled >= 36 || won(self->board))
+    {
+        PyErr_SetString(PyExc_ValueError, "the game is over");
+        return NULL;
+    }
+    if (options.max_depth <= 0 || options.max_depth > MAX_PLY)
+        options.max_depth = MAX_PLY;
+
+    /* Search a copy so that other threads may use the board while the GIL
+     * is released. */
+    copy = copy_board(self->board);
+    if (copy == NULL)
+        return PyErr_NoMemory();
+    copy->colour = uid;
+    Py_BEGIN_ALLOW_THREADS
+    found = search(copy, &options, &result);
+    Py_END_ALLOW_THREADS
+    free_board(copy);
+    if (found < 0)
+        return PyErr_NoMemory();
+
+    pv = PyList_New(result.pv_length);
+    if (pv == NULL)
+        return NULL;
+    for (i = 0; i < result.pv_length; i++)
+    {
+        turn = turn_tuple(&result.pv[i]);
+        if (turn == NULL)
+        {
+            Py_DECREF(pv);
+            return NULL;
+        }
+        PyList_SET_ITEM(pv, i, turn);
+    }
+    turn = turn_tuple(&result.best);
+    if (turn == NULL)
+    {
+        Py_DECREF(pv);
+        return NULL;
+    }
+    return Py_BuildValue("{sNsfsisNsksksksk}", "turn", turn,
+                         "value", result.best.value, "depth", result.depth,
+                         "pv", pv, "nodes", result.stats.nodes,
+                         "cutoffs", result.stats.cutoffs,
+                         "first_cutoffs", result.stats.first_cutoffs,
+                         "researches", result.stats.researches);
 }
 
 
 static PyObject *
-board_do_best(BoardObject *self, PyObject *args, PyObject *kwargs)
+board_perft(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
-    static char *kwlist[] = {"player", "depth", NULL};
+    static char *kwlist[] = {"player", "depth", "distinct", NULL};
     int depth;
+    int distinct = 0;
+    signed char uid;
     PyObject *player;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Oi", kwlist, &player,
-                                     &depth))
+    struct Board *copy;
+    unsigned long long nodes;
+    /* Return the number of ways player and his opponent can make depth
+     * turns in a row, see pypentago.perft. */
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Oi|i", kwlist, &player,
+                                     &depth, &distinct))
         return NULL;
 
-    int uid = get_player_uid(player);
+    uid = get_player(player);
     if (uid < 0)
         return NULL;
 
-    self->board->colour = uid;
-    struct Turn *turn = find_best(self->board, depth);
-    do_turn(self->board, turn);
-    free_turn(turn);
+    copy = copy_board(self->board);
+    if (copy == NULL)
+        return PyErr_NoMemory();
+    copy->colour = uid;
+    Py_BEGIN_ALLOW_THREADS
+    nodes = perft(copy, depth, distinct != 0);
+    Py_END_ALLOW_THREADS
+    free_board(copy);
+    return PyLong_FromUnsignedLongLong(nodes);
+}
 
-    Py_RETURN_NONE;
+
+static PyObject *
+board_evaluate(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"player", NULL};
+    signed char uid;
+    PyObject *player;
+    /* Rate the position for player the way the search does at its
+     * leaves. */
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O", kwlist, &player))
+        return NULL;
+
+    uid = get_player(player);
+    if (uid < 0)
+        return NULL;
+    return PyFloat_FromDouble(evaluate(self->board, uid, &weights));
 }
 
 
+static PyObject *
+board_rotate(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"quad", "cw", NULL};
+    int quad;
+    PyObject *cw;
+    int is_cw;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "iO", kwlist, &quad, &cw))
+        return NULL;
+    is_cw = PyObject_IsTrue(cw);
+    if (is_cw < 0 || check_quad(quad) < 0)
+        return NULL;
+    rotate(self->board, quad, is_cw);
+    Py_RETURN_NONE;
+}
+
 
 static PyObject *
 board_rotate_cw(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
     static char *kwlist[] = {"quad", NULL};
-    unsigned char quad;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "b", kwlist, &quad))
+    int quad;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "i", kwlist, &quad))
+        return NULL;
+    if (check_quad(quad) < 0)
         return NULL;
     rotate_cw(self->board, quad);
     Py_RETURN_NONE;
@@ -215,8 +559,10 @@ static PyObject *
 board_rotate_ccw(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
     static char *kwlist[] = {"quad", NULL};
-    unsigned char quad;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "b", kwlist, &quad))
+    int quad;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "i", kwlist, &quad))
+        return NULL;
+    if (check_quad(quad) < 0)
         return NULL;
     rotate_ccw(self->board, quad);
     Py_RETURN_NONE;
@@ -232,62 +578,158 @@ board_print(BoardObject *self)
 
 
 static PyObject *
-board_get_pos(BoardObject *self, PyObject *args, PyObject *kwargs)
+board_get(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"row", "col", NULL};
+    int row, col;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "ii", kwlist, &row, &col))
+        return NULL;
+    if (check_square(row, col) < 0)
+        return NULL;
+    return PyInt_FromLong(self->board->board[row][col]);
+}
+
+
+static PyObject *
+board_set(BoardObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"row", "col", "value", NULL};
+    int row, col, value;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "iii", kwlist,
+                                     &row, &col, &value))
+        return NULL;
+    if (set_square(self, row, col, value) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+
+static PyObject *
+board_get_relative(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
     static char *kwlist[] = {"quad", "row", "col", NULL};
-    unsigned char quad, row, col;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "bbb", kwlist,
+    int quad, row, col;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "iii", kwlist,
                                      &quad, &row, &col))
         return NULL;
+    if (check_relative(quad, row, col) < 0)
+        return NULL;
     return PyInt_FromLong(get_stone(self->board, quad, row, col));
 }
 
 
 static PyObject *
-board_set_pos(BoardObject *self, PyObject *args, PyObject *kwargs)
+board_set_relative(BoardObject *self, PyObject *args, PyObject *kwargs)
 {
-    static char *kwlist[] = {"player", "quad", "row", "col", NULL};
-    PyObject *player;
-    unsigned char quad, row, col;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Obbb", kwlist, &player,
-                                     &quad, &row, &col))
+    static char *kwlist[] = {"quad", "row", "col", "value", NULL};
+    int quad, row, col, value;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "iiii", kwlist,
+                                     &quad, &row, &col, &value))
         return NULL;
-
-    signed char uid = get_player_uid(player);
-    if (uid < 0)
+    if (check_relative(quad, row, col) < 0 ||
+        set_square(self, 3 * quad_row(quad) + row, 3 * quad_col(quad) + col,
+                   value) < 0)
         return NULL;
+    Py_RETURN_NONE;
+}
 
-    if (get_stone(self->board, quad, row, col))
-    {
-        PyErr_SetNone(SquareNotEmpty);
+
+static PyObject *
+board_win(BoardObject *self)
+{
+    /* Same as pypentago.board.Board.win, a full board is a draw. */
+    if (self->board->filled >= 36)
+        return PyInt_FromLong(3);
+    return PyInt_FromLong(won(self->board));
+}
+
+
+static PyObject *
+board_copy(BoardObject *self)
+{
+    BoardObject *other;
+    other = (BoardObject *)self->ob_type->tp_alloc(self->ob_type, 0);
+    if (other == NULL)
         return NULL;
+    other->board = copy_board(self->board);
+    if (other->board == NULL)
+    {
+        Py_DECREF(other);
+        return PyErr_NoMemory();
     }
+    return (PyObject *)other;
+}
 
-    set_value(self->board, quad, row, col, uid);
-    self->board->colour = 3 - uid;
 
-    Py_RETURN_NONE;
+static PyObject *
+board_canonical_key(BoardObject *self)
+{
+    return PyLong_FromUnsignedLongLong(canonical_key(self->board, NULL));
 }
 
 
 static PyObject *
-board_set_value(BoardObject *self, PyObject *args, PyObject *kwargs)
+board_get_filled(BoardObject *self, void *closure)
 {
-    static char *kwlist[] = {"value", "quad", "row", "col", NULL};
-    unsigned char value, quad, row, col;
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "bbbb", kwlist,
-                                     &value, &quad, &row, &col))
-        return NULL;
-    set_value(self->board, quad, row, col, value);
-    Py_RETURN_NONE;
+    return PyInt_FromLong(self->board->filled);
+}
+
+
+static int
+board_set_filled(BoardObject *self, PyObject *value, void *closure)
+{
+    long ivalue;
+    if (value == NULL)
+    {
+        PyErr_SetString(PyExc_TypeError, "cannot delete filled");
+        return -1;
+    }
+    ivalue = PyInt_AsLong(value);
+    if (ivalue == -1 && PyErr_Occurred())
+        return -1;
+    else if (ivalue < 0 || ivalue > 36)
+    {
+        PyErr_SetString(PyExc_ValueError, "filled not in range(37)");
+        return -1;
+    }
+    self->board->filled = (unsigned char)ivalue;
+    return 0;
 }
 
 
 static PyObject *
-board_win(BoardObject *self)
+board_get_key(BoardObject *self, void *closure)
 {
-    char retval = won(self->board);
-    return PyInt_FromLong(retval);
+    return PyLong_FromUnsignedLongLong(self->board->hash);
+}
+
+
+static PyObject *
+board_str(BoardObject *self)
+{
+    /* Same format as pypentago.board.Board.__str__. */
+    char buf[6 * 13 + 1];
+    char *p = buf;
+    int r, c;
+    for (r = 0; r < 6; r++)
+    {
+        for (c = 0; c < 6; c++)
+        {
+            *p++ = '0' + self->board->board[r][c];
+            if (c == 2)
+            {
+                *p++ = ' ';
+                *p++ = ' ';
+            }
+            else if (c != 5)
+                *p++ = ' ';
+        }
+        if (r != 5)
+            *p++ = '\n';
+        if (r == 2)
+            *p++ = '\n';
+    }
+    return PyString_FromStringAndSize(buf, p - buf);
 }
 
 
@@ -300,19 +742,48 @@ boardobject_dealloc(BoardObject *self)
 
 
 static PyMethodDef board_methods[] = {
-    {"apply_turn", (PyCFunction)board_apply_turn, METH_KEYWORDS, ""},
-    {"do_best", (PyCFunction)board_do_best, METH_KEYWORDS, ""},
-    {"rotate_cw", (PyCFunction)board_rotate_cw, METH_KEYWORDS, ""},
-    {"rotate_ccw", (PyCFunction)board_rotate_ccw, METH_KEYWORDS, ""},
+    {"apply_turn", (PyCFunction)board_apply_turn,
+     METH_VARARGS | METH_KEYWORDS, ""},
+    {"do_best", (PyCFunction)board_do_best, METH_VARARGS | METH_KEYWORDS, ""},
+    {"search", (PyCFunction)board_search, METH_VARARGS | METH_KEYWORDS,
+     "best turn found within time_ms milliseconds or max_depth plies"},
+    {"perft", (PyCFunction)board_perft, METH_VARARGS | METH_KEYWORDS,
+     "number of ways to make depth turns in a row"},
+    {"evaluate", (PyCFunction)board_evaluate, METH_VARARGS | METH_KEYWORDS,
+     "value of the position for player"},
+    {"legal_turns", (PyCFunction)board_legal_turns,
+     METH_VARARGS | METH_KEYWORDS,
+     "turns player can make, leaving out ones resulting in the same position"},
+    {"rotate", (PyCFunction)board_rotate, METH_VARARGS | METH_KEYWORDS, ""},
+    {"rotate_cw", (PyCFunction)board_rotate_cw,
+     METH_VARARGS | METH_KEYWORDS, ""},
+    {"rotate_ccw", (PyCFunction)board_rotate_ccw,
+     METH_VARARGS | METH_KEYWORDS, ""},
     {"_print", (PyCFunction)board_print, METH_NOARGS, ""},
-    {"get_pos", (PyCFunction)board_get_pos, METH_KEYWORDS, ""},
-    {"set_pos", (PyCFunction)board_set_pos, METH_KEYWORDS, ""},
-    {"set_value", (PyCFunction)board_set_value, METH_KEYWORDS, ""},
+    {"get", (PyCFunction)board_get, METH_VARARGS | METH_KEYWORDS, ""},
+    {"set", (PyCFunction)board_set, METH_VARARGS | METH_KEYWORDS, ""},
+    {"get_relative", (PyCFunction)board_get_relative,
+     METH_VARARGS | METH_KEYWORDS, ""},
+    {"set_relative", (PyCFunction)board_set_relative,
+     METH_VARARGS | METH_KEYWORDS, ""},
     {"win", (PyCFunction)board_win, METH_NOARGS, ""},
+    {"copy", (PyCFunction)board_copy, METH_NOARGS,
+     "independent copy of the board"},
+    {"canonical_key", (PyCFunction)board_canonical_key, METH_NOARGS,
+     "smallest Zobrist hash of the symmetric images of the board"},
     {NULL, NULL}
 };
 
 
+static PyGetSetDef board_getset[] = {
+    {"filled", (getter)board_get_filled, (setter)board_set_filled,
+     "number of stones set using set, set_relative or apply_turn", NULL},
+    {"key", (getter)board_get_key, NULL,
+     "Zobrist hash of the stones on the board", NULL},
+    {NULL}
+};
+
+
 static PyMappingMethods board_as_mapping = {
     0,                                  /* mp_length */
     (binaryfunc)board_subscript,        /* mp_subscript */
@@ -340,7 +811,7 @@ static PyTypeObject BoardType = {
     &board_as_mapping,                  /* tp_as_mapping */
     0,                                  /* tp_hash */
     0,                                  /* tp_call */
-    0,                                  /* tp_str */
+    (reprfunc)board_str,                /* tp_str */
     0,                                  /* tp_getattro */
     0,                                  /* tp_setattro */
     0,                                  /* tp_as_buffer */
@@ -355,7 +826,7 @@ static PyTypeObject BoardType = {
     0,                                  /* tp_iternext */
     board_methods,                      /* tp_methods */
     0,                                  /* tp_members */
-    0,                                  /* tp_getset */
+    board_getset,                       /* tp_getset */
     0,                                  /* tp_base */
     0,                                  /* tp_dict */
     0,                                  /* tp_descr_get */
@@ -367,8 +838,34 @@ static PyTypeObject BoardType = {
 };
 
 
+static PyObject *
+module_set_weights(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *kwlist[] = {"two", "three", "four", "rotation", NULL};
+    struct Weights w = weights;
+    /* Change the weights given, leaving the others as they are. */
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|ffff", kwlist, &w.two,
+                                     &w.three, &w.four, &w.rotation))
+        return NULL;
+    weights = w;
+    Py_RETURN_NONE;
+}
+
+
+static PyObject *
+module_get_weights(PyObject *self)
+{
+    return Py_BuildValue("{sfsfsfsf}", "two", weights.two,
+                         "three", weights.three, "four", weights.four,
+                         "rotation", weights.rotation);
+}
+
 
 static PyMethodDef module_methods[] = {
+    {"set_weights", (PyCFunction)module_set_weights,
+     METH_VARARGS | METH_KEYWORDS, "change the weights of the evaluation"},
+    {"get_weights", (PyCFunction)module_get_weights, METH_NOARGS,
+     "weights of the evaluation"},
     {NULL, NULL}
 };
 
@@ -381,6 +878,7 @@ init_board(void)
     if (PyType_Ready(&BoardType) < 0)
         return;
 
+    default_weights(&weights);
     module = Py_InitModule("pypentago._board", module_methods);
     if (module == NULL)
         return;
@@ -0,0 +1,352 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Running the AI without blocking the reactor.
+
+The search of pypentago._board releases the GIL, so it can run in another
+thread while the reactor keeps serving connections. Engine runs searches
+in a pool of threads and returns Deferreds that fire with their results.
+
+The boards of pypentago.board have no search of their own. For them, a far
+slower alpha-beta search written in Python is used, which does not release
+the GIL while it runs. Instead of threads, it splits the turns at the root
+between processes.
+
+Both searches rate the positions at their leaves with evaluate. Its weights
+are read from the evaluation section of ai.ini when this module is
+imported, see load_weights. """
+
+import time
+import operator
+import multiprocessing
+
+from ConfigParser import RawConfigParser
+
+import pypentago
+
+from pypentago import conf
+from pypentago.board import WIN_MASKS, ROTATED_MASKS
+from pypentago.threadpool import ReactorThreadPool
+
+try:
+    from pypentago import _board
+except ImportError:
+    _board = None
+
+INFINITY = float('inf')
+
+
+class Timeout(Exception):
+    """ Raised inside of PythonSearch when time has run out. """
+    pass
+
+
+#: Weights of the evaluation, see set_weights.
+DEFAULT_WEIGHTS = {'two': 1.0, 'three': 4.0, 'four': 16.0, 'rotation': 12.0}
+
+weights = dict(DEFAULT_WEIGHTS)
+
+
+def set_weights(**kwargs):
+    """ Change how much the lines of a player count in the evaluation. A
+    line is open if the other player has no stone on it. two, three and four
+    weigh the open lines with that many stones of the player, rotation the
+    lines he can complete by setting a stone and rotating a quadrant, or by
+    only rotating one, that are not open fours. """
+    for name in kwargs:
+        if name not in DEFAULT_WEIGHTS:
+            raise TypeError("unknown weight %s" % name)
+    weights.update((name, float(value)) for name, value in kwargs.iteritems())
+    if _board is not None:
+        _board.set_weights(**weights)
+
+
+def load_weights(file_names=None):
+    """ Set the weights from the evaluation section of the config files
+    file_names, by default of ai.ini in the usual locations. Weights not
+    given there keep their default. """
+    if file_names is None:
+        file_names = list(conf.possible_configs('ai.ini'))
+    config = RawConfigParser()
+    config.read(file_names)
+    new = dict(DEFAULT_WEIGHTS)
+    if config.has_section('evaluation'):
+        for name in new:
+            if config.has_option('evaluation', name):
+                new[name] = config.getfloat('evaluation', name)
+    set_weights(**new)
+
+
+def _count(mask):
+    return bin(mask).count('1')
+
+
+# The lines with their rotated masks and all squares of those, which
+# need to hold four stones of a player for him to threaten a rotation.
+_LINES = [(mask, rotated, reduce(operator.or_, rotated))
+          for mask, rotated in zip(WIN_MASKS, ROTATED_MASKS)]
+
+
+def evaluate(board, player):
+    """ Rate the position on board for player: INFINITY if only he has five
+    in a row, -INFINITY if only the other player has, 0 if both have,
+    otherwise the difference of the weighted lines of the two players. The
+    same as pypentago._board.Board.evaluate. """
+    if hasattr(board, 'evaluate'):
+        return board.evaluate(player)
+    stones = [0, 0, 0]
+    for i in xrange(36):
+        stones[board[i // 6, i % 6]] |= 1 << i
+    scores = []
+    for own, other in [(player, 3 - player), (3 - player, player)]:
+        own, other = stones[own], stones[other]
+        score = 0
+        five = False
+        for mask, rotated, squares in _LINES:
+            if own & mask and not other & mask:
+                count = _count(own & mask)
+                if count == 5:
+                    five = True
+                elif count >= 2:
+                    score += weights[('two', 'three', 'four')[count - 2]]
+                if count >= 4:
+                    continue
+            if _count(own & squares) < 4:
+                continue
+            if any(not other & m and _count(own & m) >= 4 for m in rotated):
+                score += weights['rotation']
+        scores.append((five, score))
+    (own_five, own), (other_five, other) = scores
+    if own_five and other_five:
+        return 0
+    elif own_five:
+        return INFINITY
+    elif other_five:
+        return -INFINITY
+    return own - other
+
+
+class PythonSearch(object):
+    """ Iterative deepening alpha-beta search for boards that have no
+    search method. search returns the same as pypentago._board.Board.search
+    does. """
+    # Only look at the clock every CHECK_EVERY nodes.
+    CHECK_EVERY = 64
+
+    def __init__(self, board):
+        self.board = board
+        self.deadline = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+    def search(self, player, time_ms=0, max_depth=0, processes=1):
+        """ Search the best turn for player. If processes is greater than
+        one, the turns at the root are split between that many processes.
+        Every one of them always gets the same share of the turns, so the
+        result does not depend on how they are scheduled. """
+        if time_ms <= 0 and max_depth <= 0:
+            raise ValueError("time_ms or max_depth has to be positive")
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        if self.board.win():
+            raise ValueError("the game is over")
+        if max_depth <= 0:
+            max_depth = 36 - self.board.filled
+        pool = None
+        if processes > 1:
+            pool = multiprocessing.Pool(processes)
+        try:
+            return self._deepen(player, time_ms, max_depth, pool, processes)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def _deepen(self, player, time_ms, max_depth, pool, processes):
+        start = time.time()
+        result = None
+        pv = []
+        for depth in xrange(1, max_depth + 1):
+            try:
+                if pool is None:
+                    value, pv = self.negamax(
+                        self.board, player, depth, -INFINITY, INFINITY, pv,
+                        True
+                    )
+                else:
+                    value, pv = self.split(pool, processes, player, depth, pv)
+            except Timeout:
+                break
+            result = {'turn': pv[0], 'value': value, 'depth': depth,
+                      'pv': pv}
+            if value in (INFINITY, -INFINITY):
+                # Searching deeper does not change a win or a loss.
+                break
+            if time_ms > 0:
+                if (time.time() - start) * 1000 >= time_ms:
+                    break
+                # Like the C search, always complete the first iteration.
+                self.deadline = start + time_ms / 1000.0
+        result.update(nodes=self.nodes, cutoffs=self.cutoffs,
+                      first_cutoffs=self.first_cutoffs)
+        return result
+
+    def split(self, pool, processes, player, depth, prev_pv):
+        """ Like negamax at the root, but search the turns in the processes
+        of pool. Process i gets every processes-th turn starting at the
+        i-th. """
+        turns = self.board.legal_turns(player)
+        if prev_pv and prev_pv[0] in turns:
+            turns.remove(prev_pv[0])
+            turns.insert(0, prev_pv[0])
+        jobs = []
+        for i in xrange(min(processes, len(turns))):
+            share = turns[i::processes]
+            if prev_pv and prev_pv[0] in share:
+                share_pv = prev_pv
+            else:
+                share_pv = []
+            jobs.append(
+                (self.board, player, depth, share, share_pv, self.deadline)
+            )
+        best = None
+        for result in pool.map(_search_share, jobs):
+            if result is None:
+                raise Timeout
+            value, pv, nodes, cutoffs, first_cutoffs = result
+            self.nodes += nodes
+            self.cutoffs += cutoffs
+            self.first_cutoffs += first_cutoffs
+            # The turns come back as copies, make them use pypentago.CW
+            # and pypentago.CCW again.
+            pv = [(quad, row, col, pypentago.get_rotation(rot_dir), rot_quad)
+                  for quad, row, col, rot_dir, rot_quad in pv]
+            # Ties go to the turn that comes first.
+            key = (value, -turns.index(pv[0]))
+            if best is None or key > best[0]:
+                best = (key, pv)
+        return best[0][0], best[1]
+
+    def negamax(self, board, player, depth, alpha, beta, prev_pv, root,
+                turns=None):
+        """ Return the value of board for player and the best line of play
+        found, trying prev_pv first. At the root, a turn is returned even
+        if all of them lose, and only turns is searched if it is given. """
+        self.nodes += 1
+        if (self.deadline is not None and not self.nodes % self.CHECK_EVERY
+            and time.time() >= self.deadline):
+            raise Timeout
+        if depth == 0:
+            return evaluate(board, player), []
+
+        if turns is None:
+            turns = board.legal_turns(player)
+        else:
+            turns = list(turns)
+        if prev_pv and prev_pv[0] in turns:
+            turns.remove(prev_pv[0])
+            turns.insert(0, prev_pv[0])
+        best_pv = []
+        for i, turn in enumerate(turns):
+            child = board.copy()
+            child.apply_turn(player, turn)
+            winner = child.win()
+            if winner == 3:
+                value, line = 0, []
+            elif winner == player:
+                value, line = INFINITY, []
+            elif winner:
+                value, line = -INFINITY, []
+            else:
+                if i == 0:
+                    child_pv = prev_pv[1:]
+                else:
+                    child_pv = []
+                value, line = self.negamax(
+                    child, 3 - player, depth - 1, -beta, -alpha, child_pv,
+                    False
+                )
+                value = -value
+            if value > alpha or (root and not best_pv):
+                alpha = max(alpha, value)
+                best_pv = [turn] + line
+            if beta <= alpha:
+                self.cutoffs += 1
+                if i == 0:
+                    self.first_cutoffs += 1
+                break
+        return alpha, best_pv
+
+
+def _search_share(args):
+    """ Search a share of the turns at the root in a process of the pool of
+    PythonSearch.split. Return None if time ran out. """
+    board, player, depth, turns, prev_pv, deadline = args
+    searcher = PythonSearch(board)
+    searcher.deadline = deadline
+    try:
+        value, pv = searcher.negamax(
+            board, player, depth, -INFINITY, INFINITY, prev_pv, True, turns
+        )
+    except Timeout:
+        return None
+    return (value, pv, searcher.nodes, searcher.cutoffs,
+            searcher.first_cutoffs)
+
+
+def search(board, player, time_ms=0, max_depth=0, threads=1, seed=-1):
+    """ Search the best turn for player on board for at most time_ms
+    milliseconds and max_depth plies. Return a dict with the turn, its
+    value, the depth reached, the best line of play and the statistics of
+    the search, see pypentago._board.Board.search.
+
+    The turns at the root are split between threads threads. If seed is
+    not negative, the result does not depend on how they are scheduled.
+    Boards without a search of their own use processes instead, which
+    always give reproducible results. """
+    if hasattr(board, 'search'):
+        return board.search(player, time_ms=time_ms, max_depth=max_depth,
+                            threads=threads, seed=seed)
+    return PythonSearch(board).search(player, time_ms, max_depth, threads)
+
+
+class Engine(ReactorThreadPool):
+    """ Run searches in a pool of threads. Every method returns a Deferred
+    that fires in the reactor thread once the search is finished. See
+    ReactorThreadPool for when the pool runs. """
+    def __init__(self, threads=4, reactor=None):
+        ReactorThreadPool.__init__(self, threads, 'pypentago.ai', reactor)
+
+    def search(self, board, player, time_ms=0, max_depth=0, threads=1,
+               seed=-1):
+        """ Search the best turn for player on a copy of board, see
+        search. Changing board afterwards does not affect the search. """
+        return self.defer(
+            search, board.copy(), player, time_ms, max_depth, threads, seed
+        )
+
+    def best_turn(self, board, player, time_ms=0, max_depth=0, threads=1,
+                  seed=-1):
+        """ Same as search, but only fire with the turn. """
+        return self.search(
+            board, player, time_ms, max_depth, threads, seed
+        ).addCallback(lambda result: result['turn'])
+
+
+load_weights()
@@ -21,10 +21,17 @@ Only basic checks, like preventing setting a stone on a square that is not
 empty are done. It does make no attempts of managing the players in any way.
 This is the responsibility of pypentago.core.Game.
 
+BitBoard is a drop-in replacement for Board that keeps one integer per player
+and checks for a winner against a precomputed table of all five-in-a-row
+masks. It is the default board of pypentago.core.Game.
+
 For an optimized C implementation see pypentago._board. """
 
+import operator
 import itertools
 
+from copy import deepcopy
+
 import pypentago
 import pypentago.util
 
@@ -35,6 +42,247 @@ WHITE = 1
 BLACK = 2
 
 
+def _line(row, col, drow, dcol):
+    """ Return the bit mask of the five squares starting at row, col and
+    continuing in direction (drow, dcol). """
+    mask = 0
+    for x in xrange(5):
+        mask |= 1 << (6 * (row + x * drow) + col + x * dcol)
+    return mask
+
+
+#: All 32 ways of getting five in a row on the board. Bit 6 * row + col
+#: represents the square at row, col.
+WIN_MASKS = tuple(
+    [_line(r, c, 0, 1) for r in xrange(6) for c in xrange(2)] +
+    [_line(r, c, 1, 0) for r in xrange(2) for c in xrange(6)] +
+    [_line(r, c, 1, 1) for r in xrange(2) for c in xrange(2)] +
+    [_line(r, 5 - c, 1, -1) for r in xrange(2) for c in xrange(2)]
+)
+
+
+def _rotation(quad, cw):
+    """ Return the permutation that rotates quadrant quad clockwise if cw
+    is True or counter-clockwise otherwise as a dictionary mapping every
+    (row, col) square of the quadrant to the square its stone moves to. """
+    roff, coff = pypentago.util.offset(quad)
+    perm = {}
+    for r in xrange(3):
+        for c in xrange(3):
+            if cw:
+                dest = (c, 2 - r)
+            else:
+                dest = (2 - c, r)
+            perm[roff + r, coff + c] = (roff + dest[0], coff + dest[1])
+    return perm
+
+
+def _cycles(quad, cw):
+    """ Return the two cycles of four squares the stones move along when
+    rotating quad. The square in the middle of the quadrant never moves. """
+    perm = _rotation(quad, cw)
+    roff, coff = pypentago.util.offset(quad)
+    cycles = []
+    # One cycle for the corners, one for the edges.
+    for start in [(roff, coff), (roff, coff + 1)]:
+        cycle = [start]
+        while len(cycle) < 4:
+            cycle.append(perm[cycle[-1]])
+        cycles.append(tuple(cycle))
+    return tuple(cycles)
+
+
+def _bit_rotation(quad, cw):
+    """ Return (keep, s0, s1, s2, t0, t1, t2) for rotating quad on a
+    bit board. keep masks all squares outside of the quadrant, sN is the
+    offset of the N-th row of the quadrant and tN maps the three bits of
+    that row to their bits after the rotation. """
+    perm = _rotation(quad, cw)
+    roff, coff = pypentago.util.offset(quad)
+    shifts = []
+    tables = []
+    moved = 0
+    for r in xrange(3):
+        shifts.append(6 * (roff + r) + coff)
+        table = []
+        for chunk in xrange(8):
+            bits = 0
+            for c in xrange(3):
+                if chunk & (1 << c):
+                    drow, dcol = perm[roff + r, coff + c]
+                    bits |= 1 << (6 * drow + dcol)
+            table.append(bits)
+        tables.append(tuple(table))
+        moved |= 7 << shifts[-1]
+    return tuple([FULL ^ moved] + shifts + tables)
+
+
+#: Bit mask with all squares of the board set.
+FULL = (1 << 36) - 1
+
+#: ROTATION_CYCLES[quad][cw] are the cycles the stones of quad move along
+#: when it is rotated clockwise (cw = 1) or counter-clockwise (cw = 0).
+ROTATION_CYCLES = tuple(
+    (_cycles(quad, False), _cycles(quad, True)) for quad in xrange(4)
+)
+
+#: BIT_ROTATIONS[quad][cw] are the lookup tables used to rotate quad
+#: on a bit board, see _bit_rotation.
+BIT_ROTATIONS = tuple(
+    (_bit_rotation(quad, False), _bit_rotation(quad, True))
+    for quad in xrange(4)
+)
+
+
+def _squares(mask):
+    """ Return the (row, col) squares set in mask. """
+    return tuple((i // 6, i % 6) for i in xrange(36) if mask & (1 << i))
+
+
+#: The five (row, col) squares of each of the lines in WIN_MASKS.
+LINES = tuple(_squares(mask) for mask in WIN_MASKS)
+
+#: Bit mask with the bits of all lines set.
+ALL_LINES = (1 << len(LINES)) - 1
+
+#: Bit i of SQUARE_LINES[row][col] is set if LINES[i] contains the square.
+SQUARE_LINES = tuple(
+    tuple(
+        sum(1 << i for i, mask in enumerate(WIN_MASKS)
+            if mask & (1 << (6 * row + col)))
+        for col in xrange(6)
+    ) for row in xrange(6)
+)
+
+#: Bit i of QUAD_LINES[quad] is set if LINES[i] crosses the quadrant.
+QUAD_LINES = tuple(
+    reduce(
+        lambda a, b: a | b,
+        [SQUARE_LINES[row][col] for row, col in _rotation(quad, True)]
+    ) for quad in xrange(4)
+)
+
+#: Map the bit of a line to its index in LINES.
+LINE_INDEX = dict((1 << i, i) for i in xrange(len(LINES)))
+
+
+def _rotated_masks(mask):
+    """ Return the masks of the squares whose stones end up on the squares
+    of mask when a quadrant is rotated, leaving out the rotations that do
+    not change which squares those are. """
+    ret = []
+    for quad in xrange(4):
+        for cw in (True, False):
+            perm = _rotation(quad, cw)
+            rotated = 0
+            for i in xrange(36):
+                dest = perm.get((i // 6, i % 6), (i // 6, i % 6))
+                if mask & (1 << (6 * dest[0] + dest[1])):
+                    rotated |= 1 << i
+            if rotated != mask and rotated not in ret:
+                ret.append(rotated)
+    return tuple(ret)
+
+
+#: ROTATED_MASKS[i] are the squares that would complete WIN_MASKS[i] if
+#: they were owned by one player and the right quadrant was rotated.
+ROTATED_MASKS = tuple(_rotated_masks(mask) for mask in WIN_MASKS)
+
+MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(state):
+    """ Yield the numbers of the splitmix64 generator seeded with state. """
+    while True:
+        state = (state + 0x9E3779B97F4A7C15) & MASK64
+        z = state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        yield z ^ (z >> 31)
+
+
+def _rotl(x, n):
+    """ Rotate the 64 bit integer x left by n bits. """
+    return ((x << n) | (x >> (64 - n))) & MASK64 if n else x
+
+
+_keys = _splitmix64(0x70656e7461676f)
+#: ZOBRIST_KEYS[i][player] is the key of a stone of player on the square
+#: i = 3 * row + col relative to quadrant 0. The key for the same square of
+#: quadrant q is that key rotated left by 16 * q bits. These are the same
+#: keys as the ones of the C implementation.
+ZOBRIST_KEYS = tuple(
+    (0, ) + tuple(itertools.islice(_keys, 2)) for _ in xrange(9)
+)
+del _keys
+
+def transform_square(symmetry, row, col, size=6):
+    """ Return the square row, col is moved to by symmetry on a board of
+    size times size squares. The 8 symmetries of the board are numbered
+    4 * flip + k; symmetry rotates the board k times clockwise and then
+    mirrors it left to right if flip is 1. """
+    for _ in xrange(symmetry & 3):
+        row, col = col, size - 1 - row
+    if symmetry & 4:
+        col = size - 1 - col
+    return row, col
+
+
+#: TRANSFORMED_SQUARE[s][i] is the square i = 3 * row + col of a quadrant
+#: is moved to by symmetry s. Every symmetry transforms the squares within
+#: the quadrants the same way it transforms the board.
+TRANSFORMED_SQUARE = tuple(
+    tuple(
+        3 * r + c for r, c in
+        (transform_square(s, i // 3, i % 3, 3) for i in xrange(9))
+    ) for s in xrange(8)
+)
+
+#: SYMMETRIC_QUAD[s][q] is the quadrant quad q is moved to by symmetry s.
+SYMMETRIC_QUAD = tuple(
+    tuple(
+        2 * r + c for r, c in
+        (transform_square(s, q // 2, q % 2, 2) for q in xrange(4))
+    ) for s in xrange(8)
+)
+
+
+def _square_keys(row, col, player):
+    """ Return (quad, key, transformed) for a stone of player on row, col.
+    key is its key in the hash of the board and transformed[s] its key in
+    the hash of the quadrant after the quadrant has been transformed by
+    symmetry s. """
+    quad = 2 * (row >= 3) + (col >= 3)
+    i = 3 * (row % 3) + col % 3
+    return (
+        quad,
+        _rotl(ZOBRIST_KEYS[i][player], 16 * quad),
+        tuple(ZOBRIST_KEYS[TRANSFORMED_SQUARE[s][i]][player]
+              for s in xrange(8))
+    )
+
+
+#: SQUARE_KEYS[row][col][player] is _square_keys(row, col, player).
+SQUARE_KEYS = tuple(
+    tuple(
+        (None, ) + tuple(_square_keys(row, col, player) for player in (1, 2))
+        for col in xrange(6)
+    ) for row in xrange(6)
+)
+
+
+def zobrist(board):
+    """ Compute the Zobrist hash of the stones on board from scratch. This
+    is what the key attribute of the boards is kept at. """
+    key = 0
+    for row in xrange(6):
+        for col in xrange(6):
+            value = board[row, col]
+            if value:
+                key ^= SQUARE_KEYS[row][col][value][1]
+    return key
+
+
 def has_won(line, check):
     """ Check whether line contains 5 stones of the same player. """
     connected = 0
@@ -77,7 +325,7 @@ class Board(object):
         1
         >>> board.filled
         1
-        >>> board.set(1, 0, 1) # doctest: +ELLIPSIS
+        >>> board.set(1, 0, 1) # doctest: +IGNORE_EXCEPTION_DETAIL
         Traceback (most recent call last):
           File "<stdin>", line 1, in <module>
           File ".../pypentago/board.py", line 90, in set
@@ -92,7 +340,7 @@ class Board(object):
         0 0 0  0 0 0
         1 0 0  0 0 0
         0 0 0  0 0 0
-        
+        <BLANKLINE>
         0 0 0  0 0 0
         0 0 0  0 0 0
         0 0 0  0 0 0
@@ -102,15 +350,148 @@ class Board(object):
     def __init__(self, beginner=1):
         self.board = [[0 for _ in xrange(6)] for _ in xrange(6)]
         self.filled = 0
+        self._init_lines()
+        self._init_key()
+    
+    def _init_lines(self):
+        """ Set up the cache used by win. Bit i of _dirty is set if LINES[i]
+        may have changed since win last looked at it, _owner[i] is the
+        player who owned it back then, and _won[player] is the number of
+        lines player owns (_won[0] the number of lines nobody owns). """
+        self._dirty = ALL_LINES
+        self._owner = [0] * len(LINES)
+        self._won = [len(LINES), 0, 0]
+    
+    def _init_key(self):
+        """ Set up the Zobrist hash of the board. key is the hash of all
+        stones, _qhash[q][(_qrot[q] + k) % 4] the hash of the stones of
+        quadrant q as they would be after rotating it k times clockwise,
+        using the keys of quadrant 0, and _qhash[q][4 + (_qrot[q] + k) % 4]
+        the same for the mirror image of that. Rotating a quadrant thus
+        only changes _qrot[q] and needs no look at its stones. """
+        self.key = 0
+        self._qhash = [[0] * 8 for _ in xrange(4)]
+        self._qrot = [0] * 4
+    
+    def _toggle(self, row, col, value):
+        """ Add or remove a stone of player value on row, col to or from
+        the hashes of the board. """
+        if not value:
+            return
+        quad, key, transformed = SQUARE_KEYS[row][col][value]
+        qhash = self._qhash[quad]
+        qrot = self._qrot[quad]
+        for k in xrange(4):
+            j = (qrot + k) & 3
+            qhash[j] ^= transformed[k]
+            qhash[4 + j] ^= transformed[4 + k]
+        self.key ^= key
+    
+    def _rotate_key(self, quad, cw):
+        """ Update the hashes of the board for rotating quad. """
+        qhash = self._qhash[quad]
+        old = qhash[self._qrot[quad]]
+        self._qrot[quad] = qrot = (self._qrot[quad] + (1 if cw else 3)) & 3
+        self.key ^= _rotl(old ^ qhash[qrot], 16 * quad)
+    
+    def copy(self):
+        """ Return an independent copy of the board. """
+        return deepcopy(self)
+    
+    def legal_turns(self, player):
+        """ Return the turns player can make in the format apply_turn
+        accepts. Turns that result in the same position as an earlier one,
+        e.g. by rotating an empty quadrant or a symmetric one, are left out.
+        
+        The hash of the position after a turn is computed from the
+        per-quadrant hashes without making the turn. """
+        qhash = self._qhash
+        qrot = self._qrot
+        # delta[q][cw] is what rotating q XORs into the hash of q.
+        delta = [
+            [qhash[q][qrot[q]] ^ qhash[q][(qrot[q] + k) & 3] for k in (3, 1)]
+            for q in xrange(4)
+        ]
+        directions = ((0, pypentago.CCW), (1, pypentago.CW))
+        seen = set()
+        turns = []
+        for row in xrange(6):
+            for col in xrange(6):
+                if self[row, col]:
+                    continue
+                quad, key, transformed = SQUARE_KEYS[row][col][player]
+                placed = self.key ^ key
+                for rot_quad in xrange(4):
+                    for cw, rot_dir in directions:
+                        d = delta[rot_quad][cw]
+                        if rot_quad == quad:
+                            # The new stone is rotated too.
+                            d ^= transformed[0] ^ transformed[1 if cw else 3]
+                        result = placed ^ _rotl(d, 16 * rot_quad)
+                        if result not in seen:
+                            seen.add(result)
+                            turns.append(
+                                (quad, row % 3, col % 3, rot_dir, rot_quad)
+                            )
+        return turns
+    
+    def perft(self, player, depth, distinct=False):
+        """ Return the number of ways player and his opponent can make depth
+        turns in a row. The game ends once somebody has five in a row, so
+        no turns are made after that. If distinct is True, only the turns
+        legal_turns returns are made. The board is left as it was. """
+        if depth <= 0:
+            return 1
+        if distinct:
+            turns = self.legal_turns(player)
+        else:
+            turns = [
+                (2 * (row >= 3) + (col >= 3), row % 3, col % 3, rot_dir,
+                 rot_quad)
+                for row in xrange(6) for col in xrange(6)
+                if not self[row, col]
+                for rot_quad in xrange(4)
+                for rot_dir in (pypentago.CCW, pypentago.CW)
+            ]
+        nodes = 0
+        for quad, row, col, rot_dir, rot_quad in turns:
+            roff, coff = pypentago.util.offset(quad)
+            row += roff
+            col += coff
+            cw = rot_dir == pypentago.CW
+            self.set(row, col, player)
+            self.rotate(rot_quad, cw)
+            if depth == 1:
+                nodes += 1
+            elif not self.win():
+                nodes += self.perft(3 - player, depth - 1, distinct)
+            self.rotate(rot_quad, not cw)
+            self[row, col] = 0
+            self.filled -= 1
+        return nodes
+    
+    def canonical_key(self):
+        """ Return the smallest Zobrist hash of the 8 symmetric images of
+        the board, see transform_square. Positions that are symmetric to
+        each other get the same key. """
+        qhash = self._qhash
+        qrot = self._qrot
+        return min(
+            reduce(operator.xor, [
+                _rotl(qhash[q][(s & 4) | ((qrot[q] + s) & 3)],
+                      16 * SYMMETRIC_QUAD[s][q])
+                for q in xrange(4)
+            ]) for s in xrange(8)
+        )
     
     def apply_turn(self, playerid, turn):
         """ turn is (quad, row, col, rot_dir, rot_quad). """
         quad, row, col, rot_dir, rot_quad = turn
         self.set_relative(quad, row, col, playerid)
         if rot_dir == pypentago.CW:
-            self.rotate_cw(rot_quad)
+            self.rotate(rot_quad, True)
         elif rot_dir == pypentago.CCW:
-            self.rotate_ccw(rot_quad)
+            self.rotate(rot_quad, False)
         else:
             raise ValueError
     
@@ -122,6 +503,8 @@ class Board(object):
         if self.board[row][col]:
             raise SquareNotEmpty
         self.board[row][col] = value
+        self._dirty |= SQUARE_LINES[row][col]
+        self._toggle(row, col, value)
         if value:
             self.filled += 1
     
@@ -149,15 +532,13 @@ class Board(object):
             raise ValueError
         
         b = self.board
-        row, col = pypentago.util.offset(quad)
-        q = [b[row + r][col: col+3] for r in xrange(3)]
-        
-        for r in xrange(3):
-            for c in xrange(3):
-                if cw:
-                    b[row+c][col+2-r] = q[r][c]
-                else:
-                    b[row+c][col+2-r] = q[2-r][2-c]
+        cycles = ROTATION_CYCLES[quad][bool(cw)]
+        for (r0, c0), (r1, c1), (r2, c2), (r3, c3) in cycles:
+            b[r1][c1], b[r2][c2], b[r3][c3], b[r0][c0] = (
+                b[r0][c0], b[r1][c1], b[r2][c2], b[r3][c3]
+            )
+        self._dirty |= QUAD_LINES[quad]
+        self._rotate_key(quad, cw)
     
     def rotate_cw(self, quad):
         """ Rotate the quadrant quad clockwise. """
@@ -169,19 +550,46 @@ class Board(object):
     
     def win(self):
         """ If a winner has been found, return their id. If the game is
-        a draw, return 3. If no winner has been found return 0. """
+        a draw, return 3. If no winner has been found return 0.
+        
+        Only the lines that may have changed since the last call are
+        looked at again. """
         if self.filled == 36:
             return 3
-        winner = 0
-        for player in (1, 2):           
-            for line in itertools.chain(self.cols, self.rows,
-                                        self.diagonals):
-                if has_won(line, player):
-                    if not winner:
-                        winner = player
-                    elif winner != player:
-                        return 3
-        return winner
+        dirty = self._dirty
+        if dirty:
+            owner = self._owner
+            won = self._won
+            while dirty:
+                bit = dirty & -dirty
+                dirty ^= bit
+                i = LINE_INDEX[bit]
+                new = self._line_owner(LINES[i])
+                if new != owner[i]:
+                    won[owner[i]] -= 1
+                    won[new] += 1
+                    owner[i] = new
+            self._dirty = 0
+        else:
+            won = self._won
+        if won[1]:
+            if won[2]:
+                return 3
+            return 1
+        elif won[2]:
+            return 2
+        return 0
+    
+    def _line_owner(self, line):
+        """ Return the player who has five in a row on line, which is one
+        of LINES, or 0 if nobody has. """
+        b = self.board
+        (r0, c0), (r1, c1), (r2, c2), (r3, c3), (r4, c4) = line
+        v = b[r0][c0]
+        if (v and b[r1][c1] == v and b[r2][c2] == v and b[r3][c3] == v and
+            b[r4][c4] == v):
+            return v
+        return 0
     
     def get_row(self, row):
         for i in xrange(6):
@@ -228,8 +636,132 @@ class Board(object):
     
     def __setitem__(self, i, v):
         r, c = i
+        self._toggle(r, c, self.board[r][c])
         self.board[r][c] = v
+        self._dirty |= SQUARE_LINES[r][c]
+        self._toggle(r, c, v)
     
     def __getitem__(self, i):
         r, c = i
         return self.board[r][c]
+
+
+class BitBoard(Board):
+    """
+    Board that stores the stones of every player as bits of one integer.
+    Bit 6 * row + col is set if the player has a stone on the square
+    at row, col. The interface is the same as the one of Board.
+    
+        >>> board = BitBoard()
+        >>> board[1, 0] = 1
+        >>> board[1, 0]
+        1
+        >>> board.filled
+        0
+        >>> board.set(1, 1, 2)
+        >>> board.get(1, 1)
+        2
+        >>> board.filled
+        1
+        >>> board.stones[2]
+        128
+        >>> 
+    """
+    def __init__(self, beginner=1):
+        # Index 0 is never set, it only exists so that the player ids
+        # can be used as indices.
+        self.stones = [0, 0, 0]
+        self.filled = 0
+        self._init_key()
+    
+    def set(self, row, col, value):
+        """ Set square at absolute position row, col to value. If the square
+        isn't empty, raise pypentago.exceptions.SquareNotEmpty.
+        
+        Increase the filled counter by one. """
+        bit = 1 << (6 * row + col)
+        stones = self.stones
+        if (stones[1] | stones[2]) & bit:
+            raise SquareNotEmpty
+        if value:
+            stones[value] |= bit
+            self._toggle(row, col, value)
+            self.filled += 1
+    
+    def get(self, row, col):
+        """ Get value of square at absolute position row, col. """
+        return self[row, col]
+    
+    def get_relative(self, quad, row, col):
+        """ Get value of square with row, col coordinates relative
+        to quadrant quad. """
+        return self[pypentago.util.absolute(quad, row, col)]
+    
+    def rotate(self, quad, cw):
+        """ Rotate the quadrant quad clockwise if cw equals True
+        or counter-clockwise otherwise. """
+        if quad < 0 or quad > 3:
+            # This wouldn't go well.
+            raise ValueError
+        
+        keep, s0, s1, s2, t0, t1, t2 = BIT_ROTATIONS[quad][bool(cw)]
+        stones = self.stones
+        for player in (1, 2):
+            x = stones[player]
+            stones[player] = ((x & keep) | t0[x >> s0 & 7] |
+                              t1[x >> s1 & 7] | t2[x >> s2 & 7])
+        self._rotate_key(quad, cw)
+    
+    def win(self):
+        """ If a winner has been found, return their id. If the game is
+        a draw, return 3. If no winner has been found return 0.
+        
+        Testing the bits of every line is cheaper than keeping track of
+        the ones that changed, so all of them are looked at. """
+        if self.filled == 36:
+            return 3
+        one = self.stones[1]
+        two = self.stones[2]
+        winner = 0
+        for mask in WIN_MASKS:
+            if one & mask == mask:
+                winner |= 1
+            elif two & mask == mask:
+                winner |= 2
+        return winner
+    
+    def get_row(self, row):
+        for i in xrange(6):
+            yield self[row, i]
+    
+    def get_col(self, col):
+        for i in xrange(6):
+            yield self[i, col]
+    
+    def get_dia_downwards(self, r, c):
+        for x in xrange(6 - (r or c)):
+            yield self[r+x, c+x]
+    
+    def get_dia_upwards(self, r, c):
+        for x in xrange(6 - (r or c)):
+            yield self[r+x, 5-(c+x)]
+    
+    def __setitem__(self, i, v):
+        r, c = i
+        self._toggle(r, c, self[r, c])
+        bit = 1 << (6 * r + c)
+        stones = self.stones
+        stones[1] &= ~bit
+        stones[2] &= ~bit
+        if v:
+            stones[v] |= bit
+        self._toggle(r, c, v)
+    
+    def __getitem__(self, i):
+        r, c = i
+        bit = 1 << (6 * r + c)
+        if self.stones[1] & bit:
+            return 1
+        elif self.stones[2] & bit:
+            return 2
+        return 0
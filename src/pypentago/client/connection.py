@@ -45,7 +45,11 @@ ID_NOT_REG = False
 
 
 class ClientConnection(Connection):
+    # The list of games the server sends can get longer than the default.
+    MAX_LENGTH = 1024 * 1024
+    
     def init(self):
+        self.hello()
         self.factory.callback(self)
         #: This maps the game-id to the remote player.
         self.remote_table = {}
@@ -54,6 +58,9 @@ class ClientConnection(Connection):
         self.name = 'Local Player'
         self.login_as = None
         self.server_window = self.factory.parent
+        #: The open games on the server by their uid.
+        self.open_games = {}
+        self.games_version = None
     
     def destruct(self, reason):
         self.server_window.connection_lost(reason)
@@ -128,7 +135,35 @@ class ClientConnection(Connection):
     
     @expose("GAMES")
     def games(self, evt):
-        self.server_window.show_games(evt['data'])
+        """ The whole list of open games, see pypentago.server.lobby. """
+        self.games_version = evt['data']['version']
+        self.open_games = dict(
+            (game['uid'], game) for game in evt['data']['games']
+        )
+        self.show_games()
+    
+    @expose("GAMEADDED", "GAMEUPDATED", "GAMEREMOVED")
+    def game_changed(self, evt):
+        data = evt['data']
+        if self.games_version is None:
+            # Waiting for the whole list, which includes this change.
+            return
+        if data['version'] != self.games_version + 1:
+            # We missed a change, get the whole list again.
+            self.games_version = None
+            self.send("GAMELIST")
+            return
+        self.games_version = data['version']
+        if evt['keyword'] == "GAMEREMOVED":
+            self.open_games.pop(data['uid'], None)
+        else:
+            self.open_games[data['game']['uid']] = data['game']
+        self.show_games()
+    
+    def show_games(self):
+        self.server_window.show_games(
+            [self.open_games[uid] for uid in sorted(self.open_games)]
+        )
     
     @classmethod
     def start_new(cls, host, port, parent, callback=None):
@@ -78,6 +78,9 @@ def init_server_conf(location):
     server.set('server', 'port', str(pypentago.DEFAULT_PORT))
     server.set('server', 'daemon', 'False')
     server.set('server', 'database', 'sqlite:///:memory:')
+    server.set('server', 'high_water', str(1024 * 1024))
+    server.set('server', 'admins', '')
+    server.set('server', 'stats_interval', '0')
     
     with open(server_file, 'w') as server_file:
         server.write(server_file)
@@ -30,12 +30,10 @@ from pypentago.exceptions import (InvalidTurn, SquareNotEmpty, NotYourTurn,
 
 
 try:
-    # The extension module is critically bugged.
-    raise ImportError
     from pypentago._board import Board
     EXTENSION_MODULE = True
 except ImportError:
-    from pypentago.board import Board
+    from pypentago.board import BitBoard as Board
     EXTENSION_MODULE = False
 
 
@@ -138,6 +136,14 @@ class Player(object):
 class RemotePlayer(Player):
     """ The RemotePlayer sends everything he observes trough
     the connection passed to it. """
+    #: Maps the methods that send something to the command sent and the
+    #: index of the argument sent with it, or None if there is none.
+    messages = {
+        'display_turn': ('TURN', 1),
+        'display_msg': ('MSG', 1),
+        'player_quit': ('QUIT', None),
+    }
+    
     def __init__(self, conn=None, name=None):
         Player.__init__(self, name)
         self.cmd = {
@@ -151,30 +157,27 @@ class RemotePlayer(Player):
     def lookup(self, cmd):
         return self.cmd[cmd]
     
+    def message(self, method, *args):
+        """ Return the keyword and the data that are sent when method is
+        called with args. The message is the same for all RemotePlayers of
+        the game, so it can be sent to all of them at once. """
+        cmd, arg = self.messages[method]
+        if arg is None:
+            return rpcializer.game(self.game, cmd)
+        return rpcializer.game(self.game, cmd, rpcializer.raw(args[arg]))
+    
     def display_turn(self, player, turn):
-        self.conn.send(
-            *rpcializer.game(self.game, 'TURN', rpcializer.raw(turn))
-        )
+        self.conn.send(*self.message('display_turn', player, turn))
     
     def display_msg(self, author, msg):
-        self.conn.send(
-            *rpcializer.game(self.game, 'MSG', rpcializer.raw(msg))
-        )
+        self.conn.send(*self.message('display_msg', author, msg))
     
     def player_quit(self, player):
-        self.conn.send(
-            *rpcializer.game(self.game, 'QUIT')
-        )
+        self.conn.send(*self.message('player_quit', player))
     
     def quit_game(self):
         del self.conn.remote_table[self.game.uid]
-        
-        # Prevent the games from being synced twice.
-        a = len(self.game.players) == 2
-
         Player.quit_game(self)
-        if a and hasattr(self.conn, 'server'):
-            self.conn.server.sync_games()
 
 
 class Game(object):
@@ -231,14 +234,12 @@ class Game(object):
         self.board.apply_turn(player.uid, turn)
         self.last_set = player
         
-        for person in self.people(player):
-            person.display_turn(player, turn)
+        self.notify(player, 'display_turn', player, turn)
         
         winner, loser = self.get_winner()
         if winner is not None:
             self.game_over(winner, loser)
-            for p in self.people():
-                p.game_over(winner, loser)
+            self.notify(None, 'game_over', winner, loser)
     
     def get_winner(self):
         """ Return (winner, loser).
@@ -274,8 +275,7 @@ class Game(object):
             raise GameFull
         p.uid = self.new_id()
         p.game = self
-        for person in self.people():
-            person.player_joined(p)
+        self.notify(None, 'player_joined', p)
         self.players.append(p)
     
     def add_player_with_uid(self, p):
@@ -294,8 +294,7 @@ class Game(object):
                 raise ValueError("Duplicate uid in game!")
         
         p.game = self
-        for person in self.people():
-            person.player_joined(p)
+        self.notify(None, 'player_joined', p)
         self.players.insert(p.uid - 1, p)
     
     def add_observer(self, o):
@@ -317,8 +316,7 @@ class Game(object):
         to display it. The author's display_msg isn't called. """
         if not msg.strip():
             return
-        for p in self.people(author):
-            p.display_msg(author.name, msg)
+        self.notify(author, 'display_msg', author.name, msg)
     
     def player_quit(self, player):
         """ Remove player from the game. The game is over afterwards. """
@@ -328,9 +326,8 @@ class Game(object):
         self.over = True
         
         self.players.remove(player)
-        for p in self.people():
-            # FIXME: Also call p.game_over?
-            p.player_quit(player)
+        # FIXME: Also call game_over?
+        self.notify(None, 'player_quit', player)
     
     # FIXME: Rename to attendees?
     def people(self, but=None):
@@ -345,6 +342,12 @@ class Game(object):
             if item != but:
                 yield item
     
+    def notify(self, but, method, *args):
+        """ Call method of all people in the game except but with args.
+        Override to tell many people at once. """
+        for person in self.people(but):
+            getattr(person, method)(*args)
+    
     def game_over(self, winner, loser):
         self.over = True
         
@@ -0,0 +1,569 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Put load on a server by letting many clients play games on it.
+
+Every client is a Connection speaking the same protocol as the real client.
+Clients come in pairs: both log in, one opens a game, the other one joins
+it and they play it to the end, making random turns or the turns the AI
+finds best. The one that made the last turn sends a message, then both log
+out and disconnect, and a new pair connects until enough games have been
+played.
+
+How long the server took to answer every request is recorded. A turn or a
+message is answered once the opponent receives it. At the end, the
+percentiles of these latencies, the throughput and the count of every
+error are printed. """
+
+from __future__ import with_statement
+
+import sys
+import math
+import time
+import random
+import logging
+
+from optparse import OptionParser
+
+from twisted.internet import protocol, defer
+
+import pypentago
+
+from pypentago import core, ai, CW, DEFAULT_PORT, verbosity_levels
+from pypentago.network import expose, Connection, dumps
+from pypentago.network import stats as keyword_stats
+from pypentago.client.connection import ClientConnection
+
+#: Keywords that tell the client its request went wrong.
+ERRORS = ['INTERNALERROR', 'BADINPUT', 'MALFORMED', 'NOHANDLER', 'AUTHREQ',
+          'INVGAME', 'GAMEFULL', 'ALREADYJOINED', 'NOLOGIN', 'AUTHF']
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    """ Return the p-th percentile of the sorted list values by the nearest
+    rank method. """
+    if not values:
+        return None
+    rank = int(math.ceil(p / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def wire_turn(turn):
+    """ Return turn the way it is sent through the network. """
+    quad, row, col, rot_dir, rot_quad = turn
+    return [quad, row, col, rot_dir == CW and "CW" or "CCW", rot_quad]
+
+
+class Stats(object):
+    """ Latencies, counts of messages and errors of a run. """
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.sent = 0
+        self.received = 0
+        self.games = 0
+        self.turns = 0
+        self.start = self.end = time.time()
+
+    def latency(self, kind, seconds):
+        self.latencies.setdefault(kind, []).append(seconds)
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self):
+        """ Return a dictionary with the figures of the run. """
+        elapsed = max(self.end - self.start, 1e-9)
+        latencies = {}
+        for kind, values in self.latencies.iteritems():
+            values = sorted(values)
+            latencies[kind] = dict(
+                [('count', len(values)), ('max', values[-1])] +
+                [('p%d' % p, percentile(values, p)) for p in PERCENTILES]
+            )
+        return {
+            'seconds': elapsed,
+            'games': self.games,
+            'turns': self.turns,
+            'sent': self.sent,
+            'received': self.received,
+            'messages_per_second': (self.sent + self.received) / elapsed,
+            'turns_per_second': self.turns / elapsed,
+            'latencies': latencies,
+            'errors': self.errors,
+        }
+
+
+class Match(object):
+    """ The game a pair of clients plays. Both clients share it to know
+    what the position is and when the last request was sent. """
+    def __init__(self, load):
+        self.load = load
+        self.gid = None
+        self.board = core.Board()
+        self.clients = []
+        self.ended = 0
+        self.over = False
+        self.aborted = False
+        #: Maps 'turn' and 'msg' to what was sent last and when.
+        self.sent = {}
+
+    def choose_turn(self, player):
+        """ Return a Deferred that fires with the turn player makes. The AI
+        searches in the threads of the engine of the load, so that the
+        other clients keep playing meanwhile. """
+        if self.load.depth:
+            return self.load.engine.best_turn(self.board, player,
+                                              max_depth=self.load.depth)
+        return defer.succeed(
+            self.load.rand.choice(self.board.legal_turns(player))
+        )
+
+    def apply_turn(self, player, turn):
+        """ Apply turn to the board and return True if the game is over
+        afterwards. """
+        self.board.apply_turn(player, turn)
+        self.load.stats.turns += 1
+        self.over = bool(self.board.win() or
+                         not self.board.legal_turns(3 - player))
+        return self.over
+
+    def ready(self):
+        """ Called when the guest has logged in and when the host has
+        opened the game. The guest joins once both happened. """
+        if self.gid is None:
+            return
+        for client in self.clients:
+            if client.waiting:
+                client.join(self.gid)
+
+    def abort(self):
+        """ Disconnect all clients, the game cannot be played. """
+        self.aborted = True
+        for client in list(self.clients):
+            client.close()
+
+    def ended_client(self, client=None):
+        """ Called when client disconnected, or when a client could not
+        connect if it is None. """
+        if client is not None:
+            self.clients.remove(client)
+        self.ended += 1
+        if self.ended == 2:
+            self.load.match_done(self)
+
+
+class LoadClient(Connection):
+    """ A client playing its Match through the real protocol. """
+    MAX_LENGTH = ClientConnection.MAX_LENGTH
+
+    def init(self):
+        self.load = self.factory.load
+        self.match = self.factory.match
+        self.host = self.factory.host
+        self.player_id = None
+        self.waiting = False
+        self.requests = {}
+        self.match.clients.append(self)
+        if self.match.aborted:
+            self.close()
+            return
+        if self.load.wire != 'json':
+            self.wires = (self.load.wire, )
+            self.hello()
+        if self.load.login:
+            self.request('login', "LOGIN", {'login': self.load.login,
+                                            'passwd': self.load.passwd})
+        else:
+            self.logged_in()
+
+    def destruct(self, reason):
+        if self.load.stopped:
+            # Disconnected because the run is over.
+            return
+        if self.requests:
+            self.load.stats.error('unanswered')
+        if not self.match.over and not self.match.aborted:
+            self.load.stats.error('aborted')
+        self.match.ended_client(self)
+
+    def send(self, keyword, data=None):
+        self.load.stats.sent += 1
+        Connection.send(self, keyword, data)
+
+    def lineReceived(self, line):
+        self.load.stats.received += 1
+        Connection.lineReceived(self, line)
+
+    def request(self, kind, keyword, data=None):
+        """ Send keyword and remember when, so the latency can be recorded
+        once the answer arrives. """
+        self.requests[kind] = time.time()
+        self.send(keyword, data)
+
+    def answered(self, kind):
+        start = self.requests.pop(kind, None)
+        if start is not None:
+            self.load.stats.latency(kind, time.time() - start)
+
+    def logged_in(self):
+        if self.host:
+            self.request('open', "OPEN", "Load test")
+        else:
+            self.waiting = True
+            self.match.ready()
+
+    def join(self, gid):
+        self.waiting = False
+        self.request('join', "JOIN", gid)
+
+    def make_turn(self):
+        self.match.choose_turn(self.player_id).addCallbacks(
+            self.send_turn, self.turn_failed
+        )
+
+    def send_turn(self, turn):
+        if not self.connected:
+            # The run is over or the game was aborted meanwhile.
+            return
+        turn = wire_turn(turn)
+        self.match.sent['turn'] = (turn, time.time())
+        self.match.apply_turn(self.player_id, turn)
+        self.send("GAME", [self.match.gid, "TURN", [["", turn]]])
+        if self.match.over:
+            self.match.sent['msg'] = ("gg", time.time())
+            self.send("GAME", [self.match.gid, "MSG", [["", "gg"]]])
+
+    def turn_failed(self, failure):
+        logging.getLogger("pypentago.loadtest").error(
+            "Error choosing a turn:\n%s" % failure.getTraceback()
+        )
+        self.load.stats.error('client error')
+        self.close()
+
+    def logout(self):
+        self.request('logout', "LOGOUT")
+
+    @expose("AUTH", "NOLOGIN", "AUTHF")
+    def login_answer(self, evt):
+        if evt['keyword'] != "AUTH":
+            self.load.stats.error(evt['keyword'])
+        self.answered('login')
+        self.logged_in()
+
+    @expose("OPENGAME")
+    def opened(self, evt):
+        self.answered('open')
+        self.match.gid = evt['data']
+        self.match.ready()
+
+    @expose("INITGAME")
+    def init_game(self, evt):
+        self.answered('join')
+        self.player_id = evt['data']['player_id']
+        if evt['data']['beginner']:
+            self.make_turn()
+
+    @expose("GAME")
+    def game(self, evt):
+        gid, cmd, args = evt['data']
+        if cmd == "TURN":
+            sent, start = self.match.sent['turn']
+            if args[0][1] != sent:
+                self.load.stats.error('wrong turn')
+            self.load.stats.latency('turn', time.time() - start)
+            if not self.match.over:
+                self.make_turn()
+        elif cmd == "MSG":
+            sent, start = self.match.sent['msg']
+            if args[0][1] != sent:
+                self.load.stats.error('wrong message')
+            self.load.stats.latency('msg', time.time() - start)
+            self.load.stats.games += 1
+            self.logout()
+        elif cmd == "QUIT":
+            if not self.match.over:
+                self.load.stats.error('opponent quit')
+            self.logout()
+
+    @expose("LOGGEDOUT")
+    def logged_out(self, evt):
+        self.answered('logout')
+        self.close()
+
+    @expose("GAMES", "GAMEADDED", "GAMEUPDATED", "GAMEREMOVED")
+    def games(self, evt):
+        pass
+
+    def no_handler(self, evt):
+        if evt['keyword'] in ERRORS:
+            self.load.stats.error(evt['keyword'])
+        else:
+            self.load.stats.error('unexpected %s' % evt['keyword'])
+        if self.requests.pop('login', None) is not None:
+            # Servers that do not need a login let us play anyway.
+            self.logged_in()
+
+    def malformed_request(self, request):
+        self.load.stats.error('malformed answer')
+
+    def internal_error(self, request):
+        logging.getLogger("pypentago.loadtest").error(
+            "Error handling %r" % request, exc_info=True
+        )
+        self.load.stats.error('client error')
+
+
+class LoadFactory(protocol.ClientFactory):
+    protocol = LoadClient
+
+    def __init__(self, load, match, host):
+        self.load = load
+        self.match = match
+        self.host = host
+        self.clients = []
+
+    def clientConnectionFailed(self, connector, reason):
+        self.load.stats.error('connect failed')
+        self.match.abort()
+        self.match.ended_client()
+
+
+class Load(object):
+    """ Let pairs of clients play games games on the server at host:port,
+    with at most clients clients connected at once. New clients connect
+    at rate connections per second. If depth is not 0, the turns are
+    searched that many plies deep in the threads of an ai.Engine, otherwise
+    they are random. Unless
+    timeout is 0, the run is given up after timeout seconds. The clients
+    ask the server to speak the wire format wire, see
+    pypentago.network.wire. """
+    def __init__(self, reactor, host, port, clients, games, rate=100,
+                 depth=0, login=None, passwd='', seed=None, timeout=0,
+                 wire='binary'):
+        self.reactor = reactor
+        self.host = host
+        self.port = port
+        self.clients = clients
+        self.games = games
+        self.rate = rate
+        self.depth = depth
+        self.engine = None
+        if depth:
+            self.engine = ai.Engine(reactor=reactor)
+        self.login = login
+        self.passwd = passwd
+        self.rand = random.Random(seed)
+        self.timeout = timeout
+        self.wire = wire
+        self.stats = Stats()
+        self.started = 0
+        self.done = 0
+        self.stopped = False
+        self.finished = None
+
+    def run(self, callback):
+        """ Start connecting and call callback once all games are over. """
+        self.finished = callback
+        self.stats.start = time.time()
+        if self.timeout:
+            self.reactor.callLater(self.timeout, self.timed_out)
+        for i in xrange(min(max(self.clients // 2, 1), self.games)):
+            self.reactor.callLater(2.0 * i / self.rate, self.start_match)
+
+    def start_match(self):
+        if self.started >= self.games:
+            return
+        self.started += 1
+        match = Match(self)
+        for host in (True, False):
+            self.reactor.connectTCP(self.host, self.port,
+                                    LoadFactory(self, match, host))
+
+    def match_done(self, match):
+        self.done += 1
+        if self.done >= self.games:
+            self.finish()
+        else:
+            self.start_match()
+
+    def timed_out(self):
+        if self.done < self.games:
+            self.stats.error('timeout')
+            self.finish()
+
+    def finish(self):
+        if not self.stopped:
+            self.stopped = True
+            self.stats.end = time.time()
+            self.finished(self.stats)
+
+
+def format_report(report):
+    lines = [
+        "%d games, %d turns in %.2f seconds" % (
+            report['games'], report['turns'], report['seconds']),
+        "%d messages sent, %d received, %.1f messages/s, %.1f turns/s" % (
+            report['sent'], report['received'],
+            report['messages_per_second'], report['turns_per_second']),
+        "",
+        "request    count   " + "".join("p%-2d ms     " % p
+                                         for p in PERCENTILES) + "max ms",
+    ]
+    for kind in ('login', 'open', 'join', 'turn', 'msg', 'logout'):
+        lat = report['latencies'].get(kind)
+        if lat is None:
+            continue
+        lines.append("%-8s %7d " % (kind, lat['count']) + "".join(
+            "%9.2f " % (lat['p%d' % p] * 1000) for p in PERCENTILES
+        ) + "%9.2f" % (lat['max'] * 1000))
+    lines.append("")
+    if report['errors']:
+        lines.append("errors:")
+        for kind, count in sorted(report['errors'].iteritems()):
+            lines.append("  %-20s %d" % (kind, count))
+    else:
+        lines.append("no errors")
+    return "\n".join(lines)
+
+
+def raise_fd_limit(wanted):
+    """ Raise the limit of open files so that wanted connections can be
+    made, as far as allowed. Does nothing where that is not possible. """
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        if hard != resource.RLIM_INFINITY:
+            wanted = min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = OptionParser(version='pypentago ' + pypentago.__version__)
+    parser.add_option("-H", "--host", dest="host", default="127.0.0.1",
+                      help="connect to the server at HOST")
+    parser.add_option("-p", "--port", type="int", dest="port",
+                      default=DEFAULT_PORT,
+                      help="connect to the server on PORT")
+    parser.add_option("-l", "--local", action="store_true", dest="local",
+                      default=False,
+                      help="start a server on the loopback interface in "
+                      "this process and connect to it")
+    parser.add_option("-c", "--clients", type="int", dest="clients",
+                      default=100, help="keep CLIENTS clients connected")
+    parser.add_option("-g", "--games", type="int", dest="games",
+                      default=100, help="play GAMES games in total")
+    parser.add_option("-r", "--rate", type="float", dest="rate",
+                      default=100, help="connect RATE clients per second")
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=0,
+                      help="let the AI search DEPTH plies for every turn "
+                      "instead of making random ones")
+    parser.add_option("--login", dest="login", default="loadtest",
+                      help="log in as LOGIN, unless the server is local")
+    parser.add_option("--password", dest="passwd", default="loadtest",
+                      help="log in with PASSWORD")
+    parser.add_option("--no-login", action="store_const", dest="login",
+                      const=None, help="do not log in")
+    parser.add_option("-w", "--wire", dest="wire", default="binary",
+                      choices=["json", "binary"],
+                      help="speak the wire format WIRE, json or binary")
+    parser.add_option("--stats", action="store_true", dest="stats",
+                      default=False,
+                      help="with --local, also print what the server spent "
+                      "on every keyword")
+    parser.add_option("-t", "--timeout", type="float", dest="timeout",
+                      default=600, help="give up after TIMEOUT seconds")
+    parser.add_option("-s", "--seed", type="int", dest="seed", default=None,
+                      help="make the same random turns every run")
+    parser.add_option("-o", "--output", dest="output", metavar="FILE",
+                      help="also write the results to FILE as JSON")
+    parser.add_option('--verbose', '-v', action='count', dest='verbose',
+                      help="Increase verbosity. Use -vv for very verbose",
+                      default=0)
+    parser.add_option('--quiet', '-q', action='count', dest='quiet',
+                      help="Show only error messages", default=0)
+    options, args = parser.parse_args(args)
+
+    if options.clients < 2:
+        parser.error("need at least two clients")
+    if options.games < 1 or options.rate <= 0:
+        parser.error("need positive GAMES and RATE")
+
+    logging.basicConfig(
+        level=verbosity_levels[options.verbose - options.quiet]
+    )
+    try:
+        from twisted.internet import epollreactor
+        epollreactor.install()
+    except Exception:
+        # Not on Linux or a reactor is installed already.
+        pass
+    from twisted.internet import reactor
+
+    raise_fd_limit(4 * options.clients + 64)
+    port = options.port
+    host = options.host
+    if options.local:
+        # The fresh database of the server has no accounts to log in to.
+        options.login = None
+        from pypentago.server import Factory, db
+        factory = Factory(db.PentagoDatabase('sqlite:///:memory:'))
+        if options.stats:
+            factory.stats = keyword_stats.Stats()
+        port = reactor.listenTCP(0, factory, interface='127.0.0.1',
+                                 backlog=1024).getHost().port
+        host = '127.0.0.1'
+
+    result = []
+
+    def finished(stats):
+        result.append(stats)
+        reactor.stop()
+
+    load = Load(reactor, host, port, options.clients, options.games,
+                options.rate, options.depth, options.login, options.passwd,
+                options.seed, options.timeout, options.wire)
+    reactor.callWhenRunning(load.run, finished)
+    reactor.run()
+
+    if not result:
+        # Interrupted.
+        load.stats.end = time.time()
+        load.stats.error('interrupted')
+        result.append(load.stats)
+    report = result[0].report()
+    print format_report(report)
+    if options.local and options.stats:
+        print
+        print factory.stats.format()
+    if options.output is not None:
+        with open(options.output, 'w') as file_obj:
+            file_obj.write(dumps(report, indent=1, sort_keys=True))
+    return bool(report['errors'])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,8 +21,11 @@ client without modifications. It should be passed to server.startServer or to
 client.run_client as the prot attribute """
 
 import sys
+import socket
 import inspect
 
+from functools import wraps
+from timeit import default_timer
 from collections import defaultdict
 
 if sys.version_info[:2] > (2, 5):
@@ -32,8 +35,18 @@ else:
     # Pre Python 2.6 we need simplejson installed.
     from simplejson import dumps, loads
 
+from twisted.internet.defer import Deferred
 from twisted.protocols.basic import LineOnlyReceiver
 
+from pypentago import PROTOCOL_VERSION
+from pypentago.network.wire import json_wire, WIRES, FrameTooLong
+from pypentago.network.codec import CODECS
+from pypentago.network.stats import MALFORMED, UNKNOWN
+
+#: The first version of the protocol that knows about the wire formats in
+#: pypentago.network.wire.
+WIRE_VERSION = 3
+
 
 def getmembers(object, predicate=None):
     """Return all members of an object as (name, value) pairs sorted by name.
@@ -70,6 +83,45 @@ def require_auth(f):
     return f
 
 
+#: The connections holding back their output while hold_output does so,
+#: None otherwise.
+_holding = None
+
+
+def hold_output(func):
+    """ Decorator holding back the output of all connections while func
+    runs. What every connection was sent meanwhile is written to it in a
+    single write once func returns. """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _holding
+        if _holding is not None:
+            return func(*args, **kwargs)
+        _holding = holding = []
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _holding = None
+            for conn in holding:
+                conn.flush()
+    return wrapper
+
+
+def broadcast(connections, keyword, data=None):
+    """ Send keyword and data to all connections. The message is only
+    encoded and framed once for every wire format, all connections that
+    speak the same one are sent the same bytes. """
+    frames = {}
+    for conn in connections:
+        if conn._pending is not None:
+            conn.send(keyword, data)
+            continue
+        frame = frames.get(conn.wire)
+        if frame is None:
+            frame = frames[conn.wire] = conn.wire.frame(keyword, data)
+        conn.send_frame(keyword, frame)
+
+
 class BadInput(Exception):
     pass
 
@@ -79,6 +131,19 @@ class Connection(LineOnlyReceiver):
     encoding = "utf-8"
     """ The Connection class. Please do not overwrite anything unless you 
     really know what you are doing or otherwise stated """
+    #: The wire formats this side is willing to speak besides JSON, the
+    #: preferred one first. See pypentago.network.wire.
+    wires = ('binary', )
+    #: The codecs this side is willing to encode data with in these wire
+    #: formats, the preferred one first. Those not installed are skipped,
+    #: see pypentago.network.codec.
+    codecs = ('ujson', 'msgpack', 'json')
+    #: The number of bytes of output held back because the other side does
+    #: not read it at which output_exceeded is called. None never calls it.
+    high_water = 1024 * 1024
+    #: The pypentago.network.stats.Stats to record the messages received
+    #: and sent in, or None to record nothing.
+    stats = None
     
     def construct(self):
         """ This is called when the Connection
@@ -108,51 +173,132 @@ class Connection(LineOnlyReceiver):
         """ This is called when a keyword is received that no handler is
         registered for. """
     
+    def output_exceeded(self):
+        """ This is called when the output held back because the other
+        side does not read it exceeds high_water bytes. The output is thrown
+        away and the connection aborted, instead of keeping all of it in
+        memory. """
+        self.transport.abortConnection()
+    
     def __init__(self):
         self.binds = defaultdict(list)
         self.auth = False
         self.construct()
         # This only helps pylint and IDEs, no real use at all.
         self.factory = None
-        for name, method in getmembers(self):
-            if hasattr(method, '_bind_to'):
-                for bind_to in method._bind_to:
-                    self.binds[bind_to].append(method) 
+        #: Every connection starts out speaking JSON.
+        self.wire = json_wire(self.delimiter, self.encoding)
+        #: The messages sent while waiting for the answer to hello.
+        self._pending = None
+        #: The output held back, see write.
+        self._out = []
+        self._out_size = 0
+        #: Whether the transport asked to stop writing to it.
+        self.paused = False
+        handlers, needs_auth = self.handlers()
+        for keyword, names in handlers.iteritems():
+            self.binds[keyword] = [getattr(self, name) for name in names]
+        self.needs_auth = dict(needs_auth)
+    
+    @classmethod
+    def handlers(cls):
+        """ Return a dictionary mapping the keywords to the names of the
+        methods exposed to them, and one mapping the keywords to whether
+        any of these requires authentication. They are only looked up the
+        first time this is called for a class. """
+        # Look into the __dict__, the table of the base class is no use.
+        table = cls.__dict__.get('_handlers')
+        if table is None:
+            handlers = defaultdict(list)
+            needs_auth = {}
+            for name, method in getmembers(cls):
+                if hasattr(method, '_bind_to'):
+                    for bind_to in method._bind_to:
+                        handlers[bind_to].append(name)
+                        needs_auth[bind_to] = (
+                            needs_auth.get(bind_to, False) or
+                            getattr(method, 'auth', False)
+                        )
+            table = cls._handlers = (dict(handlers), needs_auth)
+        return table
+    
+    @hold_output
+    def dataReceived(self, data):
+        """ Split the received data into messages and handle them. The
+        wire format may change between two messages. """
+        buf = self._buffer + data
+        start = 0
+        try:
+            while not self.transport.disconnecting:
+                message, start = self.wire.next(buf, start, self.MAX_LENGTH)
+                if message is None:
+                    break
+                self.lineReceived(message)
+        except FrameTooLong:
+            self._buffer = ''
+            return self.lineLengthExceeded(buf[start:])
+        self._buffer = buf[start:]
     
     def lineReceived(self, income_data):
-        """ This method handles received data and forwards it to the correct 
-        event handlers """
+        """ This method handles a received message and forwards it to the
+        correct event handlers """
         # NOTE: All exceptions that appear unhandled in here cause the
         # connection to be closed.
-        income_data = income_data.decode(self.encoding)
-        if not income_data:
-            return
-        
+        stats = self.stats
+        if stats is not None:
+            started = default_timer()
         try:
-            keyword, data = loads(income_data)
+            message = self.wire.decode(income_data)
         except Exception:
+            if stats is not None:
+                stats.received(MALFORMED, len(income_data),
+                               default_timer() - started, 0.0, 1)
             self.malformed_request(income_data)
             return
+        if message is None:
+            return
+        keyword, data = message
         event = {'keyword': keyword, 'data': data}
+        if stats is not None:
+            decoded = default_timer()
         
-        funs = self.binds[keyword]
+        if self._pending is not None and keyword == "NOHANDLER":
+            # The other side does not know HELLO, keep on using JSON.
+            self._use_wire(None)
         
-        if not self.auth and any(getattr(h, 'auth', False) for h in funs):
-            self.send("AUTHREQ")
-            return
+        funs = self.binds.get(keyword)
+        errors = 0
         
-        if funs:
+        if not self.auth and self.needs_auth.get(keyword, False):
+            self.send("AUTHREQ")
+        elif funs:
             for fun in funs:
                 # We swallow the exception here. The handlers are responsible
                 # for reporting (e.g. logging) them.
                 try:
-                    self._handle_return(fun(event))
+                    ret = fun(event)
+                    if isinstance(ret, Deferred):
+                        # Handlers waiting for something, e.g. the database,
+                        # return a Deferred firing with what they would
+                        # have returned.
+                        ret.addCallback(self._handle_return)
+                        ret.addErrback(self._handle_failure, keyword,
+                                       income_data)
+                    else:
+                        self._handle_return(ret)
                 except BadInput:
+                    errors += 1
                     self._handle_return(self.bad_input(income_data))
                 except Exception:
+                    errors += 1
                     self._handle_return(self.internal_error(income_data))
         else:
             self._handle_return(self.no_handler(event))
+        
+        if stats is not None:
+            stats.received(funs and keyword or UNKNOWN, len(income_data),
+                           decoded - started, default_timer() - decoded,
+                           errors)
     
     def bind(self, keyword, function):
         """ Bind the keyword to the function, this function has to accept one 
@@ -160,24 +306,143 @@ class Connection(LineOnlyReceiver):
         if not callable(function):
             raise TypeError("Function has to be callable")
         self.binds[keyword].append(function)
+        if getattr(function, 'auth', False):
+            self.needs_auth[keyword] = True
     
+    @hold_output
     def connectionMade(self):
         """ Internal function that appends this connection to the client list 
         of the factory """
         self.factory.clients.append(self)
+        self.transport.registerProducer(self, True)
+        try:
+            # Output is written once for everything done in one go, waiting
+            # for more to send along with it would only delay it.
+            self.transport.setTcpNoDelay(True)
+        except (AttributeError, socket.error):
+            # Not TCP.
+            pass
         self.init()
     
+    @hold_output
     def connectionLost(self, reason):
         """ Internal function deleting the connection from the client list when 
         the connection is lost """
+        self.connected = 0
         self.factory.clients.remove(self)
         self.destruct(reason)
     
     def send(self, keyword, data=None):
         """ Send keyword to the other side. If data is passed, it can be 
         obtained by the other side using Event.arg_list """
-        send = dumps([keyword, data]).encode(self.encoding)
-        self.sendLine(send)
+        if self._pending is not None:
+            self._pending.append((keyword, data))
+        else:
+            self.send_frame(keyword, self.wire.frame(keyword, data))
+    
+    def send_frame(self, keyword, frame):
+        """ Send the message keyword that self.wire has framed as frame
+        already. """
+        if self.stats is not None:
+            self.stats.sent(keyword, len(frame))
+        self.write(frame)
+    
+    def write(self, data):
+        """ Write the bytes data to the transport. They are held back while
+        hold_output says so or the transport is paused. """
+        if _holding is None and not self.paused:
+            self.transport.write(data)
+            return
+        if not self._out and _holding is not None:
+            _holding.append(self)
+        self._out.append(data)
+        self._out_size += len(data)
+        if (self.paused and self.high_water is not None and
+            self._out_size > self.high_water):
+            self._out = []
+            self._out_size = 0
+            self.output_exceeded()
+    
+    def flush(self):
+        """ Write the output held back unless the transport is paused. """
+        if self.paused or not self._out:
+            return
+        out = self._out
+        self._out = []
+        self._out_size = 0
+        self.transport.write(''.join(out))
+    
+    def pauseProducing(self):
+        """ Called by the transport when what was written to it cannot be
+        sent as fast. Output is held back, and nothing more is read from the
+        other side until it reads what it was sent. """
+        self.paused = True
+        self.transport.pauseProducing()
+    
+    def resumeProducing(self):
+        """ Called by the transport once it has sent what was written to
+        it. """
+        self.paused = False
+        self.transport.resumeProducing()
+        self.flush()
+    
+    def stopProducing(self):
+        """ Called by the transport when the connection is lost. """
+        self._out = []
+        self._out_size = 0
+    
+    def hello(self):
+        """ Ask the other side to speak one of the wire formats in
+        self.wires. Everything sent until it answers is held back and sent
+        in the format agreed on. Sides that do not know HELLO answer with
+        NOHANDLER, and JSON is used. """
+        self.send_frame("HELLO", self.wire.frame(
+            "HELLO", {'version': PROTOCOL_VERSION, 'wires': list(self.wires),
+                      'codecs': [c for c in self.codecs if c in CODECS]}
+        ))
+        self._pending = []
+    
+    @expose("HELLO")
+    def handshake(self, evt):
+        data = evt['data']
+        if not isinstance(data, dict):
+            raise BadInput
+        if 'wires' in data:
+            # The other side asks which wire format to use. Answer in JSON,
+            # after that the one chosen is used.
+            chosen = None
+            codec = 'json'
+            if data.get('version', 0) >= WIRE_VERSION:
+                for name in data['wires']:
+                    if name in self.wires and name in WIRES:
+                        chosen = name
+                        break
+                # Clients from before the codecs only know JSON.
+                for name in data.get('codecs', ['json']):
+                    if name in self.codecs and name in CODECS:
+                        codec = name
+                        break
+            self.send("HELLO", {'version': PROTOCOL_VERSION,
+                                'wire': chosen or self.wire.name,
+                                'codec': codec})
+            self._use_wire(chosen, codec)
+        elif self._pending is not None:
+            chosen = data.get('wire')
+            if chosen not in self.wires:
+                chosen = None
+            codec = data.get('codec', 'json')
+            if codec not in CODECS:
+                chosen = None
+            self._use_wire(chosen, codec)
+    
+    def _use_wire(self, name, codec='json'):
+        """ Speak the wire format name with codec from now on, or JSON
+        if name is None, and send what was held back. """
+        if name is not None:
+            self.wire = WIRES[name](codec)
+        pending, self._pending = self._pending, None
+        for keyword, data in pending or []:
+            self.send(keyword, data)
     
     def _handle_return(self, ret):
         if ret is not None:
@@ -186,5 +451,17 @@ class Connection(LineOnlyReceiver):
             else:
                 self.send(*ret)
     
+    def _handle_failure(self, failure, keyword, request):
+        """ Handle what a Deferred returned by a handler failed with like
+        an exception raised by the handler. """
+        if self.stats is not None:
+            self.stats.get(keyword).errors += 1
+        try:
+            failure.raiseException()
+        except BadInput:
+            self._handle_return(self.bad_input(request))
+        except Exception:
+            self._handle_return(self.internal_error(request))
+    
     def close(self):
         self.transport.loseConnection()
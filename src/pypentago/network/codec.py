@@ -0,0 +1,89 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The codecs BinaryWire can encode the data of messages with.
+
+A codec turns the data of a message into bytes and back. The standard
+library's JSON is always available; ujson and msgpack are used if they are
+installed. Both sides of a connection agree on one of the codecs they have
+when they agree on the wire format, see Connection.hello.
+
+Codecs must turn every value JSON can hold into the same value JSON would
+give back, strings always being returned as unicode. """
+
+import sys
+
+if sys.version_info[:2] > (2, 5):
+    # In Python 2.6+, use built-in JSON support.
+    from json import JSONEncoder, loads
+else:
+    # Pre Python 2.6 we need simplejson installed.
+    from simplejson import JSONEncoder, loads
+
+#: The codecs available, by name.
+CODECS = {}
+
+
+class Codec(object):
+    """ The codec name encoding data with dumps and decoding it with
+    loads. loads must raise ValueError for bytes it cannot decode. """
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<Codec %s>' % self.name
+
+
+def register(name, dumps, loads):
+    """ Make the codec name available and return it. """
+    codec = CODECS[name] = Codec(name, dumps, loads)
+    return codec
+
+
+# The encoder without the spaces dumps puts after separators by default.
+# ASCII is all it returns, so nothing needs to be encoded.
+register('json', JSONEncoder(separators=(',', ':')).encode, loads)
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    register('ujson', ujson.dumps, ujson.loads)
+
+try:
+    import msgpack
+    # The pure Python fallback is much slower than the JSON codec.
+    if msgpack.Packer.__module__ == 'msgpack.fallback':
+        raise ImportError("msgpack was built without its C extension")
+except ImportError:
+    pass
+else:
+    def _msgpack_loads(data):
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception, err:
+            raise ValueError(str(err))
+
+    register(
+        'msgpack',
+        msgpack.Packer(use_bin_type=False, autoreset=True).pack,
+        _msgpack_loads
+    )
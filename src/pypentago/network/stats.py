@@ -0,0 +1,105 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Counters of the messages connections receive and send, by keyword.
+
+Connections whose stats attribute is a Stats record every message they
+receive or send in it. Nothing is recorded while it is None, which is the
+default. """
+
+import time
+
+#: What messages that could not be decoded are counted as.
+MALFORMED = '(malformed)'
+#: What messages with keywords nothing is bound to are counted as. They are
+#: not counted by their keyword so that clients cannot make Stats grow
+#: without bound.
+UNKNOWN = '(no handler)'
+
+
+class KeywordStats(object):
+    """ The counters of one keyword. Times are in seconds. """
+    __slots__ = ['received', 'received_bytes', 'decode_time',
+                 'handler_time', 'errors', 'sent', 'sent_bytes']
+
+    def __init__(self):
+        self.received = self.received_bytes = 0
+        self.decode_time = self.handler_time = 0.0
+        self.errors = 0
+        self.sent = self.sent_bytes = 0
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class Stats(object):
+    """ The counters of all keywords since start. """
+    def __init__(self):
+        self.start = time.time()
+        self.keywords = {}
+
+    def get(self, keyword):
+        """ Return the KeywordStats of keyword. """
+        stats = self.keywords.get(keyword)
+        if stats is None:
+            stats = self.keywords[keyword] = KeywordStats()
+        return stats
+
+    def received(self, keyword, size, decode_time, handler_time, errors=0):
+        """ Record a message of size bytes that took decode_time to decode
+        and handler_time to handle, during which errors handlers failed. """
+        stats = self.get(keyword)
+        stats.received += 1
+        stats.received_bytes += size
+        stats.decode_time += decode_time
+        stats.handler_time += handler_time
+        stats.errors += errors
+
+    def sent(self, keyword, size):
+        """ Record a message of size bytes sent. """
+        stats = self.get(keyword)
+        stats.sent += 1
+        stats.sent_bytes += size
+
+    def as_dict(self):
+        """ Return the counters the way they are sent as STATS. """
+        return {
+            'start': self.start,
+            'seconds': time.time() - self.start,
+            'keywords': dict((keyword, stats.as_dict()) for keyword, stats
+                             in self.keywords.iteritems()),
+        }
+
+    def format(self):
+        """ Return the counters as a table, the keywords that took longest
+        to handle first. """
+        lines = [
+            "%.0f seconds" % (time.time() - self.start),
+            "keyword          received      bytes  decode ms  handler ms"
+            "  errors     sent      bytes",
+        ]
+        keywords = sorted(self.keywords.iteritems(),
+                          key=lambda (keyword, stats): (-stats.handler_time,
+                                                        keyword))
+        for keyword, stats in keywords:
+            lines.append("%-15s %9d %10d %10.2f %11.2f %7d %8d %10d" % (
+                keyword, stats.received, stats.received_bytes,
+                stats.decode_time * 1000, stats.handler_time * 1000,
+                stats.errors, stats.sent, stats.sent_bytes
+            ))
+        return "\n".join(lines)
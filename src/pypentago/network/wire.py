@@ -0,0 +1,257 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The formats messages are sent in.
+
+A wire format turns a keyword and its data into the bytes sent, finds the
+end of a message in the bytes received and turns it back into the keyword
+and the data. Connections start out speaking JSONWire and switch to another
+one if both sides agree on it, see Connection.hello.
+
+JSONWire sends [keyword, data] as JSON, ended by a delimiter.
+
+BinaryWire prefixes every message with its length as four bytes in network
+byte order. The first byte after the length is the ID of the keyword,
+followed by the data encoded with a codec from pypentago.network.codec, or
+nothing if the data is None. Keywords without an ID are sent as ID 0
+followed by [keyword, data] encoded with the codec. Turns
+made in a game are sent as ID 1, followed by the uid of the game as four
+bytes and the turn packed into two bytes. """
+
+import sys
+import codecs
+import struct
+
+if sys.version_info[:2] > (2, 5):
+    # In Python 2.6+, use built-in JSON support.
+    from json import dumps, loads
+else:
+    # Pre Python 2.6 we need simplejson installed.
+    from simplejson import dumps, loads
+
+from pypentago import CW
+from pypentago.network.codec import CODECS
+
+#: The keywords that have an ID in BinaryWire. The ID of a keyword is its
+#: index plus two. Only ever append to this, the IDs must not change.
+KEYWORDS = [
+    "HELLO", "GAME", "GAMES", "GAMEADDED", "GAMEUPDATED", "GAMEREMOVED",
+    "GAMELIST", "OPEN", "OPENGAME", "JOIN", "INITGAME", "ALREADYJOINED",
+    "GAMEFULL", "INVGAME", "LOGIN", "AUTH", "AUTHF", "NOLOGIN", "AUTHREQ",
+    "LOGOUT", "LOGGEDOUT", "REGISTER", "REGISTERED", "REGFAILED",
+    "INTERNALERROR", "BADINPUT", "MALFORMED", "NOHANDLER",
+]
+
+KEYWORD_IDS = dict((keyword, i + 2) for i, keyword in enumerate(KEYWORDS))
+
+GENERIC_ID = 0
+TURN_ID = 1
+
+LENGTH = struct.Struct('!I')
+TURN = struct.Struct('!IH')
+
+
+class FrameTooLong(Exception):
+    """ Raised by the wire formats when a message is longer than
+    allowed. """
+
+
+class JSONWire(object):
+    """ Messages are [keyword, data] as JSON encoded with encoding, ended
+    by delimiter. """
+    name = 'json'
+
+    def __init__(self, delimiter="\0", encoding="utf-8"):
+        self.delimiter = delimiter
+        self.encoding = encoding
+        # The JSON codec only writes ASCII and reads UTF-8, so it can skip
+        # encoding and decoding if that is what is used.
+        if codecs.lookup(encoding).name == 'utf-8':
+            self.codec = CODECS['json']
+        else:
+            self.codec = None
+
+    def frame(self, keyword, data=None):
+        """ Return the bytes to send for keyword and data. """
+        if self.codec is not None:
+            return self.codec.dumps([keyword, data]) + self.delimiter
+        return dumps([keyword, data]).encode(self.encoding) + self.delimiter
+
+    def next(self, buf, start, max_length):
+        """ Return the next message in buf after start and the index after
+        its end, or None and start if buf does not hold all of it. Raise
+        FrameTooLong if the message is longer than max_length. """
+        end = buf.find(self.delimiter, start)
+        if end == -1:
+            if len(buf) - start > max_length:
+                raise FrameTooLong
+            return None, start
+        if end - start > max_length:
+            raise FrameTooLong
+        return buf[start:end], end + len(self.delimiter)
+
+    def decode(self, message):
+        """ Return the keyword and the data of message, or None if it is
+        empty. Raise ValueError if it cannot be decoded. """
+        if self.codec is None:
+            message = message.decode(self.encoding)
+        if not message:
+            return None
+        keyword, data = loads(message)
+        return keyword, data
+
+
+class BinaryWire(object):
+    """ Length-prefixed messages with the IDs of the keywords instead of
+    the keywords and turns packed into a few bytes. The data is encoded
+    with codec. """
+    name = 'binary'
+
+    def __init__(self, codec=CODECS['json']):
+        self.codec = codec
+
+    def frame(self, keyword, data=None):
+        """ Return the bytes to send for keyword and data. """
+        if keyword == "GAME":
+            turn = pack_turn(data)
+            if turn is not None:
+                return LENGTH.pack(len(turn) + 1) + chr(TURN_ID) + turn
+        kid = KEYWORD_IDS.get(keyword)
+        if kid is None:
+            body = self.codec.dumps([keyword, data])
+            kid = GENERIC_ID
+        elif data is None:
+            body = ''
+        else:
+            body = self.codec.dumps(data)
+        return LENGTH.pack(len(body) + 1) + chr(kid) + body
+
+    def next(self, buf, start, max_length):
+        """ Return the next message in buf after start and the index after
+        its end, or None and start if buf does not hold all of it. Raise
+        FrameTooLong if the message is longer than max_length. """
+        if len(buf) - start < LENGTH.size:
+            return None, start
+        length, = LENGTH.unpack_from(buf, start)
+        if length > max_length:
+            raise FrameTooLong
+        end = start + LENGTH.size + length
+        if len(buf) < end:
+            return None, start
+        return buf[start + LENGTH.size:end], end
+
+    def decode(self, message):
+        """ Return the keyword and the data of message. Raise ValueError if
+        it cannot be decoded. """
+        if not message:
+            raise ValueError("empty message")
+        kid = ord(message[0])
+        body = message[1:]
+        if kid == TURN_ID:
+            return "GAME", unpack_turn(body)
+        elif kid == GENERIC_ID:
+            keyword, data = self.codec.loads(body)
+            return keyword, data
+        try:
+            keyword = KEYWORDS[kid - 2]
+        except IndexError:
+            raise ValueError("unknown keyword ID %d" % kid)
+        if body:
+            return keyword, self.codec.loads(body)
+        return keyword, None
+
+
+def _small_int(value, limit):
+    return (isinstance(value, (int, long)) and not isinstance(value, bool)
+            and 0 <= value < limit)
+
+
+def pack_turn(data):
+    """ Return the bytes BinaryWire sends for data of a GAME message, or
+    None if it is not a turn. The turn (quad, row, col, rot_dir, rot_quad)
+    is packed into 8 * (9 * quad + 3 * row + col) + 2 * rot_quad + 1 if it
+    is a clockwise rotation or + 0 if it is not.
+
+    >>> pack_turn([3, "TURN", [["", [1, 2, 0, "CW", 3]]]])
+    '\\x00\\x00\\x00\\x03\\x00\\x7f'
+    >>> pack_turn([3, "MSG", [["", "Hello"]]]) is None
+    True
+    """
+    try:
+        uid, cmd, ((kind, turn), ) = data
+        quad, row, col, rot_dir, rot_quad = turn
+    except (TypeError, ValueError):
+        return None
+    if (cmd != "TURN" or kind != "" or not _small_int(uid, 2 ** 32) or
+        not _small_int(quad, 4) or not _small_int(row, 3) or
+        not _small_int(col, 3) or not _small_int(rot_quad, 4) or
+        rot_dir not in ("CW", "CCW", "R", "L")):
+        return None
+    move = 8 * (9 * quad + 3 * row + col) + 2 * rot_quad + (rot_dir == CW)
+    return TURN.pack(uid, move)
+
+
+def unpack_turn(body):
+    """ Return the data of the GAME message pack_turn packed into body.
+
+    >>> unpack_turn(pack_turn([3, "TURN", [["", [1, 2, 0, "R", 3]]]]))
+    [3, 'TURN', [['', [1, 2, 0, 'CW', 3]]]]
+    """
+    try:
+        uid, move = TURN.unpack(body)
+    except struct.error:
+        raise ValueError("malformed turn")
+    if move >= 8 * 36:
+        raise ValueError("malformed turn")
+    square, rot = divmod(move, 8)
+    quad, square = divmod(square, 9)
+    row, col = divmod(square, 3)
+    rot_quad, clockwise = divmod(rot, 2)
+    return [uid, "TURN",
+            [["", [quad, row, col, clockwise and "CW" or "CCW", rot_quad]]]]
+
+
+_json_wires = {}
+
+
+def json_wire(delimiter="\0", encoding="utf-8"):
+    """ Return the JSONWire with delimiter and encoding. Connections that
+    use the same one share it, so broadcast only encodes once for all of
+    them. """
+    key = (delimiter, encoding)
+    wire = _json_wires.get(key)
+    if wire is None:
+        wire = _json_wires[key] = JSONWire(delimiter, encoding)
+    return wire
+
+
+_binary_wires = {}
+
+
+def binary_wire(codec='json'):
+    """ Return the BinaryWire encoding data with the codec named codec.
+    Like json_wire, connections that use the same one share it. """
+    wire = _binary_wires.get(codec)
+    if wire is None:
+        wire = _binary_wires[codec] = BinaryWire(CODECS[codec])
+    return wire
+
+
+#: The wire formats connections can agree on besides JSONWire, by name.
+#: They are called with the name of the codec to use.
+WIRES = {'binary': binary_wire}
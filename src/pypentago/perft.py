@@ -0,0 +1,103 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Count the ways to make a number of turns in a row.
+
+Every board implementation has a perft method that makes all sequences of
+turns up to a depth and counts them. All implementations have to agree on
+the counts, so comparing them catches bugs in generating and making turns.
+How long it takes measures how fast turns are made and taken back.
+
+Run this module to print the counts and the nodes per second for every
+depth up to the one given. """
+
+import sys
+import time
+
+from optparse import OptionParser
+
+from pypentago import core
+from pypentago import board
+
+#: The board classes that can be chosen on the command line.
+IMPLEMENTATIONS = {
+    'default': core.Board,
+    'python': board.Board,
+    'bit': board.BitBoard,
+}
+
+
+def perft(board, player, depth, distinct=False):
+    """ Return the number of ways player and his opponent can make depth
+    turns in a row on board. The game ends once somebody has five in a row.
+    If distinct is True, only turns that result in different positions are
+    made, see legal_turns. """
+    return board.perft(player, depth, distinct)
+
+
+def parse_board(string, cls=core.Board):
+    """ Return a board of class cls with the stones of string, which lists
+    the 36 squares row by row. '1' and '2' are stones of that player, '0'
+    and '.' empty squares. Whitespace is ignored. """
+    squares = ''.join(string.split())
+    if len(squares) != 36 or set(squares) - set('.012'):
+        raise ValueError("need 36 squares of '.', '0', '1' or '2'")
+    ret = cls()
+    for i, square in enumerate(squares):
+        if square in '12':
+            ret.set(i // 6, i % 6, int(square))
+    return ret
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = OptionParser()
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=3,
+                      metavar="DEPTH", help="count up to DEPTH turns")
+    parser.add_option("-b", "--board", dest="board", default='.' * 36,
+                      metavar="SQUARES",
+                      help="start from SQUARES, see parse_board")
+    parser.add_option("-p", "--player", type="int", dest="player",
+                      default=1, help="let PLAYER make the first turn")
+    parser.add_option("--distinct", action="store_true", dest="distinct",
+                      default=False,
+                      help="only make turns resulting in different positions")
+    parser.add_option("-i", "--implementation", dest="implementation",
+                      default='default', choices=sorted(IMPLEMENTATIONS),
+                      help="board to use: %s" % ', '.join(
+                          sorted(IMPLEMENTATIONS)))
+    options, args = parser.parse_args(args)
+
+    try:
+        start = parse_board(options.board,
+                            IMPLEMENTATIONS[options.implementation])
+    except ValueError, e:
+        parser.error(str(e))
+    print "depth          nodes   seconds     nodes/s"
+    for depth in xrange(1, options.depth + 1):
+        begin = time.time()
+        nodes = perft(start, options.player, depth, options.distinct)
+        elapsed = time.time() - begin
+        print "%5d %14d %9.3f %11.0f" % (depth, nodes, elapsed,
+                                         nodes / max(elapsed, 1e-9))
+
+
+if __name__ == '__main__':
+    main()
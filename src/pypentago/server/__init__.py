@@ -23,18 +23,21 @@ import weakref
 import logging
 import re
 
-from twisted.internet import protocol, reactor
+from twisted.internet import protocol, reactor, task
 from os.path import join, split
 
 from pypentago import EMAIL_REGEX
 from pypentago.server.connection import ServerConnection
+from pypentago.server.lobby import Lobby
+from pypentago.network.stats import Stats
 from pypentago.exceptions import NoSuchRoom
 from pypentago.server import db
 from pypentago.util import IDPool
 
 
 class Factory(protocol.ServerFactory):
-    def __init__(self, database):
+    def __init__(self, database, high_water=ServerConnection.high_water,
+                 admins=(), stats=None):
         self.game_id = IDPool()
         self.games = {}
         self.clients = []
@@ -42,6 +45,15 @@ class Factory(protocol.ServerFactory):
         self.email_regex = re.compile(EMAIL_REGEX, re.IGNORECASE)
         self.database = database
         self.protocol = ServerConnection
+        #: Clients that do not read more than this many bytes of what they
+        #: are sent are dropped, see Connection.output_exceeded.
+        self.high_water = high_water
+        #: The names of the players allowed to ask for the stats.
+        self.admins = set(admins)
+        #: The pypentago.network.stats.Stats of all clients, or None to
+        #: record none.
+        self.stats = stats
+        self.lobby = Lobby(self)
     
     def get_room(self, name):
         for room in self.rooms:
@@ -49,19 +61,32 @@ class Factory(protocol.ServerFactory):
                 return room
         raise NoSuchRoom
     
-    def sync_games(self):
-        for c in self.clients:
-            c.game_list()
-    
     def remove_game(self, game):
-        del self.games[game.uid]
-        self.game_id.release(game.uid)
+        """ Remove game from the server and the lobby. Removing a game
+        again does nothing. """
+        if self.games.get(game.uid) is game:
+            self.lobby.remove(game)
+            del self.games[game.uid]
+            self.game_id.release(game.uid)
+    
+    def log_stats(self):
+        logging.getLogger("pypentago.stats").info(
+            "Messages received and sent by keyword:\n" + self.stats.format()
+        )
 
 
-def run_server(port=26500, connect_string='sqlite:///:memory:'):
+def run_server(port=26500, connect_string='sqlite:///:memory:',
+               high_water=ServerConnection.high_water, admins=(),
+               stats_interval=0):
+    """ Run a server on port. If stats_interval is not 0, the messages
+    received and sent are counted and the counts are logged every
+    stats_interval seconds. """
     log = logging.getLogger("pypentago.server")
     database = db.PentagoDatabase(connect_string)
-    factory = Factory(database)
+    factory = Factory(database, high_water, admins)
+    if stats_interval:
+        factory.stats = Stats()
+        task.LoopingCall(factory.log_stats).start(stats_interval, now=False)
     log.info("Started server on port %d" % port)
     reactor.listenTCP(port, factory)
     reactor.run()
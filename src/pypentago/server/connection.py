@@ -45,6 +45,8 @@ class ServerConnection(Connection):
         self.log.info("Got connection from %s" % self.transport.getPeer().host)
         
         self.server = self.factory
+        self.high_water = self.server.high_water
+        self.stats = self.server.stats
         self.db_player = None
         self.name = "Player"
         self.remote_table = {}
@@ -60,7 +62,6 @@ class ServerConnection(Connection):
     
     def destruct(self, reason):
         self.logout(answer=False)
-        self.server.sync_games()
         
     @expose("GAME")
     @require_auth
@@ -89,13 +90,13 @@ class ServerConnection(Connection):
     def open_game(self, evt):
         name = evt['data']
         uid = self.server.game_id.get()
-        game = s_core.ServerGame(name, uid)
+        game = s_core.ServerGame(name, uid, self.server)
         p = s_core.ServerPlayer(self, self.db_player.player_name)
         game.uid = uid
         self.remote_table[uid] = p
         self.server.games[uid] = game
         game.add_player(p)
-        self.server.sync_games()
+        self.server.lobby.add(game)
         return "OPENGAME", uid
     
     @expose("JOIN")
@@ -126,32 +127,42 @@ class ServerConnection(Connection):
     @expose("GAMELIST")
     @require_auth
     def game_list(self, evt=None):
-        self.send(
-            "GAMES", 
-            [game.serialize() for game in self.server.games.itervalues()
-             if not game.over]
-        )
+        self.send_frame("GAMES", self.server.lobby.snapshot(self.wire))
+    
+    @expose("STATS")
+    @require_auth
+    def send_stats(self, evt):
+        """ Send the counters of the messages received and sent, or None
+        if the server does not record them. Only for admins. """
+        if self.db_player.player_name not in self.server.admins:
+            return "NOTADMIN"
+        stats = self.server.stats
+        return "STATS", stats and stats.as_dict()
     
     @expose("REGISTER")
     def register(self, evt):
         d = evt['data']
         p = Player(d['login'], crypto.hash_pwd(d['passwd']),
                    d['real_name'], d['email'])
-        if self.factory.database.login_available(d['login']):
-            with self.factory.database.transaction as session:
-                session.save(p)
-            self.send('REGISTERED')
-        else:
-            self.send('REGFAILED')
+        database = self.factory.database
+        return database.defer(database.register_player, p).addCallback(
+            lambda added: added and 'REGISTERED' or 'REGFAILED'
+        )
     
     @expose("LOGIN")
     def login(self, evt):
-        try:
-            p = self.factory.database.player_by_login(evt['data']['login'])
-        except NotInDB:
-            return "NOLOGIN"
-        
-        if crypto.check_pwd(p.passwd_hash, evt['data']['passwd']):
+        passwd = evt['data']['passwd']
+        database = self.factory.database
+        d = database.defer(database.player_by_login, evt['data']['login'])
+        d.addCallbacks(self.check_login, self.login_not_found,
+                       callbackArgs=(passwd, ))
+        return d
+    
+    def check_login(self, p, passwd):
+        if not self.connected:
+            # Gone while looking up the player.
+            return
+        if crypto.check_pwd(p.passwd_hash, passwd):
             self.auth = True
             self.db_player = p
             self.send("AUTH")
@@ -159,6 +170,10 @@ class ServerConnection(Connection):
         else:
             return "AUTHF"
     
+    def login_not_found(self, failure):
+        failure.trap(NotInDB)
+        return "NOLOGIN"
+    
     def internal_error(self, request):
         exception_log.critical(
             "Internal server error handling request %r" % request,
@@ -186,3 +201,10 @@ class ServerConnection(Connection):
             exc_info=True
         )
         self.send("NOHANDLER", (time.time(), request))
+    
+    def output_exceeded(self):
+        self.log.warning(
+            "Dropping %s, it does not read what it is sent" %
+            self.transport.getPeer().host
+        )
+        Connection.output_exceeded(self)
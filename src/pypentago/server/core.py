@@ -16,12 +16,46 @@
 
 
 from pypentago import core
+from pypentago.network import broadcast
 
 class ServerGame(core.Game):
-    def __init__(self, name, uid):
+    """ Game played on the server. If server is passed, the game is
+    removed from it once a player quits, and its lobby is told when players
+    join and when the game is over. """
+    def __init__(self, name, uid, server=None):
         core.Game.__init__(self)
         self.name = name
         self.uid = uid
+        self.server = server
+    
+    def add_player(self, p):
+        core.Game.add_player(self, p)
+        if self.server is not None:
+            self.server.lobby.update(self)
+    
+    def player_quit(self, player):
+        core.Game.player_quit(self, player)
+        if self.server is not None:
+            self.server.remove_game(self)
+    
+    def game_over(self, winner, loser):
+        core.Game.game_over(self, winner, loser)
+        if self.server is not None:
+            self.server.lobby.remove(self)
+    
+    def notify(self, but, method, *args):
+        """ Send the message of all RemotePlayers at once, so that it is
+        only encoded once. """
+        remote = []
+        for person in self.people(but):
+            if (isinstance(person, core.RemotePlayer) and
+                method in person.messages):
+                remote.append(person)
+            else:
+                getattr(person, method)(*args)
+        if remote:
+            broadcast([person.conn for person in remote],
+                      *remote[0].message(method, *args))
     
     def serialize(self):
         return {
@@ -32,6 +66,4 @@ class ServerGame(core.Game):
     
 
 class ServerPlayer(core.RemotePlayer):
-    def player_quit(self, player):
-        core.RemotePlayer.player_quit(self, player)
-        self.conn.server.remove_game(self.game)
+    pass
@@ -16,6 +16,8 @@
 
 from __future__ import with_statement
 
+import threading
+
 from sqlalchemy.orm import sessionmaker, mapper
 from sqlalchemy import (create_engine, MetaData, Table, Text, String, Boolean,
                         DateTime, Column, Integer)
@@ -26,6 +28,12 @@ from pypentago.server.db.dbobjs import Player, GameHistory
 
 
 class PentagoDatabase(Database):
+    def __init__(self, connect_string=None, threads=4, reactor=None):
+        # Held while checking whether a login is available and taking it,
+        # so that two threads cannot register the same one.
+        self._register_lock = threading.Lock()
+        Database.__init__(self, connect_string, threads, reactor)
+    
     def create_tables(self, metadata):
         players = Table('Players', metadata, 
             Column('player_id', Integer, primary_key = True, index=True,
@@ -75,6 +83,16 @@ class PentagoDatabase(Database):
             player = session.query(Player).get(identifier)
         return player
     
+    def register_player(self, player):
+        """ Add player unless its login is taken already. Return whether
+        it was added. """
+        with self._register_lock:
+            if not self.login_available(player.player_name):
+                return False
+            with self.transaction as session:
+                session.save(player)
+        return True
+    
     def login_available(self, login):
         try:
             self.player_by_login(login)
@@ -14,13 +14,25 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from sqlalchemy.orm import sessionmaker, mapper
+from sqlalchemy.orm import sessionmaker, scoped_session, mapper
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.engine.url import make_url
 
-class Database(object):
+from pypentago.threadpool import ReactorThreadPool
+
+class Database(ReactorThreadPool):
     """ This class has to be sub-classed and needs the create_tables
-    and the map_tables methods overriden in order to work. """
-    def __init__(self, connect_string=None):
+    and the map_tables methods overriden in order to work. 
+    
+    Use defer to access the database from the reactor thread. It runs the
+    queries in a pool of at most threads threads, see ReactorThreadPool.
+    The functions passed to it may use self.transaction and the methods
+    using it, but must not share objects of the database with another
+    thread. For example, defer(self.player_by_login, login) returns a
+    Deferred that fires with the player in the reactor thread. """
+    def __init__(self, connect_string=None, threads=4, reactor=None):
+        ReactorThreadPool.__init__(self, threads, 'pypentago.db', reactor)
         if connect_string is not None:
             self.connect(connect_string)        
     
@@ -51,7 +63,19 @@ class Database(object):
         raise NotImplementedError
     
     def connect(self, connect_string):
-        engine = create_engine(connect_string)
+        url = make_url(connect_string)
+        if url.drivername == 'sqlite' and url.database in (None, '',
+                                                            ':memory:'):
+            # Every connection to an in-memory database gets a database
+            # of its own. Share one between the threads, and do not use it
+            # in two of them at once.
+            engine = create_engine(
+                connect_string, poolclass=StaticPool,
+                connect_args={'check_same_thread': False}
+            )
+            self.resize(1)
+        else:
+            engine = create_engine(connect_string)
         metadata = MetaData(engine)
         self.tables = self.create_tables(metadata)
         # If the tables do not exist yet - create them!
@@ -59,9 +83,10 @@ class Database(object):
         # Map our classes to the tables.
         self.map_tables(*self.tables)
         
-        self.Session = sessionmaker(bind=engine, 
-                                    autoflush=True,
-                                    transactional=True)
+        # Every thread gets a session of its own.
+        self.Session = scoped_session(sessionmaker(bind=engine, 
+                                                   autoflush=True,
+                                                   transactional=True))
     
     @property
     def transaction(self):
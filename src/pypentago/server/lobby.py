@@ -0,0 +1,90 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The list of open games every client connected to the server sees.
+
+Instead of sending the whole list to every client whenever a game changes,
+only the change is sent as GAMEADDED, GAMEUPDATED or GAMEREMOVED. Every
+change increases the version of the list, which is sent along with it.
+Clients get the whole list with its version as GAMES when they connect
+or ask for it, and ask for it again if they miss a version.
+
+The data sent is:
+
+GAMES: {'version': version, 'games': [game, ...]}
+GAMEADDED, GAMEUPDATED: {'version': version, 'game': game}
+GAMEREMOVED: {'version': version, 'uid': uid}
+
+where game is what ServerGame.serialize returns. """
+
+from pypentago.network import broadcast
+
+
+class Lobby(object):
+    """ The open games of factory. Every change is encoded once and the
+    same bytes are sent to all clients of factory. """
+    def __init__(self, factory):
+        self.factory = factory
+        self.version = 0
+        self.games = {}
+        # The games themselves. Their uids are reused once they are
+        # removed from the server, so only the game that was added may
+        # change its entry.
+        self._games = {}
+        self._snapshots = {}
+
+    def snapshot(self, wire):
+        """ Return the bytes holding the whole list in the wire format
+        wire. They are only encoded again after the list has changed. """
+        frame = self._snapshots.get(wire)
+        if frame is None:
+            frame = self._snapshots[wire] = wire.frame(
+                "GAMES",
+                {'version': self.version,
+                 'games': [self.games[uid] for uid in sorted(self.games)]}
+            )
+        return frame
+
+    def add(self, game):
+        """ Add game to the list. """
+        data = game.serialize()
+        self.games[game.uid] = data
+        self._games[game.uid] = game
+        self._changed("GAMEADDED", {'game': data})
+
+    def update(self, game):
+        """ Tell everybody that game has changed. Games not in the list
+        are ignored. """
+        if self._games.get(game.uid) is not game:
+            return
+        data = game.serialize()
+        self.games[game.uid] = data
+        self._changed("GAMEUPDATED", {'game': data})
+
+    def remove(self, game):
+        """ Remove game from the list. Games not in the list are
+        ignored. """
+        if self._games.get(game.uid) is not game:
+            return
+        del self._games[game.uid]
+        del self.games[game.uid]
+        self._changed("GAMEREMOVED", {'uid': game.uid})
+
+    def _changed(self, keyword, data):
+        self.version += 1
+        self._snapshots.clear()
+        data['version'] = self.version
+        broadcast(self.factory.clients, keyword, data)
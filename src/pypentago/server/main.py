@@ -51,6 +51,16 @@ def main(args=None):
                       type="int", dest="port", metavar="PORT",
                       help="start server on port PORT")
     
+    parser.add_option("--high-water", action="store", default=None,
+                      type="int", dest="high_water", metavar="BYTES",
+                      help="drop clients once BYTES of what they are sent "
+                      "wait for them to read it")
+    
+    parser.add_option("--stats", action="store", default=None,
+                      type="float", dest="stats_interval", metavar="SECONDS",
+                      help="count the messages of every keyword and log "
+                      "the counts every SECONDS seconds, 0 not to count")
+    
     parser.add_option('--verbose', '-v', action='count', dest='verbose',
                       help="Increase verbosity. Use -vv for very verbose",
                       default=0)
@@ -91,6 +101,23 @@ def main(args=None):
         config.get("server", "pidfile", vars=var)
     )
     connect_string = config.get("server", 'database', vars=var)
+    if options.high_water is not None:
+        high_water = options.high_water
+    elif config.has_option("server", "high_water"):
+        high_water = config.getint("server", "high_water")
+    else:
+        # Configuration written before there was the option.
+        high_water = server.ServerConnection.high_water
+    if options.stats_interval is not None:
+        stats_interval = options.stats_interval
+    elif config.has_option("server", "stats_interval"):
+        stats_interval = config.getfloat("server", "stats_interval")
+    else:
+        stats_interval = 0
+    admins = []
+    if config.has_option("server", "admins"):
+        admins = [name.strip() for name in
+                  config.get("server", "admins").split(',') if name.strip()]
     logfile = config.get("server", "logfile", vars=var)
     
     pypentago.init_logging(logfile, verbosity)
@@ -102,7 +129,8 @@ def main(args=None):
         with open(pid_filename, "w") as pid_file:
             pid_file.write(str(os.getpid()))
     try:
-        server.run_server(port, connect_string)
+        server.run_server(port, connect_string, high_water, admins,
+                          stats_interval)
     finally:
         if daemonize:
             os.remove(pid_filename)
@@ -0,0 +1,68 @@
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Running blocking calls in threads without blocking the reactor. """
+
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+
+class ReactorThreadPool(object):
+    """ A pool of at most threads threads that belongs to a reactor.
+
+    The pool is started once the reactor runs, at once if it already
+    does, and stopped when it shuts down. Use defer to run calls in it. """
+    def __init__(self, threads, name, reactor=None):
+        if reactor is None:
+            from twisted.internet import reactor
+        self.reactor = reactor
+        self.pool = ThreadPool(0, threads, name)
+        # Set before start can be called, which registers the trigger.
+        self._shutdown = None
+        self.reactor.callWhenRunning(self.start)
+
+    def resize(self, threads):
+        """ Use at most threads threads from now on. """
+        self.pool.adjustPoolsize(0, threads)
+
+    def start(self):
+        if self.pool.started:
+            return
+        self.pool.start()
+        self._shutdown = self.reactor.addSystemEventTrigger(
+            'during', 'shutdown', self._shutting_down
+        )
+
+    def _shutting_down(self):
+        # The trigger cannot be removed while it is fired.
+        self._shutdown = None
+        self.stop()
+
+    def stop(self):
+        if self._shutdown is not None:
+            self.reactor.removeSystemEventTrigger(self._shutdown)
+            self._shutdown = None
+        self.pool.stop()
+
+    def defer(self, fun, *args, **kwargs):
+        """ Call fun(*args, **kwargs) in the pool. Return a Deferred that
+        fires in the reactor thread with its result, or fails with the
+        exception it raised. """
+        return deferToThreadPool(
+            self.reactor, self.pool, fun, *args, **kwargs
+        )
@@ -19,6 +19,7 @@
 """ Setup file for pypentago. It puts all but the main modules in site-packages 
 and the main scripts into /usr/bin. """
 
+import os
 import sys
 import imp
 import optparse
@@ -68,9 +69,7 @@ def get_default_opts(c_string):
 
 
 cc = get_compiler()
-# enable_speedups = cc is not None
-#: Until the AI is done, disable speedups by default.
-enable_speedups = False
+enable_speedups = cc is not None
 opts = get_default_opts(cc)
 
 dep = []
@@ -86,10 +85,17 @@ except ImportError:
 
 dep.extend(depends(['twisted']))
 
+# The search of the extension runs on several threads, see lib/ai.c.
+if os.name == 'nt':
+    libraries = []
+else:
+    libraries = ['pthread']
 
 board_speedup = Extension('pypentago._board',
-              ['pypentago/_board.c', 'lib/board.c', 'lib/ai.c'],
-              include_dirs=['lib'], extra_compile_args=opts)
+              ['pypentago/_board.c', 'lib/board.c', 'lib/ai.c', 'lib/tt.c',
+               'lib/evaluate.c'],
+              include_dirs=['lib'], extra_compile_args=opts,
+              libraries=libraries)
 
 
 class FixedDistribution(Distribution):
@@ -155,7 +161,12 @@ setup(
     ),
     package_data={'pypentago': ['data/*.png', 'data/*.svg']},
     scripts=[ ],
-    entry_points=dict(),
+    entry_points=dict(
+        console_scripts=['pypentago-perft = pypentago.perft:main',
+                         'pypentago-loadtest = pypentago.loadtest:main']
+    ),
     install_requires=dep,
+    # Faster codecs for the binary wire format, see pypentago.network.codec.
+    extras_require={'codecs': ['ujson', 'msgpack']},
 )
 
@@ -0,0 +1,119 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from twisted.internet import defer
+
+from pypentago import crypto
+from pypentago.server import Factory
+from pypentago.exceptions import NotInDB
+
+from helpers import Client
+
+
+class Player(object):
+    def __init__(self, player_name, passwd_hash):
+        self.player_name = player_name
+        self.passwd_hash = passwd_hash
+
+
+class MemoryDatabase(object):
+    """ Keeps the players in a dictionary. The Deferreds returned by defer
+    fire once run is called. """
+    def __init__(self):
+        self.players = {}
+        self.calls = []
+    
+    def defer(self, fun, *args):
+        d = defer.Deferred()
+        self.calls.append((d, fun, args))
+        return d
+    
+    def run(self):
+        calls, self.calls = self.calls, []
+        for d, fun, args in calls:
+            defer.maybeDeferred(fun, *args).chainDeferred(d)
+    
+    def register_player(self, player):
+        if player.player_name in self.players:
+            return False
+        self.players[player.player_name] = player
+        return True
+    
+    def player_by_login(self, login):
+        try:
+            return self.players[login]
+        except KeyError:
+            raise NotInDB
+
+
+class TestAccount(unittest.TestCase):
+    def setUp(self):
+        self.database = MemoryDatabase()
+        self.database.register_player(
+            Player('hitchhiker', crypto.hash_pwd('42'))
+        )
+        self.client = Client(Factory(self.database))
+        self.conn = self.client.conn
+        self.conn.auth = False
+        self.client.received()
+    
+    def request(self, keyword, data):
+        self.client.send(keyword, data)
+        # Nothing is answered before the database has.
+        self.assertEqual(self.client.received(), [])
+        self.database.run()
+        return [keyword for keyword, data in self.client.received()]
+    
+    def test_login(self):
+        self.assertEqual(
+            self.request("LOGIN", {'login': 'hitchhiker', 'passwd': '42'}),
+            ["AUTH", "GAMES"]
+        )
+        self.assert_(self.conn.auth)
+        self.assertEqual(self.conn.db_player.player_name, 'hitchhiker')
+    
+    def test_login_failed(self):
+        self.assertEqual(
+            self.request("LOGIN", {'login': 'hitchhiker', 'passwd': '43'}),
+            ["AUTHF"]
+        )
+        self.assertEqual(
+            self.request("LOGIN", {'login': 'marvin', 'passwd': '42'}),
+            ["NOLOGIN"]
+        )
+        self.failIf(self.conn.auth)
+    
+    def test_gone(self):
+        self.client.send("LOGIN", {'login': 'hitchhiker', 'passwd': '42'})
+        self.client.close()
+        self.database.run()
+        self.failIf(self.conn.auth)
+        self.assertEqual(self.client.received(), [])
+    
+    def test_register(self):
+        data = {'login': 'marvin', 'passwd': 'brain', 'real_name': 'Marvin',
+                'email': 'marvin@42.com'}
+        self.assertEqual(self.request("REGISTER", data), ["REGISTERED"])
+        self.assert_(crypto.check_pwd(
+            self.database.players['marvin'].passwd_hash, 'brain'
+        ))
+        self.assertEqual(self.request("REGISTER", data), ["REGFAILED"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,398 @@
+#! /usr/bin/env python
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the AI. """
+
+import os
+import time
+import random
+import tempfile
+import threading
+import unittest
+
+import pypentago
+
+from pypentago import ai
+from pypentago import core
+from pypentago import board
+
+from helpers import FakeReactor, RunningReactor, wait
+
+
+def winning_board(cls):
+    b = cls()
+    for col in xrange(4):
+        b.set(0, col, 1)
+        b.set(5, col + 1, 2)
+    return b
+
+
+def can_win(b, player):
+    """ Return whether player can win with their next turn on b. """
+    for turn in b.legal_turns(player):
+        other = b.copy()
+        other.apply_turn(player, turn)
+        if other.win() == player:
+            return True
+    return False
+
+
+def random_board(cls, rand, stones):
+    b = cls()
+    player = 1
+    for _ in xrange(stones):
+        b.apply_turn(player, rand.choice(b.legal_turns(player)))
+        player = 3 - player
+    return b
+
+
+class TestEvaluate(unittest.TestCase):
+    def tearDown(self):
+        ai.set_weights(**ai.DEFAULT_WEIGHTS)
+    
+    def test_lines(self):
+        for cls in [board.BitBoard] + IMPLEMENTATIONS:
+            b = cls()
+            self.assertEqual(ai.evaluate(b, 1), 0)
+            b.set(0, 1, 1)
+            b.set(0, 2, 1)
+            # Two open lines with two stones each.
+            self.assertEqual(ai.evaluate(b, 1), 2)
+            self.assertEqual(ai.evaluate(b, 2), -2)
+            b.set(0, 3, 1)
+            self.assertEqual(ai.evaluate(b, 1), 8)
+            # Now (0, 1) to (0, 5) is not open any more.
+            b.set(0, 5, 2)
+            self.assertEqual(ai.evaluate(b, 1), 4)
+            b.set(0, 4, 1)
+            self.assertEqual(ai.evaluate(b, 1), 16)
+            b.set(0, 0, 1)
+            self.assertEqual(ai.evaluate(b, 1), ai.INFINITY)
+            self.assertEqual(ai.evaluate(b, 2), -ai.INFINITY)
+    
+    def test_rotation(self):
+        for cls in [board.BitBoard] + IMPLEMENTATIONS:
+            b = cls()
+            for col in xrange(4):
+                b.set(1, col, 1)
+            b.rotate(0, True)
+            # Rotating quadrant 0 back gives four in a row.
+            self.assert_(ai.evaluate(b, 1) >= ai.weights['rotation'])
+    
+    def test_no_wraparound(self):
+        # Stones at the end of one row and the start of the next are not
+        # in a row.
+        for cls in [board.BitBoard] + IMPLEMENTATIONS:
+            b = cls()
+            b.set(4, 5, 1)
+            for col in xrange(4):
+                b.set(5, col, 1)
+            self.assertEqual(b.win(), 0)
+            self.assertNotEqual(ai.evaluate(b, 1), ai.INFINITY)
+    
+    def test_implementations(self):
+        rand = random.Random(4)
+        for _ in xrange(50):
+            b = random_board(board.BitBoard, rand, rand.randrange(36))
+            for cls in IMPLEMENTATIONS:
+                other = cls()
+                for row in xrange(6):
+                    for col in xrange(6):
+                        if b[row, col]:
+                            other.set(row, col, b[row, col])
+                for player in (1, 2):
+                    self.assertEqual(ai.evaluate(b, player),
+                                     ai.evaluate(other, player))
+    
+    def test_weights(self):
+        ai.set_weights(two=3)
+        for cls in [board.BitBoard] + IMPLEMENTATIONS:
+            b = cls()
+            b.set(0, 1, 1)
+            b.set(0, 2, 1)
+            self.assertEqual(ai.evaluate(b, 1), 6)
+        self.assertRaises(TypeError, ai.set_weights, five=2)
+    
+    def test_load_weights(self):
+        fd, name = tempfile.mkstemp('.ini')
+        try:
+            os.write(fd, "[evaluation]\nthree = 5\n")
+            os.close(fd)
+            ai.load_weights([name])
+        finally:
+            os.remove(name)
+        expected = dict(ai.DEFAULT_WEIGHTS, three=5)
+        self.assertEqual(ai.weights, expected)
+        if core.EXTENSION_MODULE:
+            self.assertEqual(_board.get_weights(), expected)
+
+
+class TestPythonSearch(unittest.TestCase):
+    def test_win(self):
+        b = winning_board(board.BitBoard)
+        result = ai.search(b, 1, max_depth=3)
+        self.assertEqual(result['depth'], 1)
+        self.assertEqual(result['value'], ai.INFINITY)
+        b.apply_turn(1, result['turn'])
+        self.assertEqual(b.win(), 1)
+    
+    def test_search(self):
+        b = board.BitBoard()
+        b.set(2, 2, 1)
+        b.set(3, 3, 2)
+        key = b.key
+        result = ai.search(b, 1, max_depth=2)
+        self.assertEqual(result['depth'], 2)
+        self.assertEqual(result['pv'][0], result['turn'])
+        self.assertEqual(len(result['pv']), 2)
+        self.assertEqual(b.key, key)
+        self.assert_(result['first_cutoffs'] <= result['cutoffs'])
+    
+    def test_time(self):
+        b = board.BitBoard()
+        start = time.time()
+        result = ai.search(b, 1, time_ms=100)
+        self.assert_(time.time() - start < 2)
+        self.assert_(result['depth'] >= 1)
+    
+    def test_processes(self):
+        # Keep the Python search cheap by filling most of the board.
+        b = board.BitBoard()
+        for row in (0, 1, 4, 5):
+            for col in xrange(6):
+                b.set(row, col, 1 + (row // 2 + col) % 2)
+        for row, col, player in [(2, 2, 2), (3, 3, 1), (2, 3, 1), (3, 2, 2)]:
+            b.set(row, col, player)
+        single = ai.search(b, 1, max_depth=2)
+        result = ai.search(b, 1, max_depth=2, threads=3)
+        self.assertEqual(result['depth'], 2)
+        self.assertEqual(result['value'], single['value'])
+        self.assertEqual(result['turn'], single['turn'])
+        self.assertEqual(result['pv'][0], result['turn'])
+        self.assert_(result['turn'][3] is pypentago.CW or
+                     result['turn'][3] is pypentago.CCW)
+    
+    def test_invalid(self):
+        self.assertRaises(ValueError, ai.search, board.BitBoard(), 1)
+        self.assertRaises(ValueError, ai.search, board.BitBoard(), 1, 0, 1, 0)
+        b = board.BitBoard()
+        for col in xrange(5):
+            b.set(0, col, 1)
+        self.assertRaises(ValueError, ai.search, b, 2, 0, 2)
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = ai.Engine(2, FakeReactor())
+        self.engine.start()
+    
+    def tearDown(self):
+        self.engine.stop()
+    
+    def test_best_turn(self):
+        for cls in [board.BitBoard] + IMPLEMENTATIONS:
+            b = winning_board(cls)
+            d = self.engine.best_turn(b, 1, max_depth=2)
+            # The search works on a copy.
+            b.set(0, 4, 2)
+            turn = wait(d)
+            self.assertEqual(b[0, 4], 2)
+            b = winning_board(cls)
+            b.apply_turn(1, turn)
+            self.assertEqual(b.win(), 1)
+    
+    def test_error(self):
+        d = self.engine.search(board.BitBoard(), 1)
+        self.assert_(isinstance(wait(d).value, ValueError))
+    
+    def test_running_reactor(self):
+        reactor = RunningReactor()
+        engine = ai.Engine(1, reactor)
+        self.assert_(engine.pool.started)
+        self.assertEqual(len(reactor.triggers), 1)
+        engine.stop()
+        self.assertEqual(reactor.triggers, [])
+
+
+IMPLEMENTATIONS = []
+
+
+if core.EXTENSION_MODULE:
+    from pypentago import _board
+    IMPLEMENTATIONS.append(_board.Board)
+
+    class TestSearch(unittest.TestCase):
+        def test_win(self):
+            b = _board.Board()
+            for col in xrange(4):
+                b.set(0, col, 1)
+                b.set(5, col + 1, 2)
+            b.do_best(1, 2)
+            self.assertEqual(b.win(), 1)
+        
+        def test_block(self):
+            b = _board.Board()
+            for col in xrange(4):
+                b.set(5, col, 2)
+            b.set(1, 1, 1)
+            b.set(2, 4, 1)
+            b.set(1, 3, 1)
+            self.assert_(can_win(b, 2))
+            b.do_best(1, 2)
+            self.assertFalse(can_win(b, 2))
+        
+        def test_stats(self):
+            b = _board.Board()
+            b.set(2, 2, 1)
+            b.set(3, 3, 2)
+            stats = b.do_best(1, 2)
+            self.assert_(stats['nodes'] > 0)
+            self.assert_(stats['cutoffs'] <= stats['nodes'])
+            self.assert_(stats['first_cutoffs'] <= stats['cutoffs'])
+        
+        def test_engines(self):
+            b = _board.Board()
+            for row, col, player in [(2, 2, 1), (3, 3, 2), (1, 1, 1)]:
+                b.set(row, col, player)
+            expected = b.search(2, max_depth=3)
+            self.assertEqual(expected['researches'], 0)
+            for window in [0, 0.5, 1, 10]:
+                result = b.search(2, max_depth=3, engine='pvs',
+                                  window=window)
+                self.assertEqual(result['value'], expected['value'])
+            result = b.search(2, max_depth=3, engine='pvs', threads=2,
+                              seed=0)
+            self.assertEqual(result['value'], expected['value'])
+            c = b.copy()
+            stats = b.do_best(2, 2, engine='pvs')
+            self.assert_(stats['researches'] <= stats['nodes'])
+            self.assertNotEqual(b.key, c.key)
+            self.assertRaises(ValueError, c.do_best, 2, 2, engine='minimax')
+            self.assertRaises(ValueError, c.search, 2, max_depth=2,
+                              engine='minimax')
+        
+        def test_search(self):
+            b = _board.Board()
+            b.set(2, 2, 1)
+            b.set(3, 3, 2)
+            key = b.key
+            result = b.search(1, max_depth=2)
+            self.assertEqual(result['depth'], 2)
+            self.assertEqual(result['pv'][0], result['turn'])
+            self.assertEqual(b.key, key)
+            # The best line has to be playable.
+            player = 1
+            for turn in result['pv']:
+                b.apply_turn(player, turn)
+                player = 3 - player
+        
+        def test_time(self):
+            b = _board.Board()
+            b.set(2, 2, 1)
+            b.set(3, 3, 2)
+            start = time.time()
+            result = b.search(1, time_ms=100)
+            self.assert_(time.time() - start < 1)
+            self.assert_(result['depth'] >= 1)
+            self.assert_(result['nodes'] > 0)
+        
+        def test_search_win(self):
+            b = _board.Board()
+            for col in xrange(4):
+                b.set(0, col, 1)
+                b.set(5, col + 1, 2)
+            result = b.search(1, max_depth=4)
+            # Searching deeper is pointless once a win is found.
+            self.assertEqual(result['depth'], 1)
+            self.assertEqual(result['value'], float('inf'))
+            b.apply_turn(1, result['turn'])
+            self.assertEqual(b.win(), 1)
+        
+        def test_gil(self):
+            # Other threads keep running while the extension searches.
+            b = _board.Board()
+            b.set(2, 2, 1)
+            thread = threading.Thread(target=b.search,
+                                      kwargs={'player': 2, 'time_ms': 300})
+            thread.start()
+            time.sleep(0.05)
+            count = 0
+            while thread.isAlive():
+                count += 1
+                time.sleep(0.001)
+            thread.join()
+            self.assert_(count > 20)
+        
+        def test_threads(self):
+            b = _board.Board()
+            for row, col, player in [(2, 2, 1), (3, 3, 2), (1, 1, 1)]:
+                b.set(row, col, player)
+            single = b.search(2, max_depth=3)
+            result = b.search(2, max_depth=3, threads=3, seed=5)
+            self.assertEqual(result['value'], single['value'])
+            # With a seed, the search is reproducible.
+            self.assertEqual(b.search(2, max_depth=3, threads=3, seed=5),
+                             result)
+            self.assertEqual(result['pv'][0], result['turn'])
+            player = 2
+            for turn in result['pv']:
+                b.apply_turn(player, turn)
+                player = 3 - player
+            # Without one, the threads share bounds.
+            result = b.search(2, max_depth=2, threads=3)
+            self.assert_(result['depth'] == 2)
+        
+        def test_threads_seeded(self):
+            # Every root turn is searched, whatever share of them the
+            # threads get and whether they run at once or one after
+            # another.
+            rand = random.Random(7)
+            for _ in xrange(4):
+                b = _board.Board()
+                player = 1
+                for _ in xrange(rand.randrange(2, 10)):
+                    b.apply_turn(player, rand.choice(b.legal_turns(player)))
+                    player = 3 - player
+                if b.win():
+                    continue
+                single = b.search(player, max_depth=2)
+                for threads in (2, 3, 4):
+                    for seed in (0, 1, 5):
+                        result = b.search(player, max_depth=2,
+                                          threads=threads, seed=seed)
+                        self.assertEqual(result['value'], single['value'])
+        
+        def test_search_invalid(self):
+            b = _board.Board()
+            self.assertRaises(ValueError, b.search, 1)
+            self.assertRaises(ValueError, b.search, 1, max_depth=2, threads=0)
+            for col in xrange(5):
+                b.set(0, col, 1)
+            self.assertRaises(ValueError, b.search, 2, max_depth=2)
+        
+        def test_game_over(self):
+            b = _board.Board()
+            for col in xrange(5):
+                b.set(0, col, 1)
+            self.assertRaises(ValueError, b.do_best, 2, 2)
+            self.assertRaises(ValueError, _board.Board().do_best, 1, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+#! /usr/bin/env python
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Check the board implementations against pypentago.board.Board by
+playing the same random games on all of them.
+
+Run this file directly with the number of games as the first argument
+to play more games than the default, e.g. ./board_test.py 1000000. """
+
+import sys
+import random
+import unittest
+
+from pypentago import core
+from pypentago import board
+from pypentago import CW, CCW
+from pypentago.exceptions import SquareNotEmpty
+
+#: Number of random games played with every implementation.
+GAMES = 300
+
+IMPLEMENTATIONS = [board.BitBoard]
+if core.EXTENSION_MODULE:
+    from pypentago import _board
+    IMPLEMENTATIONS.append(_board.Board)
+
+
+def random_turn(rand):
+    return (rand.randrange(4), rand.randrange(3), rand.randrange(3),
+            rand.choice((CW, CCW)), rand.randrange(4))
+
+
+class TestImplementations(unittest.TestCase):
+    seed = 42
+    
+    def assertSameBoard(self, reference, other):
+        for row in xrange(6):
+            for col in xrange(6):
+                self.assertEqual(reference[row, col], other[row, col])
+        self.assertEqual(reference.filled, other.filled)
+        self.assertEqual(reference.win(), other.win())
+        self.assertEqual(reference.key, other.key)
+        self.assertEqual(reference.key, board.zobrist(reference))
+    
+    def play(self, cls, games):
+        rand = random.Random(self.seed)
+        for _ in xrange(games):
+            reference = board.Board()
+            other = cls()
+            player = 1
+            while True:
+                turn = random_turn(rand)
+                try:
+                    reference.apply_turn(player, turn)
+                except SquareNotEmpty:
+                    self.assertRaises(SquareNotEmpty, other.apply_turn,
+                                      player, turn)
+                    continue
+                other.apply_turn(player, turn)
+                self.assertSameBoard(reference, other)
+                if reference.win():
+                    break
+                player = 3 - player
+    
+    def test_games(self):
+        for cls in IMPLEMENTATIONS:
+            self.play(cls, GAMES)
+    
+    def test_direct_access(self):
+        rand = random.Random(self.seed)
+        for cls in IMPLEMENTATIONS:
+            for _ in xrange(GAMES):
+                reference = board.Board()
+                other = cls()
+                for _ in xrange(rand.randrange(50)):
+                    row, col = rand.randrange(6), rand.randrange(6)
+                    value = rand.randrange(3)
+                    reference[row, col] = value
+                    other[row, col] = value
+                    if rand.random() < 0.2:
+                        quad, cw = rand.randrange(4), rand.randrange(2)
+                        reference.rotate(quad, cw)
+                        other.rotate(quad, cw)
+                    self.assertSameBoard(reference, other)
+    
+    def test_set(self):
+        for cls in IMPLEMENTATIONS:
+            b = cls()
+            b.set(1, 2, 2)
+            b.set_relative(3, 1, 2, 1)
+            self.assertEqual(b.get(1, 2), 2)
+            self.assertEqual(b.get_relative(3, 1, 2), 1)
+            self.assertEqual(b.get(4, 5), 1)
+            self.assertEqual(b.filled, 2)
+            self.assertRaises(SquareNotEmpty, b.set, 1, 2, 1)
+            self.assertEqual(b.filled, 2)
+    
+    def test_str(self):
+        reference = board.Board()
+        for cls in IMPLEMENTATIONS:
+            other = cls()
+            for b in (reference, other):
+                b[0, 1] = 1
+                b[5, 3] = 2
+            self.assertEqual(str(reference), str(other))
+    
+    def test_full(self):
+        for cls in IMPLEMENTATIONS:
+            b = cls()
+            b.filled = 36
+            self.assertEqual(b.win(), 3)
+    
+    def test_key(self):
+        for cls in IMPLEMENTATIONS + [board.Board]:
+            b = cls()
+            self.assertEqual(b.key, 0)
+            b.set(0, 0, 1)
+            key = b.key
+            self.assertNotEqual(key, 0)
+            # Rotating the empty quadrant does not change the position.
+            b.rotate(3, True)
+            self.assertEqual(b.key, key)
+            b.rotate(0, True)
+            self.assertNotEqual(b.key, key)
+            b.rotate(0, False)
+            self.assertEqual(b.key, key)
+            # Four rotations in the same direction are the identity.
+            for _ in xrange(4):
+                b.rotate(0, False)
+            self.assertEqual(b.key, key)
+            b[0, 0] = 0
+            self.assertEqual(b.key, 0)
+    
+    def test_canonical_key(self):
+        rand = random.Random(self.seed)
+        for cls in IMPLEMENTATIONS + [board.Board]:
+            for _ in xrange(GAMES):
+                b = cls()
+                for _ in xrange(rand.randrange(30)):
+                    b[rand.randrange(6), rand.randrange(6)] = rand.randrange(3)
+                    b.rotate(rand.randrange(4), rand.randrange(2))
+                keys = []
+                for symmetry in xrange(8):
+                    image = board.Board()
+                    for row in xrange(6):
+                        for col in xrange(6):
+                            image[board.transform_square(
+                                symmetry, row, col)] = b[row, col]
+                    keys.append(board.zobrist(image))
+                    self.assertEqual(image.canonical_key(), b.canonical_key())
+                self.assertEqual(b.canonical_key(), min(keys))
+    
+    def test_legal_turns(self):
+        rand = random.Random(self.seed)
+        # Making every possible turn is slow, so check fewer positions.
+        for _ in xrange(GAMES // 10):
+            reference = board.Board()
+            others = [cls() for cls in IMPLEMENTATIONS]
+            for _ in xrange(rand.randrange(30)):
+                row, col = rand.randrange(6), rand.randrange(6)
+                value = rand.randrange(3)
+                quad, cw = rand.randrange(4), rand.randrange(2)
+                for b in [reference] + others:
+                    b[row, col] = value
+                    b.rotate(quad, cw)
+            turns = reference.legal_turns(2)
+            for other in others:
+                self.assertEqual(turns, other.legal_turns(2))
+            # Every position reachable is reached by exactly one turn.
+            positions = set()
+            for quad in xrange(4):
+                for row in xrange(3):
+                    for col in xrange(3):
+                        if reference.get_relative(quad, row, col):
+                            continue
+                        for turn in [(quad, row, col, rot_dir, rot_quad)
+                                     for rot_dir in (CW, CCW)
+                                     for rot_quad in xrange(4)]:
+                            b = board.Board()
+                            b.board = [list(r) for r in reference.board]
+                            b.apply_turn(2, turn)
+                            positions.add(str(b))
+            self.assertEqual(len(turns), len(positions))
+            for turn in turns:
+                b = board.Board()
+                b.board = [list(r) for r in reference.board]
+                b.apply_turn(2, turn)
+                positions.discard(str(b))
+            self.assertEqual(positions, set())
+    
+    def test_empty_board_turns(self):
+        for cls in IMPLEMENTATIONS + [board.Board]:
+            # Every turn results in a board with one stone on it.
+            turns = cls().legal_turns(1)
+            self.assertEqual(len(turns), 36)
+    
+    def test_copy(self):
+        for cls in IMPLEMENTATIONS + [board.Board]:
+            b = cls()
+            b.set(1, 2, 1)
+            other = b.copy()
+            other.apply_turn(2, (3, 0, 0, CW, 0))
+            self.assertEqual(b.filled, 1)
+            self.assertEqual(other.filled, 2)
+            self.assertEqual(b[1, 2], 1)
+            self.assertEqual(other[2, 1], 1)
+            self.assertEqual(b.key, board.zobrist(b))
+            self.assertEqual(other.key, board.zobrist(other))
+    
+    def test_invalid(self):
+        for cls in IMPLEMENTATIONS:
+            b = cls()
+            self.assertRaises(ValueError, b.rotate, 4, True)
+            self.assertRaises(ValueError, b.apply_turn, 1,
+                              (0, 0, 0, "cake", 1))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].isdigit():
+        GAMES = int(sys.argv.pop(1))
+    unittest.main()
@@ -231,19 +231,27 @@ class TestGame(unittest.TestCase):
                     i += 1
 
 
+DEFAULT_BOARD = core.Board
+
+
+class TestFallback(TestGame):
+    """ Run the tests against the list-based reference board. """
+    def setUp(self):
+        core.Board = board.Board
+        TestGame.setUp(self)
+    
+    def tearDown(self):
+        core.Board = DEFAULT_BOARD
+
+
 if core.EXTENSION_MODULE:
-    from pypentago import _board
-    class TestFallback(TestGame):
+    class TestBitBoard(TestGame):
         def setUp(self):
-            core.Board = board.Board
+            core.Board = board.BitBoard
             TestGame.setUp(self)
         
         def tearDown(self):
-            core.Board = _board.Board
-else:
-    class TestFallback(TestGame):
-        pass
-    del TestGame
+            core.Board = DEFAULT_BOARD
 
 if __name__ == "__main__":
     unittest.main()
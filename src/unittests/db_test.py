@@ -27,11 +27,16 @@ from pypentago.server.db import Database, PentagoDatabase
 from pypentago.server.db.dbobjs import Player
 from pypentago.exceptions import NotInDB
 
+from helpers import FakeReactor, wait
+
 class TestPentagoDB(unittest.TestCase):
     def setUp(self):
-        self.database = PentagoDatabase('sqlite:///:memory:')
+        self.database = PentagoDatabase('sqlite:///:memory:',
+                                        reactor=FakeReactor())
+        self.database.start()
     
     def tearDown(self):
+        self.database.stop()
         for table in self.database.tables:
             table.drop()
         clear_mappers()
@@ -52,6 +57,21 @@ class TestPentagoDB(unittest.TestCase):
         with self.database.transaction as session:
             session.save(p)
         self.assertEquals(p, self.database.player_by_login('hitchhiker'))
+    
+    def test_defer(self):
+        db = self.database
+        p = Player('hitchhiker', '42', 'Douglas Adams',
+                   'douglas@42.com')
+        p2 = Player('hitchhiker', '43', 'Arthur Dent',
+                   'arthur@42.com')
+        self.assertEqual(wait(db.defer(db.register_player, p)), True)
+        self.assertEqual(wait(db.defer(db.register_player, p2)), False)
+        self.assertEqual(
+            wait(db.defer(db.player_by_login, 'hitchhiker')).real_name,
+            'Douglas Adams'
+        )
+        failure = wait(db.defer(db.player_by_login, 'marvin'))
+        self.assert_(isinstance(failure.value, NotInDB))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Fixtures shared by the tests. """
+
+import threading
+
+from twisted.internet import address
+from twisted.python.failure import Failure
+from twisted.test.proto_helpers import StringTransport
+from twisted.internet.error import ConnectionDone
+
+from pypentago.network import Connection, dumps, loads
+
+
+class FakeFactory(object):
+    """ Just enough of a factory for a Connection. """
+    def __init__(self):
+        self.clients = []
+
+
+class CountingTransport(StringTransport):
+    """ StringTransport that also remembers every single write. """
+    def __init__(self):
+        StringTransport.__init__(self)
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        StringTransport.write(self, data)
+
+
+def connect(cls=Connection):
+    """ Return an instance of cls connected to a CountingTransport. """
+    conn = cls()
+    conn.factory = FakeFactory()
+    conn.makeConnection(CountingTransport())
+    return conn
+
+
+def received(conn):
+    """ Return the messages sent through conn since the last call. """
+    lines = conn.transport.value().split(conn.delimiter)
+    conn.transport.clear()
+    return [loads(line.decode(conn.encoding)) for line in lines if line]
+
+
+class Client(object):
+    """ Client of a server factory whose lines are given to the server
+    directly. """
+    def __init__(self, factory):
+        self.transport = StringTransport(
+            peerAddress=address.IPv4Address('TCP', '127.0.0.1', 1234)
+        )
+        self.conn = factory.buildProtocol(self.transport.getPeer())
+        self.conn.makeConnection(self.transport)
+
+    def send(self, keyword, data=None):
+        self.conn.lineReceived(dumps([keyword, data]))
+
+    def received(self):
+        """ Return the (keyword, data) pairs the server sent since the
+        last call. """
+        return [tuple(message) for message in received(self.conn)]
+
+    def close(self):
+        self.conn.connectionLost(Failure(ConnectionDone()))
+
+
+class FakeReactor(object):
+    """ Just enough of a reactor for a ReactorThreadPool. Results are
+    delivered in the thread of the pool instead of the reactor thread. """
+    def callWhenRunning(self, fun, *args, **kwargs):
+        pass
+
+    def addSystemEventTrigger(self, phase, event, fun, *args, **kwargs):
+        return (phase, event, fun)
+
+    def removeSystemEventTrigger(self, trigger):
+        pass
+
+    def callFromThread(self, fun, *args, **kwargs):
+        fun(*args, **kwargs)
+
+
+class RunningReactor(FakeReactor):
+    """ A FakeReactor that is already running. """
+    def __init__(self):
+        self.triggers = []
+
+    def callWhenRunning(self, fun, *args, **kwargs):
+        fun(*args, **kwargs)
+
+    def addSystemEventTrigger(self, phase, event, fun, *args, **kwargs):
+        trigger = FakeReactor.addSystemEventTrigger(
+            self, phase, event, fun, *args, **kwargs
+        )
+        self.triggers.append(trigger)
+        return trigger
+
+    def removeSystemEventTrigger(self, trigger):
+        self.triggers.remove(trigger)
+
+
+def wait(deferred, timeout=10):
+    """ Wait for deferred to fire in another thread and return its
+    result. """
+    done = threading.Event()
+    result = []
+    deferred.addBoth(lambda r: (result.append(r), done.set()))
+    done.wait(timeout)
+    return result[0]
@@ -0,0 +1,77 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from pypentago import core, loadtest, CW, CCW
+
+from helpers import RunningReactor, wait
+
+
+class TestLoadtest(unittest.TestCase):
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile(values, 100), 100)
+        self.assertEqual(loadtest.percentile([7], 90), 7)
+        self.assertEqual(loadtest.percentile([], 50), None)
+    
+    def test_wire_turn(self):
+        self.assertEqual(loadtest.wire_turn((1, 2, 0, CW, 3)),
+                         [1, 2, 0, "CW", 3])
+        self.assertEqual(loadtest.wire_turn((1, 2, 0, CCW, 3)),
+                         [1, 2, 0, "CCW", 3])
+        b = core.Board()
+        b.apply_turn(1, loadtest.wire_turn((1, 2, 0, CW, 3)))
+        self.assertEqual(b[2, 3], 1)
+    
+    def test_report(self):
+        stats = loadtest.Stats()
+        for ms in xrange(10):
+            stats.latency('turn', ms / 1000.0)
+        stats.error('INTERNALERROR')
+        stats.error('INTERNALERROR')
+        stats.sent = 10
+        stats.received = 30
+        stats.end = stats.start + 2
+        report = stats.report()
+        self.assertEqual(report['latencies']['turn']['count'], 10)
+        self.assertEqual(report['latencies']['turn']['p50'], 0.004)
+        self.assertEqual(report['latencies']['turn']['max'], 0.009)
+        self.assertEqual(report['messages_per_second'], 20)
+        self.assertEqual(report['errors'], {'INTERNALERROR': 2})
+        text = loadtest.format_report(report)
+        self.assert_('INTERNALERROR' in text)
+        self.assert_(text.splitlines()[-2].startswith('errors'))
+    
+    def test_choose_turn(self):
+        load = loadtest.Load(RunningReactor(), '127.0.0.1', 0, 2, 1,
+                             depth=1, seed=0)
+        try:
+            match = loadtest.Match(load)
+            turn = wait(match.choose_turn(1))
+            self.assert_(turn in match.board.legal_turns(1))
+        finally:
+            load.engine.stop()
+        load = loadtest.Load(RunningReactor(), '127.0.0.1', 0, 2, 1, seed=0)
+        self.assertEqual(load.engine, None)
+        match = loadtest.Match(load)
+        self.assert_(wait(match.choose_turn(2)) in match.board.legal_turns(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from twisted.test.proto_helpers import StringTransport
+
+from pypentago.network import loads
+from pypentago.network.wire import json_wire, binary_wire
+from pypentago.server import Factory
+from pypentago.client.connection import ClientConnection
+
+from helpers import Client
+
+
+class GameWindow(object):
+    def __init__(self):
+        self.games = None
+    
+    def show_games(self, games):
+        self.games = games
+
+
+class TestLobby(unittest.TestCase):
+    def setUp(self):
+        self.factory = Factory(None)
+    
+    def test_snapshot(self):
+        a = Client(self.factory)
+        self.assertEqual(a.received(),
+                         [("GAMES", {'version': 0, 'games': []})])
+        a.send("OPEN", "spam")
+        self.assertEqual(
+            a.received(),
+            [("GAMEADDED", {'version': 1, 'game': {
+                'uid': 0, 'name': 'spam', 'players': [
+                    {'name': 'Test Player'}]}}),
+             ("OPENGAME", 0)]
+        )
+        b = Client(self.factory)
+        games = b.received()[0][1]
+        self.assertEqual(games['version'], 1)
+        self.assertEqual([game['name'] for game in games['games']],
+                         ['spam'])
+    
+    def test_cache(self):
+        lobby = self.factory.lobby
+        wire = json_wire()
+        snapshot = lobby.snapshot(wire)
+        self.assert_(lobby.snapshot(wire) is snapshot)
+        binary = lobby.snapshot(binary_wire())
+        self.assert_(lobby.snapshot(binary_wire()) is binary)
+        self.assertEqual(binary_wire().decode(binary[4:]),
+                         wire.decode(snapshot[:-1]))
+        Client(self.factory).send("OPEN", "spam")
+        self.assert_(lobby.snapshot(wire) is not snapshot)
+        self.assertEqual(loads(lobby.snapshot(wire)[:-1])[1]['version'], 1)
+        self.assertEqual(
+            binary_wire().decode(lobby.snapshot(binary_wire())[4:]),
+            wire.decode(lobby.snapshot(wire)[:-1])
+        )
+    
+    def test_deltas(self):
+        a, b, c = [Client(self.factory) for _ in xrange(3)]
+        a.send("OPEN", "spam")
+        for client in (a, b, c):
+            client.received()
+        b.send("JOIN", 0)
+        update = ("GAMEUPDATED", {'version': 2, 'game': {
+            'uid': 0, 'name': 'spam',
+            'players': [{'name': 'Test Player'}] * 2}})
+        self.assertEqual(c.received(), [update])
+        self.assert_(update in a.received())
+        self.assert_(update in b.received())
+        
+        a.close()
+        self.assertEqual(c.received(),
+                         [("GAMEREMOVED", {'version': 3, 'uid': 0})])
+        self.assertEqual(self.factory.lobby.games, {})
+        # Nothing is sent about games that are not in the list anymore.
+        b.close()
+        self.assertEqual(c.received(), [])
+        self.assertEqual(self.factory.lobby.version, 3)
+    
+    def test_reused_uid(self):
+        a, b, c = [Client(self.factory) for _ in xrange(3)]
+        a.send("OPEN", "spam")
+        spam = self.factory.games[0]
+        a.close()
+        b.send("OPEN", "eggs")
+        eggs = self.factory.games[0]
+        self.assert_(eggs is not spam)
+        c.received()
+        # The old game must not touch the new one with the same uid.
+        self.factory.remove_game(spam)
+        self.factory.lobby.remove(spam)
+        self.factory.lobby.update(spam)
+        self.assertEqual(c.received(), [])
+        self.assert_(self.factory.games[0] is eggs)
+        self.assertEqual([game['name'] for game in
+                          self.factory.lobby.games.itervalues()], ['eggs'])
+        self.factory.remove_game(eggs)
+        self.assertEqual(c.received(),
+                         [("GAMEREMOVED", {'version': 4, 'uid': 0})])
+    
+    def test_client(self):
+        conn = ClientConnection()
+        conn.transport = StringTransport()
+        conn.server_window = GameWindow()
+        game = {'uid': 2, 'name': 'eggs', 'players': []}
+        conn.games({'keyword': "GAMES",
+                    'data': {'version': 4, 'games': [game]}})
+        self.assertEqual(conn.server_window.games, [game])
+        
+        spam = {'uid': 1, 'name': 'spam', 'players': []}
+        conn.game_changed({'keyword': "GAMEADDED",
+                           'data': {'version': 5, 'game': spam}})
+        self.assertEqual(conn.server_window.games, [spam, game])
+        conn.game_changed({'keyword': "GAMEREMOVED",
+                           'data': {'version': 6, 'uid': 2}})
+        self.assertEqual(conn.server_window.games, [spam])
+        self.assertEqual(conn.transport.value(), '')
+        
+        # A change was missed.
+        conn.game_changed({'keyword': "GAMEREMOVED",
+                           'data': {'version': 8, 'uid': 1}})
+        self.assertEqual(conn.server_window.games, [spam])
+        self.assertEqual(loads(conn.transport.value()[:-1]),
+                         ["GAMELIST", None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,8 +31,10 @@ from itertools import chain
 from pypentago import core
 
 PATH = os.path.abspath(os.path.dirname(__file__))
-MODULES = ['core_test', 'pgn_test', 'actions_test', 'crypto_test', 
-           'elo_test', 'db_test']
+MODULES = ['core_test', 'board_test', 'ai_test', 'perft_test', 'pgn_test',
+           'actions_test', 'crypto_test', 'elo_test', 'db_test',
+           'loadtest_test', 'lobby_test', 'network_test', 'wire_test',
+           'stats_test', 'account_test', 'threadpool_test']
 
 
 class DummyTestRunner:
@@ -0,0 +1,239 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from twisted.internet import defer
+
+from pypentago import core, CW
+from pypentago.network import (Connection, broadcast, dumps, expose,
+                               require_auth, hold_output, BadInput)
+from pypentago.server.core import ServerGame, ServerPlayer
+
+from helpers import connect, received
+
+
+class OtherConnection(Connection):
+    delimiter = "\n"
+
+
+class Observer(core.Player):
+    def __init__(self):
+        core.Player.__init__(self)
+        self.turns = []
+    
+    def display_turn(self, player, turn):
+        self.turns.append(turn)
+
+
+class TestBroadcast(unittest.TestCase):
+    def test_broadcast(self):
+        conns = [connect() for _ in xrange(3)]
+        broadcast(conns, "SPAM", {'eggs': [1, 2]})
+        for conn in conns:
+            self.assertEqual(received(conn), [["SPAM", {'eggs': [1, 2]}]])
+        # All connections got the very same string in a single write.
+        frames = [conn.transport.writes for conn in conns]
+        self.assertEqual(len(frames[0]), 1)
+        self.assert_(frames[0][0] is frames[1][0] is frames[2][0])
+    
+    def test_classes(self):
+        conns = [connect(), connect(OtherConnection)]
+        broadcast(conns, "SPAM")
+        for conn in conns:
+            self.assertEqual(received(conn), [["SPAM", None]])
+        self.assertNotEqual(conns[0].transport.writes,
+                            conns[1].transport.writes)
+        broadcast([], "SPAM")
+    
+    def test_game(self):
+        game = ServerGame('spam', 5)
+        conns = [connect(), connect()]
+        for conn in conns:
+            conn.remote_table = {}
+            game.add_player(ServerPlayer(conn, 'Player'))
+        observer = Observer()
+        game.add_observer(observer)
+        game.last_set = game.players[1]
+        
+        game.players[0].do_turn([0, 1, 1, "CW", 2])
+        self.assertEqual(observer.turns, [[0, 1, 1, "CW", 2]])
+        self.assertEqual(received(conns[0]), [])
+        self.assertEqual(received(conns[1]),
+                         [["GAME", [5, "TURN", [["", [0, 1, 1, "CW", 2]]]]]])
+        
+        game.send_msg(game.players[1], "hello")
+        self.assertEqual(received(conns[0]),
+                         [["GAME", [5, "MSG", [["", "hello"]]]]])
+        self.assertEqual(received(conns[1]), [])
+        
+        game.player_quit(game.players[0])
+        self.assertEqual(received(conns[1]), [["GAME", [5, "QUIT", []]]])
+
+
+class Handlers(Connection):
+    def construct(self):
+        self.calls = []
+    
+    @expose("SPAM")
+    def spam(self, evt):
+        self.calls.append(('spam', evt['data']))
+    
+    @expose("SPAM", "EGGS")
+    @require_auth
+    def eggs(self, evt):
+        self.calls.append(('eggs', evt['data']))
+
+
+class MoreHandlers(Handlers):
+    @expose("HAM")
+    def ham(self, evt):
+        return "HAMHAM"
+
+
+class Waiting(Connection):
+    def construct(self):
+        self.deferred = defer.Deferred()
+        self.errors = []
+    
+    @expose("WAIT")
+    def wait(self, evt):
+        return self.deferred
+    
+    def bad_input(self, request):
+        self.errors.append(('bad_input', request))
+    
+    def internal_error(self, request):
+        self.errors.append(('internal_error', request))
+        return "INTERNALERROR"
+
+
+class TestDispatch(unittest.TestCase):
+    def test_table(self):
+        handlers, needs_auth = Handlers.handlers()
+        self.assertEqual(handlers, {'SPAM': ['eggs', 'spam'],
+                                    'EGGS': ['eggs'],
+                                    'HELLO': ['handshake']})
+        self.assertEqual(needs_auth, {'SPAM': True, 'EGGS': True,
+                                      'HELLO': False})
+        self.assert_(Handlers.handlers() is Handlers.handlers())
+        self.assertEqual(MoreHandlers.handlers()[0]['HAM'], ['ham'])
+        self.assert_('HAM' not in Handlers.handlers()[0])
+    
+    def test_dispatch(self):
+        conn = connect(MoreHandlers)
+        conn.lineReceived(dumps(["SPAM", 1]))
+        self.assertEqual(received(conn), [["AUTHREQ", None]])
+        self.assertEqual(conn.calls, [])
+        conn.lineReceived(dumps(["HAM", None]))
+        self.assertEqual(received(conn), [["HAMHAM", None]])
+        
+        conn.auth = True
+        conn.lineReceived(dumps(["SPAM", 1]))
+        self.assertEqual(conn.calls, [('eggs', 1), ('spam', 1)])
+        # Unknown keywords are not added to the table.
+        conn.lineReceived(dumps(["UNKNOWN", None]))
+        self.assert_('UNKNOWN' not in conn.binds)
+    
+    def test_deferred(self):
+        conn = connect(Waiting)
+        conn.lineReceived(dumps(["WAIT", None]))
+        self.assertEqual(received(conn), [])
+        conn.deferred.callback(("DONE", 1))
+        self.assertEqual(received(conn), [["DONE", 1]])
+        
+        for exc, error in ((BadInput, 'bad_input'),
+                           (ValueError, 'internal_error')):
+            conn = connect(Waiting)
+            conn.lineReceived(dumps(["WAIT", None]))
+            conn.deferred.errback(exc())
+            self.assertEqual(conn.errors, [(error, dumps(["WAIT", None]))])
+        self.assertEqual(received(conn), [["INTERNALERROR", None]])
+    
+    def test_bind(self):
+        conn = connect(MoreHandlers)
+        other = connect(MoreHandlers)
+        calls = []
+        conn.bind("HAM", calls.append)
+        conn.lineReceived(dumps(["HAM", 2]))
+        self.assertEqual(calls, [{'keyword': 'HAM', 'data': 2}])
+        self.assertEqual(len(other.binds['HAM']), 1)
+        
+        conn.bind("FOO", require_auth(lambda evt: None))
+        conn.lineReceived(dumps(["FOO", None]))
+        self.assertEqual(received(conn), [["HAMHAM", None],
+                                          ["AUTHREQ", None]])
+        self.assert_('FOO' not in other.needs_auth)
+
+
+
+class TestOutput(unittest.TestCase):
+    def test_hold(self):
+        a, b = connect(MoreHandlers), connect(MoreHandlers)
+        
+        @hold_output
+        def send():
+            a.send("SPAM", 1)
+            broadcast([a, b], "EGGS")
+            # Nested calls do not write anything either.
+            hold_output(a.send)("HAM")
+            self.assertEqual(a.transport.writes, [])
+            return 2
+        self.assertEqual(send(), 2)
+        self.assertEqual(len(a.transport.writes), 1)
+        self.assertEqual(received(a), [["SPAM", 1], ["EGGS", None],
+                                       ["HAM", None]])
+        self.assertEqual(len(b.transport.writes), 1)
+        self.assertEqual(received(b), [["EGGS", None]])
+        # Output is written at once otherwise.
+        a.send("SPAM")
+        self.assertEqual(len(a.transport.writes), 2)
+    
+    def test_data_received(self):
+        conn = connect(MoreHandlers)
+        conn.dataReceived((dumps(["HAM", None]) + conn.delimiter) * 3)
+        self.assertEqual(len(conn.transport.writes), 1)
+        self.assertEqual(received(conn), [["HAMHAM", None]] * 3)
+    
+    def test_backpressure(self):
+        conn = connect(MoreHandlers)
+        self.assert_(conn.transport.producer is conn)
+        conn.pauseProducing()
+        self.assertEqual(conn.transport.producerState, 'paused')
+        conn.send("SPAM")
+        hold_output(conn.send)("EGGS")
+        self.assertEqual(conn.transport.writes, [])
+        conn.resumeProducing()
+        self.assertEqual(conn.transport.producerState, 'producing')
+        self.assertEqual(len(conn.transport.writes), 1)
+        self.assertEqual(received(conn), [["SPAM", None], ["EGGS", None]])
+    
+    def test_high_water(self):
+        conn = connect(MoreHandlers)
+        conn.high_water = 200
+        conn.pauseProducing()
+        for i in xrange(10):
+            conn.send("SPAM", i)
+        self.failIf(conn.transport.disconnecting)
+        conn.send("SPAM", "x" * 100)
+        self.assert_(conn.transport.disconnecting)
+        self.assertEqual(conn._out, [])
+        self.assertEqual(conn.transport.writes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
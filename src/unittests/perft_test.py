@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Check the perft counts of the board implementations against known
+ones. """
+
+import sys
+import unittest
+
+from StringIO import StringIO
+
+from pypentago import core
+from pypentago import board
+from pypentago import perft
+
+IMPLEMENTATIONS = [board.Board, board.BitBoard]
+if core.EXTENSION_MODULE:
+    from pypentago import _board
+    IMPLEMENTATIONS.append(_board.Board)
+
+# The Python boards only check counts up to this, it takes too long
+# otherwise.
+PYTHON_NODES = 20000
+
+#: (squares, player, counts). counts[depth - 1] is the number of ways to
+#: make depth turns in a row and the number of ways to make the turns
+#: legal_turns returns.
+POSITIONS = [
+    ('.' * 36, 1, [(288, 36), (80640, 3500)]),
+    ('12.1112.2.2.21222...2..121221.11.11.', 1,
+     [(96, 96), (8008, 8000), (545600, 544163)]),
+    ('2..22...21112...21....21..112.1..2.1', 1,
+     [(144, 144), (19040, 19040), (2411776, 2410256)]),
+    ('.212.2121.1212111..22..21..1..2.2121', 1,
+     [(96, 95), (7216, 7150), (508160, 497027)]),
+]
+
+
+class TestPerft(unittest.TestCase):
+    def test_counts(self):
+        for cls in IMPLEMENTATIONS:
+            for squares, player, counts in POSITIONS:
+                b = perft.parse_board(squares, cls)
+                for depth, (nodes, distinct) in enumerate(counts):
+                    depth += 1
+                    if (nodes > PYTHON_NODES and
+                        cls in (board.Board, board.BitBoard)):
+                        break
+                    self.assertEqual(perft.perft(b, player, depth), nodes)
+                    self.assertEqual(
+                        perft.perft(b, player, depth, True), distinct
+                    )
+    
+    def test_unchanged(self):
+        for cls in IMPLEMENTATIONS:
+            b = perft.parse_board(POSITIONS[1][0], cls)
+            key = b.key
+            filled = b.filled
+            perft.perft(b, 1, 2)
+            self.assertEqual(b.key, key)
+            self.assertEqual(b.filled, filled)
+            self.assertEqual(perft.perft(b, 1, 0), 1)
+    
+    def test_parse_board(self):
+        b = perft.parse_board('1.....\n' + '.' * 29 + '2', board.Board)
+        self.assertEqual(b[0, 0], 1)
+        self.assertEqual(b[5, 5], 2)
+        self.assertEqual(b.filled, 2)
+        self.assertRaises(ValueError, perft.parse_board, '.' * 35)
+        self.assertRaises(ValueError, perft.parse_board, '3' * 36)
+    
+    def test_main(self):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            perft.main(['-d', '1', '-b', POSITIONS[1][0], '-i', 'bit'])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(output.splitlines()[1].split()[:2], ['1', '96'])
+
+
+if __name__ == "__main__":
+    unittest.main()
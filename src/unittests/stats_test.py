@@ -0,0 +1,129 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from pypentago.network import (Connection, BadInput, expose, require_auth,
+                               dumps)
+from pypentago.network.stats import Stats, MALFORMED, UNKNOWN
+from pypentago.server import Factory
+
+from helpers import Client, connect, received
+
+
+class Handlers(Connection):
+    @expose("SPAM")
+    def spam(self, evt):
+        return "EGGS", evt['data']
+    
+    @expose("FAIL")
+    def fail(self, evt):
+        raise ValueError
+    
+    @expose("FAIL")
+    def bad(self, evt):
+        raise BadInput
+    
+    @expose("SECRET")
+    @require_auth
+    def secret(self, evt):
+        pass
+
+
+class TestStats(unittest.TestCase):
+    def test_received(self):
+        stats = Stats()
+        conn = connect(Handlers)
+        conn.stats = stats
+        for line in (dumps(["SPAM", 1]), dumps(["SPAM", [2, 3]]),
+                     dumps(["FAIL", None]), dumps(["SECRET", None]),
+                     dumps(["HAM", None]), dumps(["EGGS", None]), "[1"):
+            conn.lineReceived(line)
+        
+        spam = stats.keywords["SPAM"]
+        self.assertEqual(spam.received, 2)
+        self.assertEqual(spam.received_bytes,
+                         len(dumps(["SPAM", 1])) + len(dumps(["SPAM", [2, 3]])))
+        self.assertEqual(spam.errors, 0)
+        self.assert_(spam.decode_time > 0 and spam.handler_time > 0)
+        self.assertEqual(stats.keywords["FAIL"].errors, 2)
+        self.assertEqual(stats.keywords["SECRET"].received, 1)
+        self.assertEqual(stats.keywords[UNKNOWN].received, 2)
+        self.assertEqual(stats.keywords[MALFORMED].received, 1)
+        self.assertEqual(stats.keywords[MALFORMED].errors, 1)
+        self.assert_("HAM" not in stats.keywords)
+    
+    def test_sent(self):
+        stats = Stats()
+        conn = connect(Handlers)
+        conn.stats = stats
+        conn.lineReceived(dumps(["SPAM", 1]))
+        conn.send("SPAM")
+        self.assertEqual(stats.keywords["EGGS"].sent, 1)
+        self.assertEqual(stats.keywords["EGGS"].sent_bytes,
+                         len(conn.wire.frame("EGGS", 1)))
+        self.assertEqual(stats.keywords["SPAM"].sent, 1)
+        self.assertEqual(stats.keywords["SPAM"].received, 1)
+    
+    def test_disabled(self):
+        conn = connect(Handlers)
+        conn.lineReceived(dumps(["SPAM", 1]))
+        self.assertEqual(received(conn), [["EGGS", 1]])
+    
+    def test_format(self):
+        stats = Stats()
+        stats.received("SPAM", 10, 0.001, 0.002)
+        stats.received("EGGS", 10, 0.001, 0.003, 1)
+        stats.sent("EGGS", 20)
+        lines = stats.format().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assert_(lines[2].startswith("EGGS"))
+        self.assertEqual(lines[2].split()[1:],
+                         ['1', '10', '1.00', '3.00', '1', '1', '20'])
+        data = stats.as_dict()
+        self.assertEqual(data['keywords']['SPAM']['received_bytes'], 10)
+        self.assert_(data['seconds'] >= 0)
+
+
+class TestServer(unittest.TestCase):
+    def connect(self, factory):
+        client = Client(factory)
+        client.received()
+        return client.conn
+    
+    def test_admin(self):
+        factory = Factory(None, admins=['Test Player'], stats=Stats())
+        conn = self.connect(factory)
+        conn.dataReceived(dumps(["GAMELIST", None]) + "\0")
+        conn.dataReceived(dumps(["STATS", None]) + "\0")
+        keyword, data = received(conn)[-1]
+        self.assertEqual(keyword, "STATS")
+        self.assertEqual(data['keywords']['GAMES']['sent'], 2)
+        self.assertEqual(data['keywords']['GAMELIST']['received'], 1)
+    
+    def test_not_admin(self):
+        conn = self.connect(Factory(None, stats=Stats()))
+        conn.lineReceived(dumps(["STATS", None]))
+        self.assertEqual(received(conn), [["NOTADMIN", None]])
+    
+    def test_disabled(self):
+        conn = self.connect(Factory(None, admins=['Test Player']))
+        conn.lineReceived(dumps(["STATS", None]))
+        self.assertEqual(received(conn), [["STATS", None]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+# -*- coding: us-ascii -*-
+
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the thread pools of the AI and the database. """
+
+import threading
+import unittest
+
+from pypentago.threadpool import ReactorThreadPool
+
+from helpers import FakeReactor, RunningReactor, wait
+
+
+class TestReactorThreadPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ReactorThreadPool(2, 'test', FakeReactor())
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_defer(self):
+        d = self.pool.defer(lambda a, b=0: (a + b, threading.currentThread()),
+                            1, b=2)
+        result, thread = wait(d)
+        self.assertEqual(result, 3)
+        self.assertNotEqual(thread, threading.currentThread())
+
+    def test_error(self):
+        def fail():
+            raise KeyError('spam')
+        failure = wait(self.pool.defer(fail))
+        self.assert_(isinstance(failure.value, KeyError))
+
+    def test_resize(self):
+        self.pool.resize(1)
+        threads = [
+            wait(self.pool.defer(threading.currentThread)) for _ in xrange(4)
+        ]
+        self.assertEqual(len(set(threads)), 1)
+
+    def test_not_running(self):
+        pool = ReactorThreadPool(1, 'test', FakeReactor())
+        self.failIf(pool.pool.started)
+        pool.stop()
+
+    def test_running(self):
+        reactor = RunningReactor()
+        pool = ReactorThreadPool(1, 'test', reactor)
+        self.assert_(pool.pool.started)
+        self.assertEqual(len(reactor.triggers), 1)
+        # Starting it again does not register another trigger.
+        pool.start()
+        self.assertEqual(len(reactor.triggers), 1)
+        pool.stop()
+        self.assertEqual(reactor.triggers, [])
+
+    def test_shutdown(self):
+        reactor = RunningReactor()
+        pool = ReactorThreadPool(1, 'test', reactor)
+        phase, event, fun = reactor.triggers[0]
+        self.assertEqual((phase, event), ('during', 'shutdown'))
+        fun()
+        self.failIf(pool.pool.started)
+        # The trigger is not removed while it is fired.
+        self.assertEqual(len(reactor.triggers), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
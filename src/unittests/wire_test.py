@@ -0,0 +1,219 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from pypentago import PROTOCOL_VERSION
+from pypentago.network import Connection, expose
+from pypentago.network.codec import CODECS, register
+from pypentago.network.wire import (JSONWire, BinaryWire, FrameTooLong,
+                                    GENERIC_ID, TURN_ID, json_wire,
+                                    binary_wire)
+
+from helpers import connect
+
+
+MESSAGES = [
+    ("GAME", [3, "TURN", [["", [1, 2, 0, "CW", 3]]]]),
+    ("GAME", [3, "TURN", [["", [3, 0, 2, "CCW", 0]]]]),
+    ("GAME", [3, "MSG", [["", u"Hello \xe4"]]]),
+    ("GAMELIST", None),
+    ("OPEN", "spam"),
+    ("SPAM", {'eggs': [1, 2]}),
+]
+
+
+class Peer(Connection):
+    def construct(self):
+        self.got = []
+    
+    @expose("SPAM", "EGGS", "NOHANDLER")
+    def spam(self, evt):
+        self.got.append((evt['keyword'], evt['data']))
+
+
+def pump(a, b):
+    """ Deliver what a and b wrote to each other until neither writes
+    anything more. """
+    while a.transport.value() or b.transport.value():
+        for src, dst in ((a, b), (b, a)):
+            data = src.transport.value()
+            src.transport.clear()
+            if data:
+                dst.dataReceived(data)
+
+
+class TestWires(unittest.TestCase):
+    def round_trip(self, wire):
+        data = ''.join(wire.frame(keyword, data)
+                       for keyword, data in MESSAGES)
+        start = 0
+        got = []
+        while True:
+            message, start = wire.next(data, start, 1024)
+            if message is None:
+                break
+            got.append(wire.decode(message))
+        self.assertEqual(start, len(data))
+        self.assertEqual(got, MESSAGES)
+    
+    def test_json(self):
+        self.round_trip(JSONWire())
+        self.round_trip(JSONWire("\n", "utf-16"))
+        self.assertEqual(JSONWire().decode(""), None)
+    
+    def test_binary(self):
+        wire = BinaryWire()
+        self.round_trip(wire)
+        for codec in CODECS.itervalues():
+            self.round_trip(BinaryWire(codec))
+        # Turns are eleven bytes long, the length included.
+        turn = wire.frame(*MESSAGES[0])
+        self.assertEqual(len(turn), 11)
+        self.assertEqual(ord(turn[4]), TURN_ID)
+        self.assertEqual(ord(wire.frame("SPAM")[4]), GENERIC_ID)
+        self.assertEqual(wire.frame("GAMELIST"), "\0\0\0\1\x08")
+    
+    def test_partial(self):
+        for wire in (JSONWire(), BinaryWire()):
+            frame = wire.frame(*MESSAGES[2])
+            for end in xrange(len(frame)):
+                self.assertEqual(wire.next(frame[:end], 0, 1024),
+                                 (None, 0))
+            self.assertEqual(wire.next(frame, 0, 1024)[1], len(frame))
+    
+    def test_too_long(self):
+        for wire in (JSONWire(), BinaryWire()):
+            frame = wire.frame("OPEN", "spam" * 10)
+            self.assertRaises(FrameTooLong, wire.next, frame, 0, 20)
+            self.assertRaises(FrameTooLong, wire.next, frame[:-1], 0, 20)
+    
+    def test_malformed(self):
+        wire = BinaryWire()
+        for message in ("", "\xff", "\x01\0\0", "\x01\0\0\0\0\xff\xff",
+                        "\x00[1"):
+            self.assertRaises(ValueError, wire.decode, message)
+    
+    def test_shared(self):
+        self.assert_(json_wire() is json_wire())
+        self.assert_(json_wire() is not json_wire("\n"))
+        self.assert_(binary_wire() is binary_wire('json'))
+        self.assert_(binary_wire().codec is CODECS['json'])
+
+
+class TestCodecs(unittest.TestCase):
+    def test_round_trip(self):
+        for codec in CODECS.itervalues():
+            for keyword, data in MESSAGES:
+                got = codec.loads(codec.dumps([keyword, data]))
+                self.assertEqual(got, [keyword, data])
+                self.assertEqual(got[0].__class__, unicode)
+    
+    def test_malformed(self):
+        for codec in CODECS.itervalues():
+            self.assertRaises(ValueError, codec.loads, "\xc1")
+
+
+class TestHandshake(unittest.TestCase):
+    def test_binary(self):
+        client, server = connect(Peer), connect(Peer)
+        client.hello()
+        # Held back until the server has answered.
+        client.send("SPAM", [1])
+        self.assertEqual(client.wire.name, 'json')
+        pump(client, server)
+        codec = [name for name in Connection.codecs if name in CODECS][0]
+        self.assert_(client.wire is server.wire is binary_wire(codec))
+        self.assertEqual(server.got, [("SPAM", [1])])
+        server.send("EGGS", {'a': None})
+        client.send("SPAM", None)
+        pump(client, server)
+        self.assertEqual(client.got, [("EGGS", {'a': None})])
+        self.assertEqual(server.got, [("SPAM", [1]), ("SPAM", None)])
+    
+    def test_unsolicited(self):
+        client, server = connect(Peer), connect(Peer)
+        client.hello()
+        # Sent by the server before it got HELLO.
+        server.send("EGGS", 1)
+        pump(client, server)
+        self.assertEqual(client.wire.name, 'binary')
+        self.assert_(client.wire is server.wire)
+        self.assertEqual(client.got, [("EGGS", 1)])
+    
+    def test_codec(self):
+        register('spam', CODECS['json'].dumps, CODECS['json'].loads)
+        try:
+            client, server = connect(Peer), connect(Peer)
+            client.codecs = ('eggs', 'spam', 'json')
+            server.codecs = ('json', 'spam')
+            client.hello()
+            client.send("SPAM", [1])
+            pump(client, server)
+            self.assert_(client.wire is server.wire is binary_wire('spam'))
+            self.assertEqual(server.got, [("SPAM", [1])])
+            
+            # Clients that do not know about codecs get JSON.
+            server = connect(Peer)
+            server.codecs = ('spam', 'json')
+            server.dataReceived(json_wire().frame(
+                "HELLO", {'version': 3, 'wires': ['binary']}
+            ))
+            self.assertEqual(
+                json_wire().decode(server.transport.value()[:-1]),
+                ("HELLO", {'version': PROTOCOL_VERSION, 'wire': 'binary',
+                           'codec': 'json'})
+            )
+            self.assert_(server.wire is binary_wire('json'))
+        finally:
+            del CODECS['spam']
+    
+    def test_json(self):
+        client, server = connect(Peer), connect(Peer)
+        server.wires = ()
+        client.hello()
+        client.send("SPAM", [1])
+        pump(client, server)
+        self.assert_(client.wire is server.wire is json_wire())
+        self.assertEqual(server.got, [("SPAM", [1])])
+    
+    def test_old_version(self):
+        client, server = connect(Peer), connect(Peer)
+        client.hello()
+        client.send("SPAM", [1])
+        client.transport.clear()
+        server.dataReceived(json_wire().frame(
+            "HELLO", {'version': 2, 'wires': ['binary'], 'codecs': ['json']}
+        ))
+        pump(client, server)
+        self.assert_(client.wire is server.wire is json_wire())
+        self.assertEqual(server.got, [("SPAM", [1])])
+    
+    def test_old_peer(self):
+        client = connect(Peer)
+        client.hello()
+        client.send("SPAM", [1])
+        client.transport.clear()
+        # Peers that do not know HELLO answer with something else.
+        client.dataReceived(json_wire().frame("NOHANDLER", "HELLO"))
+        self.assert_(client.wire is json_wire())
+        self.assertEqual(client.transport.value(),
+                         json_wire().frame("SPAM", [1]))
+        self.assertEqual(client.got, [("NOHANDLER", "HELLO")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Measure how much faster the search gets with more threads.
+
+Every count of threads searches the same positions to the same depth. For
+every one, the time taken, the nodes searched and the speedup over a single
+thread are printed. """
+
+import os
+import sys
+import time
+import random
+
+from optparse import OptionParser
+
+
+s_path = os.path.abspath(os.path.dirname(__file__))
+
+SRC_PATH = os.path.abspath(os.path.join(s_path, os.pardir, 'src/'))
+
+
+def positions(count, stones, seed):
+    """ Return count boards with stones random stones on them that nobody
+    has won yet, each with the player whose turn it is. """
+    from pypentago import core
+
+    rand = random.Random(seed)
+    ret = []
+    while len(ret) < count:
+        b = core.Board()
+        player = 1
+        for _ in xrange(stones):
+            b.apply_turn(player, rand.choice(b.legal_turns(player)))
+            player = 3 - player
+            if b.win():
+                break
+        else:
+            ret.append((b, player))
+    return ret
+
+
+def run(boards, depth, threads, seed):
+    """ Search all boards and return the time taken and the number of
+    nodes searched. """
+    from pypentago import ai
+
+    nodes = 0
+    start = time.time()
+    for b, player in boards:
+        nodes += ai.search(b, player, max_depth=depth, threads=threads,
+                           seed=seed)['nodes']
+    return time.time() - start, nodes
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=4,
+                      help="search DEPTH plies deep")
+    parser.add_option("-p", "--positions", type="int", dest="positions",
+                      default=8, help="search COUNT positions")
+    parser.add_option("-n", "--stones", type="int", dest="stones",
+                      default=8, help="put STONES stones on every position")
+    parser.add_option("-t", "--threads", dest="threads", default="1,2,4",
+                      help="comma separated counts of threads to compare")
+    parser.add_option("-s", "--seed", type="int", dest="seed", default=-1,
+                      help="search reproducibly with SEED")
+    options, args = parser.parse_args()
+
+    sys.path.insert(0, SRC_PATH)
+    boards = positions(options.positions, options.stones, 0)
+    base = None
+    print "threads      time     nodes  speedup"
+    for threads in map(int, options.threads.split(',')):
+        elapsed, nodes = run(boards, options.depth, threads, options.seed)
+        if base is None:
+            base = elapsed
+        print "%7d %9.2f %9d %8.2f" % (threads, elapsed, nodes,
+                                       base / elapsed)
+
+
+if __name__ == '__main__':
+    main()
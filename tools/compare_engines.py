@@ -0,0 +1,73 @@
+# pypentago - a board game
+# Copyright (C) 2008 Florian Mayer
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Compare the engines of the search on the same positions.
+
+For every engine, the time taken, the nodes searched and the turns and
+iterations searched again are printed. Positions the engines do not agree
+on the value of are reported, which should never happen. """
+
+import sys
+import time
+
+from optparse import OptionParser
+
+from bench_parallel import SRC_PATH, positions
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=4,
+                      help="search DEPTH plies deep")
+    parser.add_option("-p", "--positions", type="int", dest="positions",
+                      default=8, help="search COUNT positions")
+    parser.add_option("-n", "--stones", type="int", dest="stones",
+                      default=8, help="put STONES stones on every position")
+    parser.add_option("-e", "--engines", dest="engines",
+                      default="alphabeta,pvs",
+                      help="comma separated engines to compare")
+    parser.add_option("-w", "--window", type="float", dest="window",
+                      default=4, help="aspiration window of pvs")
+    parser.add_option("-t", "--tt-size", type="int", dest="tt_size",
+                      default=16 * 1024 * 1024,
+                      help="bytes the transposition table may use")
+    options, args = parser.parse_args()
+
+    sys.path.insert(0, SRC_PATH)
+    boards = positions(options.positions, options.stones, 0)
+    values = []
+    print "engine         time     nodes  researches"
+    for engine in options.engines.split(','):
+        nodes = researches = 0
+        start = time.time()
+        for i, (b, player) in enumerate(boards):
+            result = b.search(player, max_depth=options.depth,
+                              tt_size=options.tt_size, engine=engine,
+                              window=options.window)
+            nodes += result['nodes']
+            researches += result['researches']
+            if i == len(values):
+                values.append(result['value'])
+            elif values[i] != result['value']:
+                print "position %d: %s has value %s, not %s" % (
+                    i, engine, result['value'], values[i]
+                )
+        print "%-10s %8.2f %9d %11d" % (engine, time.time() - start, nodes,
+                                        researches)
+
+
+if __name__ == '__main__':
+    main()